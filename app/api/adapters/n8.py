@@ -0,0 +1,403 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, List, Optional
+
+# Importing the N8 configuration from the configuration module
+from app.api.config.env import (N8_IP, N8_USER, N8_PASSWORD, N8_WEBHOOK_ENABLED, N8_WEBHOOK_PATH, N8_BATCH_SIZE,
+                                N8_FLUSH_INTERVAL, N8_POOL_SIZE, N8_TIMEOUT, N8_MAX_RETRIES, N8_RETRY_BACKOFF,
+                                N8_MAX_PENDING, N8_SPILL_PATH, N8_SPILL_MAX_BYTES, REPLICA_PRIMARY_URL)
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a connection to N8
+CONNECT_TIMEOUT = 5
+
+
+class N8Webhook:
+    """
+    Adapter delivering product change events to an N8 workflow webhook, off the request path.
+
+    `publish` only appends the event to an in-memory queue. A daemon thread sends the
+    queued events as `{"events": [...]}` in one POST per `batch_size` events, at the latest
+    `flush_interval` seconds after they were published, over a keep-alive connection pool
+    shared by every call. Failed calls (connection errors, timeouts, 429 and 5xx) are
+    retried `max_retries` times with exponential backoff and jitter; other 4xx answers
+    are not retried and their events are dropped.
+
+    Batches that still fail are spilled to an NDJSON file, as are the oldest events once
+    more than `max_pending` are queued in memory, and are sent again, oldest first, after
+    the next successful call. The file is bounded by `spill_max_bytes`; events that do not
+    fit are dropped and counted. Delivery is at least once: a batch may be sent twice if
+    the worker dies while it is being delivered.
+
+    Each process spills to its own file, `spill_path` suffixed with its pid, since the
+    uvicorn workers and the consumer share the configured path. The files left by
+    processes that are gone are claimed, by an atomic rename, by the next process
+    draining its own. Spilled lines that cannot be parsed, such as one cut by a crash, are
+    moved to `spill_path` suffixed with `.quarantine` instead of being sent.
+    """
+
+    def __init__(self, url: str, user: Optional[str] = None, password: Optional[str] = None, enabled: bool = True,
+                 batch_size: int = 100, flush_interval: float = 1, pool_size: int = 2, timeout: float = 10,
+                 max_retries: int = 5, retry_backoff: float = 0.5, max_pending: int = 10000,
+                 spill_path: str = 'n8_spill.ndjson', spill_max_bytes: int = 64 * 2**20):
+        self.url = url
+        self.auth = (user, password) if user else None
+        self.enabled = enabled and bool(url)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_pending = max_pending
+        self.spill_path = spill_path
+        self.spill_max_bytes = spill_max_bytes
+        self._session = None
+        self._pending: Deque[dict] = deque()
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.published = 0
+        self.delivered = 0
+        self.batches = 0
+        self.retries = 0
+        self.failures = 0
+        self.rejected = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.quarantined = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+
+    @property
+    def session(self):
+        # requests is only needed once a webhook is configured
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.auth = self.auth
+            self._session = session
+        return self._session
+
+    def publish(self, event_type: str, product: dict):
+        """
+        Queue a product event for the webhook. Safe to call from any thread; never waits on N8.
+
+        Args:
+        - event_type (str): One of "created", "updated", "deleted" or "reset".
+        - product (dict): Product data, or `{"id": None, "count": n}` for a reset.
+        """
+        if not self.enabled:
+            return
+        event = {"type": event_type, "product": product, "timestamp": time.time()}
+        overflow = None
+        with self._lock:
+            self._pending.append(event)
+            self.published += 1
+            if len(self._pending) > self.max_pending:
+                overflow = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            full = len(self._pending) >= self.batch_size
+            if self._thread is None and not self._stop.is_set():
+                self._thread = threading.Thread(target=self._run, name="n8-webhook", daemon=True)
+                self._thread.start()
+        if overflow:
+            self._spill(overflow)
+        if full:
+            self._wakeup.set()
+
+    def _take(self) -> List[dict]:
+        with self._lock:
+            return [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+
+    def _run(self):
+        # Batches left on disk by a previous run go first
+        self._step(self._drain_spill)
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._step(self.flush)
+
+    def _step(self, fn: Callable[[], int]):
+        # An unexpected error must not end the delivery thread; the events stay queued or on disk
+        try:
+            fn()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error delivering N8 events: {str(e)}")
+
+    def flush(self, retry: bool = True) -> int:
+        """
+        Send every queued event now, spilling the batches that fail.
+
+        Args:
+        - retry (bool): Retry failed calls with backoff before spilling.
+
+        Returns:
+        - int: Number of events delivered.
+        """
+        delivered = 0
+        while True:
+            batch = self._take()
+            if not batch:
+                break
+            if self._deliver(batch, retry):
+                delivered += len(batch)
+            else:
+                self._spill(batch)
+                # N8 is unreachable: the rest of the queue waits for the next flush
+                return delivered
+        if delivered and retry:
+            delivered += self._drain_spill()
+        return delivered
+
+    def _send(self, batch: List[dict]) -> Optional[bool]:
+        """
+        POST a batch once. True if delivered, False if it should be retried, None if N8 rejected it.
+        """
+        import requests
+        try:
+            response = self.session.post(self.url, data=json.dumps({"events": batch}),
+                                         headers={"Content-Type": "application/json"},
+                                         timeout=(CONNECT_TIMEOUT, self.timeout))
+        except requests.RequestException as e:
+            logger.warning(f"N8 webhook call failed: {str(e)}")
+            return False
+        with response:
+            if response.status_code < 300:
+                return True
+            if response.status_code == 429 or response.status_code >= 500:
+                logger.warning(f"N8 webhook answered {response.status_code}.")
+                return False
+            logger.error(f"N8 webhook rejected {len(batch)} events with {response.status_code}: {response.text[:200]}")
+            return None
+
+    def _deliver(self, batch: List[dict], retry: bool = True) -> bool:
+        """
+        Send a batch, retrying with exponential backoff and jitter.
+
+        Returns:
+        - bool: False if it could not be sent and should be kept; True once sent or rejected by N8.
+        """
+        attempts = self.max_retries + 1 if retry else 1
+        for attempt in range(attempts):
+            if attempt:
+                self.retries += 1
+                # Wakes up early on close, which gives up retrying
+                if self._stop.wait(self.retry_backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)):
+                    break
+            result = self._send(batch)
+            if result is None:
+                self.rejected += len(batch)
+                return True
+            if result:
+                now = time.time()
+                latencies = [now - event["timestamp"] for event in batch]
+                self.delivered += len(batch)
+                self.batches += 1
+                self.latency_total += sum(latencies)
+                self.last_latency = max(latencies)
+                self.max_latency = max(self.max_latency, self.last_latency)
+                return True
+            self.failures += 1
+        return False
+
+    def _spill_file(self, suffix: str = "") -> str:
+        # Resolved on every call, since the workers may be forked after the adapter is created
+        return f"{self.spill_path}.{os.getpid()}{suffix}"
+
+    @staticmethod
+    def _append(path: str, data: bytes):
+        with open(path, "ab+") as spill:
+            # A line cut by a crash mid-write must not swallow the next one
+            if spill.tell():
+                spill.seek(-1, os.SEEK_END)
+                if spill.read(1) != b"\n":
+                    data = b"\n" + data
+            spill.write(data)
+
+    def _spill(self, batch: List[dict]):
+        line = (json.dumps({"events": batch}) + "\n").encode()
+        path = self._spill_file()
+        with self._spill_lock:
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            if size + len(line) > self.spill_max_bytes:
+                self.dropped += len(batch)
+                logger.error(f"N8 spill file full, dropping {len(batch)} events.")
+                return
+            self._append(path, line)
+            self.spilled += len(batch)
+
+    def _quarantine(self, line: bytes, error: Exception):
+        logger.error(f"Unreadable N8 spill line moved to quarantine: {str(error)}")
+        with self._spill_lock:
+            self._append(self.spill_path + ".quarantine", line)
+            self.quarantined += 1
+
+    def _merge(self, path: str):
+        # Appends a claimed file to the spill file of this process
+        with self._spill_lock:
+            with open(path, "rb") as claimed:
+                data = claimed.read()
+            if data.strip():
+                self._append(self._spill_file(), data if data.endswith(b"\n") else data + b"\n")
+            os.remove(path)
+
+    def _adopt_orphans(self):
+        """
+        Claim the spill files of the processes that are gone, into the spill file of this one.
+        """
+        claim = self._spill_file(".claim")
+        if os.path.exists(claim):
+            self._merge(claim)
+        directory = os.path.dirname(self.spill_path) or "."
+        pattern = re.compile(re.escape(os.path.basename(self.spill_path)) + r"(?:\.(\d+))?(?:\.draining|\.claim)?$")
+        for entry in sorted(os.listdir(directory)):
+            match = pattern.match(entry)
+            if match is None or (match.group(1) and _pid_alive(int(match.group(1)))):
+                continue
+            try:
+                # Only one process wins the rename of an orphan
+                os.rename(os.path.join(directory, entry), claim)
+            except FileNotFoundError:
+                continue
+            logger.info(f"Claimed N8 spill file {entry}.")
+            self._merge(claim)
+
+    def _drain_spill(self) -> int:
+        """
+        Send the spilled batches, oldest first. Those not sent are written back in front of
+        the batches spilled meanwhile.
+
+        Returns:
+        - int: Number of events delivered.
+        """
+        self._adopt_orphans()
+        path = self._spill_file()
+        draining = self._spill_file(".draining")
+        with self._spill_lock:
+            # A file left over from an interrupted drain is older than the spill file
+            if not os.path.exists(draining):
+                if not os.path.exists(path):
+                    return 0
+                os.replace(path, draining)
+        with open(draining, "rb") as spill:
+            lines = [line if line.endswith(b"\n") else line + b"\n" for line in spill if line.strip()]
+        delivered = 0
+        for sent, line in enumerate(lines):
+            try:
+                batch = json.loads(line)["events"]
+            except (ValueError, KeyError, TypeError) as e:
+                self._quarantine(line, e)
+                continue
+            if self._stop.is_set() or not self._deliver(batch, retry=False):
+                with self._spill_lock:
+                    newer = b""
+                    if os.path.exists(path):
+                        with open(path, "rb") as spill:
+                            newer = spill.read()
+                    with open(path, "wb") as spill:
+                        spill.writelines(lines[sent:])
+                        spill.write(newer)
+                    os.remove(draining)
+                return delivered
+            delivered += len(batch)
+        os.remove(draining)
+        return delivered
+
+    def close(self):
+        """
+        Stop the delivery thread and send what is still queued once, spilling it if N8 does not answer.
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush(retry=False)
+        self._stop.clear()
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def stats(self) -> dict:
+        """
+        Current delivery metrics.
+        """
+        with self._lock:
+            pending = len(self._pending)
+        with self._spill_lock:
+            spill_bytes = sum(os.path.getsize(path) for path in (self._spill_file(), self._spill_file(".draining"))
+                              if os.path.exists(path))
+        return {
+            "enabled": self.enabled,
+            "published": self.published,
+            "pending": pending,
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed_calls": self.failures,
+            "rejected": self.rejected,
+            "spilled": self.spilled,
+            "spill_bytes": spill_bytes,
+            "dropped": self.dropped,
+            "quarantined": self.quarantined,
+            "errors": self.errors,
+            "mean_latency_seconds": round(self.latency_total / self.delivered, 3) if self.delivered else 0.0,
+            "last_latency_seconds": round(self.last_latency, 3),
+            "max_latency_seconds": round(self.max_latency, 3),
+        }
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running under another user
+        return True
+    return True
+
+
+def webhook_url(base: Optional[str], path: str) -> str:
+    """
+    URL of a webhook from the N8 base address, with or without a scheme, and the webhook path.
+    """
+    if not base:
+        return ''
+    base = base if "://" in base else f"http://{base}"
+    return base.rstrip("/") + "/" + path.lstrip("/")
+
+
+# Delivery of product changes to the N8 automations, shared by the whole worker. Replicas
+# never send: the changes they apply were already sent by the node that made them
+n8_webhook = N8Webhook(
+    webhook_url(N8_IP, N8_WEBHOOK_PATH),
+    N8_USER,
+    N8_PASSWORD,
+    N8_WEBHOOK_ENABLED and not REPLICA_PRIMARY_URL,
+    N8_BATCH_SIZE,
+    N8_FLUSH_INTERVAL,
+    N8_POOL_SIZE,
+    N8_TIMEOUT,
+    N8_MAX_RETRIES,
+    N8_RETRY_BACKOFF,
+    N8_MAX_PENDING,
+    N8_SPILL_PATH,
+    N8_SPILL_MAX_BYTES,
+)
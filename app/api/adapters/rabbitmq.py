@@ -0,0 +1,142 @@
+import collections
+import queue
+import time
+from typing import Dict, List, Optional
+
+import pika
+
+
+class Message:
+    """
+    A message received from a broker, with what is needed to acknowledge it.
+    """
+    __slots__ = ("body", "delivery_tag", "timestamp")
+
+    def __init__(self, body: bytes, delivery_tag: int, timestamp: float):
+        self.body = body
+        self.delivery_tag = delivery_tag
+        self.timestamp = timestamp
+
+
+class RabbitMQBroker:
+    """
+    Adapter for consuming a RabbitMQ queue with manual acknowledgements.
+
+    Deliveries are acknowledged with `multiple=True`, so acking the last message of a
+    batch acknowledges the whole batch. The prefetch count bounds how many unacknowledged
+    messages the broker hands to this consumer, and so the largest possible batch.
+    """
+
+    def __init__(self, host: str, user: str, password: str, queue_name: str, prefetch: int = 1000):
+        self.queue_name = queue_name
+        self.prefetch = prefetch
+        self._parameters = pika.ConnectionParameters(host=host, credentials=pika.PlainCredentials(user, password))
+        self._connection = None
+        self._channel = None
+        self._pending = collections.deque()
+
+    def connect(self):
+        """
+        Open the connection and start consuming the queue.
+        """
+        self._connection = pika.BlockingConnection(self._parameters)
+        self._channel = self._connection.channel()
+        self._channel.queue_declare(queue=self.queue_name, durable=True)
+        self._channel.basic_qos(prefetch_count=self.prefetch)
+        self._channel.basic_consume(self.queue_name, self._on_message)
+
+    def _on_message(self, channel, method, properties, body: bytes):
+        # Publishers set the AMQP timestamp; fall back to the reception time
+        timestamp = properties.timestamp if properties and properties.timestamp else time.time()
+        self._pending.append(Message(body, method.delivery_tag, timestamp))
+
+    def get(self, timeout: float) -> Optional[Message]:
+        """
+        Wait for the next message.
+
+        Args:
+        - timeout (float): Seconds to wait.
+
+        Returns:
+        - Optional[Message]: The message, or None if none arrived in time.
+        """
+        deadline = time.monotonic() + timeout
+        while not self._pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            self._connection.process_data_events(time_limit=remaining)
+        return self._pending.popleft()
+
+    def ack(self, delivery_tag: int, multiple: bool = True):
+        """
+        Acknowledge every message up to and including `delivery_tag`, or only that one.
+        """
+        self._channel.basic_ack(delivery_tag=delivery_tag, multiple=multiple)
+
+    def nack(self, delivery_tag: int, multiple: bool = True, requeue: bool = True):
+        """
+        Return every unacknowledged message up to and including `delivery_tag`, or only that
+        one, to the queue. Without `requeue` they are dead-lettered instead: routed to the
+        queue's dead letter exchange if it has one, dropped otherwise.
+        """
+        self._channel.basic_nack(delivery_tag=delivery_tag, multiple=multiple, requeue=requeue)
+
+    def close(self):
+        """
+        Stop consuming and close the connection.
+        """
+        if self._connection is not None and self._connection.is_open:
+            self._connection.close()
+        self._pending.clear()
+
+
+class InMemoryBroker:
+    """
+    In-process stand-in for `RabbitMQBroker`, with the same interface and acknowledgement semantics.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._unacked: Dict[int, Message] = {}
+        self._next_tag = 1
+        self.acked: List[bytes] = []
+        self.dead_lettered: List[bytes] = []
+
+    def connect(self):
+        pass
+
+    def publish(self, body: bytes, timestamp: Optional[float] = None):
+        self._queue.put((body, timestamp if timestamp is not None else time.time()))
+
+    def get(self, timeout: float) -> Optional[Message]:
+        try:
+            body, timestamp = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        message = Message(body, self._next_tag, timestamp)
+        self._unacked[message.delivery_tag] = message
+        self._next_tag += 1
+        return message
+
+    def _settle(self, delivery_tag: int, multiple: bool) -> List[Message]:
+        tags = sorted(tag for tag in self._unacked if tag <= delivery_tag) if multiple else [delivery_tag]
+        return [self._unacked.pop(tag) for tag in tags]
+
+    def ack(self, delivery_tag: int, multiple: bool = True):
+        for message in self._settle(delivery_tag, multiple):
+            self.acked.append(message.body)
+
+    def nack(self, delivery_tag: int, multiple: bool = True, requeue: bool = True):
+        for message in self._settle(delivery_tag, multiple):
+            if requeue:
+                self._queue.put((message.body, message.timestamp))
+            else:
+                self.dead_lettered.append(message.body)
+
+    @property
+    def unacked(self) -> int:
+        return len(self._unacked)
+
+    def close(self):
+        pass
@@ -1,18 +1,28 @@
-import jwt
 from datetime import datetime, timedelta
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
-from passlib.context import CryptContext
 from typing import Union
 
 # Importing JWT_SECRET from the configuration module
 from app.api.config.env import JWT_SECRET
 
 class AuthenticationHandler:
-    """Handles user authentication operations."""
+    """Handles user authentication operations.
+
+    PyJWT and passlib are imported on first use, so workers that serve no authenticated
+    route never load them.
+    """
     
     security = HTTPBearer()
-    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    _pwd_context = None
+
+    @property
+    def pwd_context(self):
+        """bcrypt context, built on first use."""
+        if AuthenticationHandler._pwd_context is None:
+            from passlib.context import CryptContext
+            AuthenticationHandler._pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        return AuthenticationHandler._pwd_context
 
     def hash_password(self, password: str) -> str:
         """Hashes the password using bcrypt.
@@ -46,6 +56,7 @@ class AuthenticationHandler:
         Returns:
         - str: JWT token.
         """
+        import jwt
         expiration = datetime.utcnow() + timedelta(days=2)
         payload = {
             'exp': expiration,
@@ -66,6 +77,7 @@ class AuthenticationHandler:
         Raises:
         - HTTPException: If token is expired or invalid.
         """
+        import jwt
         try:
             payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
             return payload['user']
@@ -88,5 +100,22 @@ class AuthenticationHandler:
         """
         return self.decode_token(auth_credentials.credentials)
 
+    def require_admin(self, auth_credentials: HTTPAuthorizationCredentials = Security(security)) -> dict:
+        """Token authentication restricted to users with the admin role.
+        
+        Args:
+        - auth_credentials (HTTPAuthorizationCredentials): HTTP authorization credentials.
+        
+        Returns:
+        - dict: User dict if authentication is successful.
+        
+        Raises:
+        - HTTPException: If token is expired or invalid, or 403 if the user is not an admin.
+        """
+        user = self.decode_token(auth_credentials.credentials)
+        if not isinstance(user, dict) or user.get('role') != 'admin':
+            raise HTTPException(status_code=403, detail='Admin role required')
+        return user
+
 # Instantiate the authentication handler for further use
 auth_handler = AuthenticationHandler()
\ No newline at end of file
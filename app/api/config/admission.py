@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import itertools
+import re
+import time
+from typing import List, Optional, Pattern, Tuple
+
+# Importing the admission control configuration from the configuration module
+from app.api.config.deadlines import remaining
+from app.api.config.env import (ADMISSION_INITIAL_LIMIT, ADMISSION_MIN_LIMIT, ADMISSION_MAX_LIMIT,
+                                ADMISSION_TARGET_LATENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT,
+                                ADMISSION_RETRY_AFTER)
+
+# Route priorities, lower is more important
+READ, WRITE, BULK = 0, 1, 2
+
+# (method or None for any, path pattern, priority or None to bypass admission, whether latency is sampled).
+# Long-lived streams and the admin profiling routes, which last as long as the profile
+# they take, bypass admission; bulk transfers are admitted last and their duration
+# says nothing about database health, so it does not drive the limit.
+DEFAULT_ROUTE_CLASSES: List[Tuple[Optional[str], Pattern, Optional[int], bool]] = [
+    ("GET", re.compile(r"/products/stream$"), None, False),
+    (None, re.compile(r"/metrics/$"), None, False),
+    (None, re.compile(r"/admin/"), None, False),
+    (None, re.compile(r"/products/(export|import)$"), BULK, False),
+    ("GET", re.compile(r"/products"), READ, True),
+    (None, re.compile(r"/items/:(batchCreate|bulkWrite)$"), BULK, True),
+    ("GET", re.compile(r"/items"), READ, True),
+]
+
+
+class AIMDLimit:
+    """
+    Concurrency limit adapted to observed latency, additive increase / multiplicative decrease.
+
+    Every request that completes under the target latency raises the limit by 1/limit,
+    that is about one slot per limit's worth of requests; a slower one cuts it by
+    `backoff`, at most once per round trip: slow requests that started before the last
+    cut ran under the previous limit and are ignored, so a burst of them is one cut. The
+    limit thus probes upward while the database keeps up and drops fast when it slows down.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float, target_latency: float, backoff: float = 0.9):
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self._last_decrease = float("-inf")
+
+    def on_sample(self, latency: float):
+        if latency <= self.target_latency:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            return
+        now = time.monotonic()
+        if now - latency >= self._last_decrease:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+            self._last_decrease = now
+
+
+class AdmissionController:
+    """
+    Admits requests up to the adaptive limit and queues a bounded number of the rest.
+
+    Queued requests are admitted by priority, then arrival order. When the queue is full a
+    newcomer evicts the least important queued request if it is more important itself,
+    otherwise it is shed. Requests that wait longer than `queue_timeout`, or than their
+    remaining deadline, are shed as well.
+    Runs entirely on the event loop, so it needs no locks.
+    """
+
+    def __init__(self, limit: AIMDLimit, max_queue: int, queue_timeout: float):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.inflight = 0
+        self._queue: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self.admitted = 0
+        self.shed = 0
+        # Counts of the current and the previous 10 second window, (admitted, shed)
+        self._window_started = time.monotonic()
+        self._window = [0, 0]
+        self._previous_window = [0, 0]
+
+    async def acquire(self, priority: int) -> bool:
+        """
+        Wait for a slot.
+
+        Args:
+        - priority (int): Priority of the request, lower is more important.
+
+        Returns:
+        - bool: True once admitted, False if the request was shed.
+        """
+        if self.inflight < int(self.limit.limit) and not self._queue:
+            self.inflight += 1
+            return self._record(True)
+
+        if len(self._queue) >= self.max_queue:
+            worst = max(self._queue, default=None)
+            if worst is None or worst[0] <= priority:
+                return self._record(False)
+            self._queue.remove(worst)
+            heapq.heapify(self._queue)
+            worst[2].set_result(False)
+
+        waiter = asyncio.get_event_loop().create_future()
+        entry = (priority, next(self._sequence), waiter)
+        heapq.heappush(self._queue, entry)
+        try:
+            budget = remaining()
+            timeout = self.queue_timeout if budget is None else max(min(self.queue_timeout, budget), 0)
+            admitted = await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                admitted = waiter.result()
+            else:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                admitted = False
+        except asyncio.CancelledError:
+            # The client went away while queued: its entry must not take a slot later
+            if not waiter.done():
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                waiter.cancel()
+            elif waiter.result():
+                # Admitted just before the cancellation; the slot goes to the next request
+                self.release(None)
+            raise
+        return self._record(admitted)
+
+    def release(self, latency: Optional[float]):
+        """
+        Free a slot and hand it to the most important queued request.
+
+        Args:
+        - latency (Optional[float]): Duration of the finished request, or None to leave the limit alone.
+        """
+        self.inflight -= 1
+        if latency is not None:
+            self.limit.on_sample(latency)
+        while self._queue and self.inflight < int(self.limit.limit):
+            _, _, waiter = heapq.heappop(self._queue)
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(True)
+
+    def _record(self, admitted: bool) -> bool:
+        now = time.monotonic()
+        if now - self._window_started >= 10:
+            self._previous_window = self._window if now - self._window_started < 20 else [0, 0]
+            self._window_started, self._window = now, [0, 0]
+        if admitted:
+            self.admitted += 1
+            self._window[0] += 1
+        else:
+            self.shed += 1
+            self._window[1] += 1
+        return admitted
+
+    @property
+    def shed_rate(self) -> float:
+        """
+        Fraction of requests shed over the last 10 to 20 seconds.
+        """
+        admitted = self._window[0] + self._previous_window[0]
+        shed = self._window[1] + self._previous_window[1]
+        return shed / (admitted + shed) if admitted + shed else 0.0
+
+    def stats(self) -> dict:
+        """
+        Current admission metrics.
+        """
+        return {
+            "limit": round(self.limit.limit, 2),
+            "inflight": self.inflight,
+            "queued": len(self._queue),
+            "admitted": self.admitted,
+            "shed": self.shed,
+            "shed_rate": round(self.shed_rate, 4),
+        }
+
+
+class AdmissionControlMiddleware:
+    """
+    Pure ASGI middleware that sheds load with a fast 503 and `Retry-After` instead of
+    letting requests pile up in the threadpool until clients time out.
+    """
+
+    def __init__(self, app, controller: AdmissionController, route_classes=DEFAULT_ROUTE_CLASSES,
+                 retry_after: int = ADMISSION_RETRY_AFTER):
+        self.app = app
+        self.controller = controller
+        self.route_classes = route_classes
+        self._rejection_headers = [
+            (b"content-type", b"application/json"),
+            (b"retry-after", str(retry_after).encode()),
+        ]
+        self._rejection_body = b'{"detail":"Server overloaded, retry later."}'
+
+    def classify(self, method: str, path: str) -> Tuple[Optional[int], bool]:
+        for route_method, pattern, priority, sampled in self.route_classes:
+            if (route_method is None or route_method == method) and pattern.search(path):
+                return priority, sampled
+        return WRITE, True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        priority, sampled = self.classify(scope["method"], scope["path"])
+        if priority is None:
+            await self.app(scope, receive, send)
+            return
+        if not await self.controller.acquire(priority):
+            await send({"type": "http.response.start", "status": 503, "headers": self._rejection_headers})
+            await send({"type": "http.response.body", "body": self._rejection_body})
+            return
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.monotonic() - started if sampled else None)
+
+
+admission_controller = AdmissionController(
+    AIMDLimit(ADMISSION_INITIAL_LIMIT, ADMISSION_MIN_LIMIT, ADMISSION_MAX_LIMIT, ADMISSION_TARGET_LATENCY),
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+)
@@ -0,0 +1,309 @@
+import logging
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Importing the analytics configuration from the configuration module
+from app.api.config.env import ANALYTICS_MAX_AGE
+from app.api.config.deadlines import no_deadline
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogSnapshot:
+    """
+    Columnar in-memory copy of the products table for price analytics.
+
+    IDs and prices live in NumPy arrays, so aggregates are computed in vectorized form
+    without touching MySQL, and names are interned strings in a parallel list. The
+    snapshot is loaded on first use and then kept current incrementally by `apply`,
+    which the write functions in `app.api.database` call for every committed change.
+    Writes that arrive while it is loading are replayed once the load finishes.
+
+    `apply` only sees the writes of this worker. Those of other workers and of the
+    consumer are caught by reloading the snapshot once it is older than `max_age`
+    seconds: the query that finds it too old is still answered from it, and the reload
+    runs in a background thread, replacing it when done.
+    """
+
+    def __init__(self, initial_capacity: int = 1024, max_age: float = 0,
+                 load_batches: Optional[Callable[[], Iterable[Sequence[tuple]]]] = None):
+        self._ids = np.empty(initial_capacity, dtype=np.int64)
+        self._prices = np.empty(initial_capacity, dtype=np.float64)
+        self._names: List[str] = []
+        self._index: Dict[int, int] = {}
+        self._size = 0
+        self._state = "empty"  # empty -> loading -> loaded
+        self._pending: List[Tuple[str, dict]] = []
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._refreshing = False
+        self.max_age = max_age
+        self._load_batches = load_batches
+        self.loaded_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self.applied = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    # Maintenance
+
+    def load_batches(self) -> Iterable[Sequence[tuple]]:
+        if self._load_batches is None:
+            # Imported here because app.api.database applies its writes to this module
+            from app.api.database import iter_product_batches
+            self._load_batches = iter_product_batches
+        return self._load_batches()
+
+    def load(self, batches: Iterable[Sequence[tuple]]):
+        """
+        Rebuild the snapshot from (id, name, description, price) row batches.
+
+        Args:
+        - batches (Iterable[Sequence[tuple]]): Rows of the whole catalog.
+        """
+        started = time.perf_counter()
+        ids, prices, names = [], [], []
+        for batch in batches:
+            for row in batch:
+                ids.append(row[0])
+                names.append(sys.intern(row[1]) if row[1] is not None else "")
+                prices.append(np.nan if row[3] is None else row[3])
+
+        with self._lock:
+            capacity = max(len(ids) * 2, 1024)
+            self._ids = np.empty(capacity, dtype=np.int64)
+            self._prices = np.empty(capacity, dtype=np.float64)
+            self._ids[:len(ids)] = ids
+            self._prices[:len(prices)] = prices
+            self._names = names
+            self._index = {product_id: position for position, product_id in enumerate(ids)}
+            self._size = len(ids)
+            pending, self._pending = self._pending, []
+            # A reset replayed here marks the snapshot for another load
+            self._state = "loaded"
+            for event_type, product in pending:
+                self._apply(event_type, product)
+            self.loaded_at = time.time()
+            self.load_seconds = time.perf_counter() - started
+
+    def ensure_loaded(self):
+        """
+        Load the snapshot from the database if it is not loaded yet, and start reloading it
+        in the background if it is older than `max_age`.
+
+        The first load scans the whole catalog and is shared by every later query, so it
+        runs without the deadline of the request that triggers it.
+        """
+        if self._state == "loaded":
+            if self.max_age and time.time() - self.loaded_at >= self.max_age:
+                self._start_refresh()
+            return
+        with self._load_lock:
+            if self._state == "loaded":
+                return
+            with self._lock:
+                self._state = "loading"
+            try:
+                with no_deadline():
+                    self.load(self.load_batches())
+            except Exception:
+                with self._lock:
+                    self._state, self._pending = "empty", []
+                raise
+
+    def _start_refresh(self):
+        with self._lock:
+            if self._refreshing or self._state != "loaded":
+                return
+            self._refreshing = True
+            self._pending = []
+        threading.Thread(target=self._refresh, name="catalog-snapshot-refresh", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            with self._load_lock:
+                self.load(self.load_batches())
+            self.refreshes += 1
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.error(f"Error reloading the analytics snapshot: {str(e)}")
+            with self._lock:
+                self._pending = []
+                # Retried on the next query after max_age
+                self.loaded_at = time.time()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def apply(self, event_type: str, product: dict):
+        """
+        Apply a committed product change. Safe to call from any thread.
+
+        Args:
+        - event_type (str): One of "created", "updated", "deleted" or "reset".
+        - product (dict): Product data; only `id` is needed for deletions.
+        """
+        with self._lock:
+            if self._state == "loading":
+                self._pending.append((event_type, product))
+            elif self._state == "loaded":
+                self._apply(event_type, product)
+                if self._refreshing:
+                    # Replayed on the reloaded snapshot, which may have been read before this change
+                    self._pending.append((event_type, product))
+
+    def _apply(self, event_type: str, product: dict):
+        self.applied += 1
+        if event_type == "reset":
+            # Changes that were not announced one by one; reload on next use
+            self._state = "empty"
+            return
+        product_id = product["id"]
+        position = self._index.get(product_id)
+        if event_type == "deleted":
+            if position is not None:
+                self._remove(position)
+            return
+        if position is None:
+            position = self._append(product_id)
+        if "price" in product:
+            self._prices[position] = np.nan if product["price"] is None else product["price"]
+        if product.get("name") is not None:
+            self._names[position] = sys.intern(product["name"])
+
+    def _append(self, product_id: int) -> int:
+        if self._size == len(self._ids):
+            self._ids = np.resize(self._ids, self._size * 2)
+            self._prices = np.resize(self._prices, self._size * 2)
+        position = self._size
+        self._ids[position] = product_id
+        self._prices[position] = np.nan
+        self._names.append("")
+        self._index[product_id] = position
+        self._size += 1
+        return position
+
+    def _remove(self, position: int):
+        # Swap the last product into the freed slot to keep the arrays dense
+        last = self._size - 1
+        del self._index[int(self._ids[position])]
+        if position != last:
+            self._ids[position] = self._ids[last]
+            self._prices[position] = self._prices[last]
+            self._names[position] = self._names[last]
+            self._index[int(self._ids[position])] = position
+        self._names.pop()
+        self._size = last
+
+    # Queries
+
+    def _priced(self) -> np.ndarray:
+        # Boolean indexing copies, so the result is safe to use outside the lock
+        self.ensure_loaded()
+        with self._lock:
+            prices = self._prices[:self._size]
+            return prices[~np.isnan(prices)]
+
+    def summary(self) -> dict:
+        """
+        Count, minimum, maximum, mean, standard deviation and total of the prices.
+        """
+        prices = self._priced()
+        if not len(prices):
+            return {"count": 0, "min": None, "max": None, "mean": None, "std": None, "total": 0.0}
+        return {
+            "count": int(prices.size),
+            "min": float(prices.min()),
+            "max": float(prices.max()),
+            "mean": float(prices.mean()),
+            "std": float(prices.std()),
+            "total": float(prices.sum()),
+        }
+
+    def percentiles(self, quantiles: Sequence[float]) -> Dict[str, Optional[float]]:
+        """
+        Price percentiles.
+
+        Args:
+        - quantiles (Sequence[float]): Percentiles to compute, between 0 and 100.
+
+        Returns:
+        - Dict[str, Optional[float]]: Price for each requested percentile.
+        """
+        prices = self._priced()
+        if not len(prices):
+            return {f"{q:g}": None for q in quantiles}
+        values = np.percentile(prices, quantiles)
+        return {f"{q:g}": float(value) for q, value in zip(quantiles, values)}
+
+    def histogram(self, buckets: int, low: Optional[float] = None, high: Optional[float] = None) -> dict:
+        """
+        Number of products per price bucket.
+
+        Args:
+        - buckets (int): Number of equal-width buckets.
+        - low (Optional[float]): Lower edge. Defaults to the minimum price.
+        - high (Optional[float]): Upper edge. Defaults to the maximum price.
+
+        Returns:
+        - dict: `edges` (buckets + 1 values) and `counts` (one per bucket).
+        """
+        prices = self._priced()
+        if not len(prices) and (low is None or high is None):
+            return {"edges": [], "counts": []}
+        low = float(prices.min()) if low is None else low
+        high = float(prices.max()) if high is None else high
+        counts, edges = np.histogram(prices, bins=buckets, range=(low, high))
+        return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+    def extremes(self, n: int) -> dict:
+        """
+        The `n` cheapest and most expensive products.
+
+        Args:
+        - n (int): Number of products on each side.
+
+        Returns:
+        - dict: `cheapest` and `most_expensive` lists of products with their ID, name and price.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            prices = self._prices[:self._size]
+            priced = np.flatnonzero(~np.isnan(prices))
+            values = prices[priced]
+            n = min(n, values.size)
+            if not n:
+                return {"cheapest": [], "most_expensive": []}
+            # Partial selection keeps this O(size) instead of sorting every price
+            cheapest = np.argpartition(values, n - 1)[:n]
+            cheapest = cheapest[np.argsort(values[cheapest], kind="stable")]
+            expensive = np.argpartition(values, values.size - n)[values.size - n:]
+            expensive = expensive[np.argsort(-values[expensive], kind="stable")]
+            pick = lambda positions: [
+                {"id": int(self._ids[p]), "name": self._names[p], "price": float(prices[p])} for p in priced[positions]
+            ]
+            return {"cheapest": pick(cheapest), "most_expensive": pick(expensive)}
+
+    def stats(self) -> dict:
+        """
+        Current snapshot metrics.
+        """
+        return {
+            "state": self._state,
+            "products": self._size,
+            "applied_changes": self.applied,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+            "age_seconds": round(time.time() - self.loaded_at, 3) if self.loaded_at else None,
+            "max_age_seconds": self.max_age,
+            "refreshing": self._refreshing,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+
+catalog_snapshot = CatalogSnapshot(max_age=ANALYTICS_MAX_AGE)
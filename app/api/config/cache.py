@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+# Importing the cache configuration from the configuration module
+from app.api.config.env import QUERY_CACHE_MAX_BYTES, QUERY_CACHE_TTL
+
+
+class ResultCache:
+    """
+    LRU cache of encoded query results, bounded by their total size in bytes.
+
+    Entries are keyed by the normalized query plus the catalog generation, a counter that
+    every product write bumps. Invalidation is therefore O(1): after a bump no old entry can
+    be hit again, and the stale entries simply age out of the LRU. The generation is local to
+    the worker, so entries also expire after `ttl` seconds to bound how long writes made by
+    other workers stay invisible.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.generation = 0
+        self._entries: "OrderedDict[Tuple[int, Hashable], Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def bump(self):
+        """
+        Invalidate every cached result. Called after each committed product write.
+        """
+        with self._lock:
+            self.generation += 1
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """
+        Look up the encoded result of a query in the current generation.
+
+        Args:
+        - key (Hashable): Normalized query.
+
+        Returns:
+        - Optional[bytes]: Encoded result, or None on a miss.
+        """
+        with self._lock:
+            full_key = (self.generation, key)
+            entry = self._entries.get(full_key)
+            if entry is None or entry[0] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: bytes, generation: int):
+        """
+        Store the encoded result of a query.
+
+        Args:
+        - key (Hashable): Normalized query.
+        - value (bytes): Encoded result.
+        - generation (int): Generation read before the query ran. If a write happened since,
+          the result may be stale and is not stored.
+        """
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            full_key = (generation, key)
+            previous = self._entries.pop(full_key, None)
+            if previous is not None:
+                self._size -= len(previous[1])
+            self._entries[full_key] = (time.monotonic() + self.ttl, value)
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        """
+        Current cache metrics.
+        """
+        return {
+            "generation": self.generation,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+query_cache = ResultCache(QUERY_CACHE_MAX_BYTES, QUERY_CACHE_TTL)
@@ -0,0 +1,126 @@
+from typing import FrozenSet, List, Sequence, Tuple
+
+# Importing the CORS configuration from the configuration module
+from app.api.config.env import (CORS_ORIGINS, CORS_ALLOW_METHODS, CORS_ALLOW_HEADERS, CORS_EXPOSE_HEADERS,
+                                CORS_ALLOW_CREDENTIALS, CORS_MAX_AGE)
+
+Headers = List[Tuple[bytes, bytes]]
+
+
+def split_setting(value: str) -> List[str]:
+    """
+    Split a comma-separated setting into its non-empty, stripped parts.
+    """
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+class CORSMiddleware:
+    """
+    Pure ASGI CORS middleware with the policy fixed at startup.
+
+    Every response header that does not depend on the request is encoded once, so a
+    preflight is answered without building a Response object and a simple request only
+    gets a few precomputed headers appended. Requests without an `Origin` header are
+    passed through untouched. The preflight answer carries `Access-Control-Max-Age`, so
+    browsers cache it instead of sending an OPTIONS request before every write.
+    """
+
+    def __init__(self, app, allow_origins: Sequence[str], allow_methods: Sequence[str], allow_headers: Sequence[str],
+                 expose_headers: Sequence[str] = (), allow_credentials: bool = False, max_age: int = 600):
+        self.app = app
+        self.allow_any_origin = "*" in allow_origins
+        self.allow_origins: FrozenSet[bytes] = frozenset(origin.rstrip('/').encode() for origin in allow_origins)
+        self.allow_methods: FrozenSet[bytes] = frozenset(method.upper().encode() for method in allow_methods)
+        self.allow_headers: FrozenSet[str] = frozenset(header.lower() for header in allow_headers)
+
+        # A wildcard cannot be combined with credentials, so the origin is echoed instead
+        self.echo_origin = allow_credentials or not self.allow_any_origin
+        common: Headers = []
+        if allow_credentials:
+            common.append((b"access-control-allow-credentials", b"true"))
+        if self.echo_origin:
+            common.append((b"vary", b"Origin"))
+        self.simple_headers: Headers = common + (
+            [(b"access-control-expose-headers", ", ".join(expose_headers).encode())] if expose_headers else []
+        )
+        self.preflight_headers: Headers = common + [
+            (b"access-control-allow-methods", ", ".join(sorted(method.upper() for method in allow_methods)).encode()),
+            (b"access-control-allow-headers", ", ".join(sorted(self.allow_headers)).encode()),
+            (b"access-control-max-age", str(max_age).encode()),
+            (b"content-length", b"0"),
+        ]
+        self.rejected_body = b"Disallowed CORS preflight."
+        self.rejected_headers: Headers = [
+            (b"content-type", b"text/plain; charset=utf-8"),
+            (b"content-length", str(len(self.rejected_body)).encode()),
+        ]
+
+    def origin_allowed(self, origin: bytes) -> bool:
+        return self.allow_any_origin or origin in self.allow_origins
+
+    def allow_origin_header(self, origin: bytes) -> Tuple[bytes, bytes]:
+        return (b"access-control-allow-origin", origin if self.echo_origin else b"*")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self.preflight(origin, request_method, request_headers, send)
+            return
+        if not self.origin_allowed(origin):
+            await self.app(scope, receive, send)
+            return
+
+        extra_headers = [self.allow_origin_header(origin)] + self.simple_headers
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + extra_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    async def preflight(self, origin: bytes, request_method: bytes, request_headers, send):
+        allowed = (
+            self.origin_allowed(origin)
+            and request_method.upper() in self.allow_methods
+            and (request_headers is None or all(
+                header.strip().lower() in self.allow_headers
+                for header in request_headers.decode("latin-1").split(',') if header.strip()
+            ))
+        )
+        if not allowed:
+            await send({"type": "http.response.start", "status": 400, "headers": self.rejected_headers})
+            await send({"type": "http.response.body", "body": self.rejected_body})
+            return
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [self.allow_origin_header(origin)] + self.preflight_headers})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def cors_options() -> dict:
+    """
+    Options of CORSMiddleware built from the environment configuration.
+    """
+    return {
+        "allow_origins": split_setting(CORS_ORIGINS),
+        "allow_methods": split_setting(CORS_ALLOW_METHODS),
+        "allow_headers": split_setting(CORS_ALLOW_HEADERS),
+        "expose_headers": split_setting(CORS_EXPOSE_HEADERS),
+        "allow_credentials": CORS_ALLOW_CREDENTIALS,
+        "max_age": CORS_MAX_AGE,
+    }
@@ -1,49 +1,99 @@
-#from pymongo import MongoClient
+import logging
+from typing import Optional
+
+from fastapi import HTTPException
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 # Importing MYSQL configs from the configuration module
-from app.api.config.env import  DB_HOST, DB_USER, DB_PASSWORD, DB_NAME
+from app.api.config.env import  DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_POOL_TIMEOUT
+from app.api.config.deadlines import DeadlineQueuePool, install_deadlines
 
-class MySQLDB:
-    def __init__(self, host: str, user: str, password: str, db_name: str):
-        SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{user}:{password}@{host}/{db_name}"
-        self._engine = create_engine(SQLALCHEMY_DATABASE_URL)
+logger = logging.getLogger(__name__)
+
+class SQLDatabase:
+    """
+    Engine and session factory of one relational database, given its SQLAlchemy URL.
+    """
+    def __init__(self, url: str):
+        # SQLite connections are used from the threadpool, not only from the thread that opened them
+        connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+        # Statements and pool checkouts are bounded by the deadline of the current request
+        self._engine = create_engine(url, poolclass=DeadlineQueuePool, pool_timeout=DB_POOL_TIMEOUT, connect_args=connect_args)
+        install_deadlines(self._engine)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self._engine)
 
     @property
     def engine(self):
         return self._engine
 
+class MySQLDB(SQLDatabase):
+    def __init__(self, host: str, user: str, password: str, db_name: str):
+        SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{user}:{password}@{host}/{db_name}"
+        super().__init__(SQLALCHEMY_DATABASE_URL)
+
 mysql_db = MySQLDB(DB_HOST, DB_USER, DB_PASSWORD, DB_NAME)
 
 
-'''
-The connection to Mongo is disabled since the credentials from the
-.env.example were not working, which caused errors. It can be uncommented 
-when appropriate values are added to the .env.
+# Importing the Mongo configuration from the configuration module
+from app.api.config.env import MONGO_CLIENT, DB_NAME_MONGO, MONGO_MAX_POOL_SIZE, MONGO_MIN_POOL_SIZE, MONGO_MAX_IDLE_TIME_MS, MONGO_WAIT_QUEUE_TIMEOUT_MS, MONGO_SERVER_SELECTION_TIMEOUT_MS
 
+class MongoUnavailable(HTTPException):
+    """
+    Raised when the Items database is not configured or cannot be reached. Being an
+    HTTPException, it is answered with 503 Service Unavailable.
+    """
+    def __init__(self):
+        super().__init__(status_code=503, detail="Items database unavailable.")
 
-# Importing MONGO_CLIENT from the configuration module
-from app.api.config.env import MONGO_CLIENT, DB_NAME_MONGO
+class MongoDatabase:
+    """
+    Shared async MongoDB client of the worker and its collections.
 
-class Database:
-    def __init__(self, uri: str):
-        self._client = MongoClient(uri)
-        self._db = self._client[DB_NAME_MONGO]
+    Every request of the worker uses the same client, whose connection pool is sized by
+    the MONGO_* settings. The client is created on first use, so importing the app
+    never connects nor loads motor, and a missing or invalid `MONGO_CLIENT` only fails
+    the Items routes.
+    """
+    def __init__(self, uri: Optional[str], db_name: Optional[str], **pool_options):
+        self._uri = uri
+        self._db_name = db_name
+        self._pool_options = pool_options
+        self._client = None
 
     @property
     def client(self):
+        if self._client is None:
+            if not self._uri or not self._db_name:
+                raise MongoUnavailable()
+            from motor.motor_asyncio import AsyncIOMotorClient
+            from pymongo.errors import ConfigurationError
+            try:
+                self._client = AsyncIOMotorClient(self._uri, **self._pool_options)
+            except (ConfigurationError, ValueError) as e:
+                logger.error(f"Invalid MONGO_CLIENT: {str(e)}")
+                raise MongoUnavailable()
         return self._client
 
     @property
     def db(self):
-        return self._db
-    
+        return self.client[self._db_name]
+
     # Collections
     @property
     def items(self):
-        return self._db.items
-    
-database = Database(MONGO_CLIENT)
-'''
\ No newline at end of file
+        return self.db.items
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+mongo_db = MongoDatabase(
+    MONGO_CLIENT, DB_NAME_MONGO,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+)
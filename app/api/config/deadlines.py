@@ -0,0 +1,194 @@
+import contextlib
+import contextvars
+import re
+import time
+from typing import Iterator, List, Optional, Pattern, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Importing the request deadline configuration from the configuration module
+from app.api.config.env import REQUEST_TIMEOUT_READ, REQUEST_TIMEOUT_WRITE, REQUEST_TIMEOUT_MAX
+
+# Header a client can send to set its own budget, in milliseconds
+DEADLINE_HEADER = b"x-request-timeout-ms"
+
+# (method or None for any, path pattern, default budget in seconds or None for no deadline,
+# whether the client header may set one). Bulk transfers only get a deadline if the client
+# asks for it; the event stream never gets one.
+DEFAULT_ROUTE_TIMEOUTS: List[Tuple[Optional[str], Pattern, Optional[float], bool]] = [
+    ("GET", re.compile(r"/products/stream$"), None, False),
+    (None, re.compile(r"/products/(export|import)$"), None, True),
+    ("GET", re.compile(r""), REQUEST_TIMEOUT_READ, True),
+]
+
+# Absolute time.monotonic() by which the current request must be answered
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(HTTPException):
+    """
+    Raised when the request deadline runs out. Being an HTTPException, it passes through
+    the route handlers unchanged and is answered with a 504.
+    """
+
+    def __init__(self, detail: str = "Request deadline exceeded."):
+        super().__init__(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=detail)
+
+
+def remaining() -> Optional[float]:
+    """
+    Seconds left before the current deadline, possibly negative, or None without a deadline.
+    """
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check():
+    """
+    Raise DeadlineExceeded if the current deadline has passed.
+    """
+    budget = remaining()
+    if budget is not None and budget <= 0:
+        raise DeadlineExceeded()
+
+
+@contextlib.contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    Run a block with a deadline `seconds` from now. A tighter enclosing deadline is kept.
+
+    Args:
+    - seconds (Optional[float]): Budget of the block, or None to keep the current deadline.
+    """
+    current = _deadline.get()
+    new = None if seconds is None else time.monotonic() + seconds
+    if new is None or (current is not None and current < new):
+        new = current
+    token = _deadline.set(new)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextlib.contextmanager
+def no_deadline() -> Iterator[None]:
+    """
+    Run a block without any deadline, for work whose result outlives the request that
+    happens to start it.
+    """
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+class DeadlineQueuePool(QueuePool):
+    """
+    QueuePool whose checkout wait is capped by the remaining request budget.
+
+    `QueuePool` reads `self._timeout` on every checkout, so exposing it as a property is
+    enough to make waits for a connection deadline-aware.
+    """
+
+    @property
+    def _timeout(self) -> float:
+        budget = remaining()
+        if budget is None or budget >= self._pool_timeout:
+            return self._pool_timeout
+        return max(budget, 0.0)
+
+    @_timeout.setter
+    def _timeout(self, value: float):
+        self._pool_timeout = value
+
+    def _do_get(self):
+        check()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            check()
+            raise
+
+
+def _apply_statement_timeout(conn, cursor, statement, parameters, context, executemany):
+    budget = remaining()
+    if budget is not None and budget <= 0:
+        raise DeadlineExceeded()
+    dialect = conn.dialect.name
+    if dialect == "mysql":
+        # MySQL only bounds the execution time of SELECT statements
+        if budget is not None and statement.lstrip()[:6].upper() == "SELECT":
+            statement = statement.lstrip()
+            statement = f"{statement[:6]} /*+ MAX_EXECUTION_TIME({max(int(budget * 1000), 1)}) */{statement[6:]}"
+    elif dialect == "sqlite":
+        # SQLite has no statement timeout; a progress handler aborts the statement instead
+        raw = cursor.connection
+        if budget is None:
+            raw.set_progress_handler(None, 0)
+        else:
+            expires = time.monotonic() + budget
+            raw.set_progress_handler(lambda: time.monotonic() >= expires, 10000)
+    return statement, parameters
+
+
+def _translate_timeout(context):
+    # The database aborted a statement because its budget ran out
+    budget = remaining()
+    if budget is not None and budget <= 0 and not isinstance(context.original_exception, DeadlineExceeded):
+        raise DeadlineExceeded() from context.original_exception
+
+
+def install_deadlines(engine):
+    """
+    Apply the remaining request budget as a per-statement timeout on every statement run by `engine`.
+
+    Args:
+    - engine (Engine): Engine to instrument. Its pool should be a DeadlineQueuePool for checkouts to be bounded too.
+    """
+    event.listen(engine, "before_cursor_execute", _apply_statement_timeout, retval=True)
+    event.listen(engine, "handle_error", _translate_timeout)
+
+
+class DeadlineMiddleware:
+    """
+    Pure ASGI middleware that sets the deadline of each request.
+
+    The budget comes from the `X-Request-Timeout-Ms` header, capped at `max_timeout`, or
+    else from the first matching route default. Invalid header values are ignored.
+    """
+
+    def __init__(self, app, route_timeouts=DEFAULT_ROUTE_TIMEOUTS, default_timeout: float = REQUEST_TIMEOUT_WRITE,
+                 max_timeout: float = REQUEST_TIMEOUT_MAX):
+        self.app = app
+        self.route_timeouts = route_timeouts
+        self.default_timeout = default_timeout
+        self.max_timeout = max_timeout
+
+    def budget(self, method: str, path: str, headers) -> Optional[float]:
+        seconds, client_may_set = self.default_timeout, True
+        for route_method, pattern, route_seconds, route_client_may_set in self.route_timeouts:
+            if (route_method is None or route_method == method) and pattern.search(path):
+                seconds, client_may_set = route_seconds, route_client_may_set
+                break
+        if client_may_set:
+            for name, value in headers:
+                if name == DEADLINE_HEADER:
+                    try:
+                        requested = int(value) / 1000
+                    except ValueError:
+                        requested = 0
+                    if requested > 0:
+                        return min(requested, self.max_timeout)
+                    break
+        return seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with deadline(self.budget(scope["method"], scope["path"], scope["headers"])):
+            await self.app(scope, receive, send)
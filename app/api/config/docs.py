@@ -0,0 +1,158 @@
+import gzip
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
+from fastapi.responses import Response
+
+logger = logging.getLogger(__name__)
+
+# Directory the docs assets and the prebuilt schema are written to by `python -m app.build_docs`
+DOCS_STATIC_DIR = Path(__file__).resolve().parents[2] / "static" / "docs"
+
+# Pinned docs assets, downloaded at image build time
+DOCS_ASSETS = {
+    "swagger-ui-bundle.js": ("application/javascript", "https://cdn.jsdelivr.net/npm/swagger-ui-dist@3.52.5/swagger-ui-bundle.js"),
+    "swagger-ui.css": ("text/css", "https://cdn.jsdelivr.net/npm/swagger-ui-dist@3.52.5/swagger-ui.css"),
+    "redoc.standalone.js": ("application/javascript", "https://cdn.jsdelivr.net/npm/redoc@2.0.0/bundles/redoc.standalone.js"),
+    "favicon.png": ("image/png", "https://fastapi.tiangolo.com/img/favicon.png"),
+}
+
+# Assets are addressed by content hash, so they can be cached for a year
+IMMUTABLE = "public, max-age=31536000, immutable"
+# The schema and pages change on deploy, so clients revalidate them with their ETag
+REVALIDATE = "no-cache"
+
+
+class PrecomputedResponse:
+    """
+    A response body encoded, compressed and hashed once, served with an ETag.
+
+    Requests whose `If-None-Match` matches get an empty 304; clients accepting gzip get
+    the compressed body, when compression makes it smaller.
+    """
+
+    def __init__(self, body: bytes, media_type: str, cache_control: str):
+        self.body = body
+        self.media_type = media_type
+        digest = hashlib.sha256(body).hexdigest()
+        self.version = digest[:16]
+        self.etag = f'"{digest[:32]}"'
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        self.gzip_body: Optional[bytes] = compressed if len(compressed) < len(body) else None
+        self.headers = {"ETag": self.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+    def response(self, request: Request) -> Response:
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = {tag.strip().replace("W/", "", 1) for tag in if_none_match.split(',')}
+            if self.etag in tags or "*" in tags:
+                return Response(status_code=304, headers=self.headers)
+        if self.gzip_body is not None and "gzip" in request.headers.get("accept-encoding", ""):
+            return Response(self.gzip_body, media_type=self.media_type, headers={**self.headers, "Content-Encoding": "gzip"})
+        return Response(self.body, media_type=self.media_type, headers=self.headers)
+
+
+def load_asset(name: str) -> Optional[PrecomputedResponse]:
+    """
+    Read a docs asset from the static directory.
+
+    Args:
+    - name (str): File name, one of DOCS_ASSETS.
+
+    Returns:
+    - Optional[PrecomputedResponse]: The asset, or None if it was not downloaded.
+    """
+    path = DOCS_STATIC_DIR / name
+    if not path.is_file():
+        return None
+    return PrecomputedResponse(path.read_bytes(), DOCS_ASSETS[name][0], IMMUTABLE)
+
+
+def render_schema(schema: dict) -> bytes:
+    """
+    Encode an OpenAPI schema the way it is served.
+    """
+    return json.dumps(schema, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def mount_docs(app: FastAPI, prefix: str, build_schema: Callable[[], dict], title: str):
+    """
+    Serve the OpenAPI schema, Swagger UI, ReDoc and their assets under `prefix`.
+
+    Everything is computed once when the worker starts: the schema is read from the
+    prebuilt `openapi.json` if the build step wrote one, or else generated with
+    `build_schema`. Assets are served from the static directory; the ones that were not
+    downloaded fall back to their CDN URL.
+
+    Args:
+    - app (FastAPI): Application created with its own docs routes disabled.
+    - prefix (str): Path prefix of the docs routes.
+    - build_schema (Callable[[], dict]): Function generating the OpenAPI schema.
+    - title (str): Title of the docs pages.
+    """
+    documents: Dict[str, PrecomputedResponse] = {}
+    assets: Dict[str, PrecomputedResponse] = {}
+    openapi_url = f"{prefix}/openapi.json"
+
+    def asset_url(name: str) -> str:
+        asset = assets.get(name)
+        if asset is None:
+            return DOCS_ASSETS[name][1]
+        return f"{prefix}/docs/static/{name}?v={asset.version}"
+
+    def html(page: Response) -> PrecomputedResponse:
+        return PrecomputedResponse(page.body, "text/html; charset=utf-8", REVALIDATE)
+
+    @app.on_event('startup')
+    def build_documents():
+        if documents:
+            return
+        prebuilt = DOCS_STATIC_DIR / "openapi.json"
+        schema = prebuilt.read_bytes() if prebuilt.is_file() else render_schema(build_schema())
+        documents["openapi"] = PrecomputedResponse(schema, "application/json", REVALIDATE)
+        for name in DOCS_ASSETS:
+            asset = load_asset(name)
+            if asset is None:
+                logger.warning(f"Docs asset {name} was not downloaded, the docs pages will load it from the CDN.")
+            else:
+                assets[name] = asset
+        documents["docs"] = html(get_swagger_ui_html(
+            openapi_url=openapi_url, title=f"{title} - Swagger UI",
+            swagger_js_url=asset_url("swagger-ui-bundle.js"), swagger_css_url=asset_url("swagger-ui.css"),
+            swagger_favicon_url=asset_url("favicon.png"),
+        ))
+        documents["redoc"] = html(get_redoc_html(
+            openapi_url=openapi_url, title=f"{title} - ReDoc",
+            redoc_js_url=asset_url("redoc.standalone.js"), redoc_favicon_url=asset_url("favicon.png"),
+            with_google_fonts=False,
+        ))
+
+    def document(name: str) -> PrecomputedResponse:
+        # Built at startup; also on first use when the app is served without lifespan events
+        if not documents:
+            build_documents()
+        return documents[name]
+
+    @app.get(openapi_url, include_in_schema=False)
+    async def openapi(request: Request):
+        return document("openapi").response(request)
+
+    @app.get(f"{prefix}/docs", include_in_schema=False)
+    async def swagger_ui(request: Request):
+        return document("docs").response(request)
+
+    @app.get(f"{prefix}/redoc", include_in_schema=False)
+    async def redoc(request: Request):
+        return document("redoc").response(request)
+
+    @app.get(f"{prefix}/docs/static/{{name}}", include_in_schema=False)
+    async def docs_asset(name: str, request: Request):
+        asset = assets.get(name)
+        if asset is None:
+            raise HTTPException(status_code=404, detail="Not found.")
+        return asset.response(request)
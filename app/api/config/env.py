@@ -1,34 +1,191 @@
-import os
-from dotenv import load_dotenv
-load_dotenv()
+from functools import lru_cache
+from pathlib import Path
+from typing import Literal, Optional
+
+from pydantic import BaseSettings, root_validator
 
 # Add here all the environment variables
 
-# Basic configuration
-API_NAME = os.getenv('API_NAME')
-JWT_SECRET = os.getenv('JWT_SECRET') # The JWT secret string
-MONGO_CLIENT = os.getenv('MONGO_CLIENT') # Something like: mongodb://[username:password@]host1[:port1][,...hostN[:portN]][/[defaultauthdb][?options]]
-DB_NAME_MONGO = os.getenv('DB_NAME_MONGO')
-PRODUCTION_SERVER_URL = os.getenv('PRODUCTION_SERVER_URL')
-DEVELOPMENT_SERVER_URL = os.getenv('DEVELOPMENT_SERVER_URL')
-LOCALHOST_SERVER_URL = os.getenv('LOCALHOST_SERVER_URL')
-IS_PRODUCTION = os.getenv('IS_PRODUCTION') # Boolean to determine if is prod environment or nah
-
-# MySQl configuration
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = os.getenv('DB_PORT')
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_NAME = os.getenv('DB_NAME')
-
-# IncidentsBug library configuration
-JIRA_PROJECT_ID = os.getenv('JIRA_PROJECT_ID')
-RABBIT_USER = os.getenv('RABBIT_USER') # Your Jira credentials
-RABBIT_PASSWORD = os.getenv('RABBIT_PASSWORD')
-RABBITMQ_IP = os.getenv('RABBITMQ_IP') # Ask someone for the assigned server for this project
-RABBITMQ_QUEUE = os.getenv('RABBITMQ_QUEUE')
-
-# N8 configuration
-N8_IP = os.getenv('N8_IP')
-N8_USER = os.getenv('N8_USER')
-N8_PASSWORD = os.getenv('N8_PASSWORD')
\ No newline at end of file
+class Settings(BaseSettings):
+    """
+    Typed configuration of the API, read once from the environment and the `.env` file.
+
+    Variables set in the environment take precedence over the `.env` file. Values are
+    validated on load, so a malformed variable fails at startup instead of on the first
+    request that reads it.
+    """
+    # Basic configuration
+    API_NAME: Optional[str] = None
+    JWT_SECRET: Optional[str] = None # The JWT secret string
+    MONGO_CLIENT: Optional[str] = None # Something like: mongodb://[username:password@]host1[:port1][,...hostN[:portN]][/[defaultauthdb][?options]]
+    DB_NAME_MONGO: Optional[str] = None
+    PRODUCTION_SERVER_URL: Optional[str] = None
+    DEVELOPMENT_SERVER_URL: Optional[str] = None
+    LOCALHOST_SERVER_URL: Optional[str] = None
+    IS_PRODUCTION: int = 0 # Boolean to determine if is prod environment or nah
+
+    # MySQl configuration
+    DB_HOST: Optional[str] = None
+    DB_PORT: Optional[str] = None
+    DB_USER: Optional[str] = None
+    DB_PASSWORD: Optional[str] = None
+    DB_NAME: Optional[str] = None
+
+    # IncidentsBug library configuration
+    JIRA_PROJECT_ID: Optional[str] = None
+    RABBIT_USER: Optional[str] = None # Your Jira credentials
+    RABBIT_PASSWORD: Optional[str] = None
+    RABBITMQ_IP: Optional[str] = None # Ask someone for the assigned server for this project
+    RABBITMQ_QUEUE: Optional[str] = None
+
+    # N8 configuration
+    N8_IP: Optional[str] = None
+    N8_USER: Optional[str] = None
+    N8_PASSWORD: Optional[str] = None
+    N8_WEBHOOK_ENABLED: bool = False # Send product changes to the N8 webhook at N8_IP + N8_WEBHOOK_PATH; ignored on replicas
+    N8_WEBHOOK_PATH: str = '/webhook/product-changes' # Path of the N8 workflow webhook receiving product changes
+    N8_BATCH_SIZE: int = 100 # Events sent per webhook call at most
+    N8_FLUSH_INTERVAL: float = 1 # Longest wait of an event for others to share its webhook call, in seconds
+    N8_POOL_SIZE: int = 2 # Keep-alive connections kept open to N8
+    N8_TIMEOUT: float = 10 # Seconds to wait for N8 to answer a webhook call
+    N8_MAX_RETRIES: int = 5 # Retries of a failed webhook call before its events are spilled to disk
+    N8_RETRY_BACKOFF: float = 0.5 # Seconds before the first retry, doubled for each next one
+    N8_MAX_PENDING: int = 10000 # Events queued in memory; the oldest ones beyond are spilled to disk
+    N8_SPILL_PATH: str = 'n8_spill.ndjson' # File keeping the events not delivered yet, suffixed with the process id
+    N8_SPILL_MAX_BYTES: int = 67108864 # Largest spill file; events that do not fit are dropped
+
+    # Product event stream configuration
+    SSE_BUFFER_SIZE: int = 256 # Events buffered per client before it is dropped as too slow
+    SSE_KEEPALIVE_SECONDS: float = 15 # Idle seconds before a keepalive comment is sent
+
+    # Multi-get configuration
+    MULTI_GET_MAX_IDS: int = 10000 # Maximum number of IDs accepted by a single multi-get request
+    MULTI_GET_CHUNK_SIZE: int = 1000 # IDs per IN (...) query
+
+    # Read coalescing configuration
+    SINGLE_FLIGHT_TIMEOUT: float = 5 # Seconds a coalesced read waits for the in-flight query it joined
+
+    # Bulk import/export configuration
+    EXPORT_BATCH_SIZE: int = 5000 # Rows fetched from the server-side cursor at a time
+    IMPORT_BATCH_SIZE: int = 5000 # Rows inserted per transaction
+    IMPORT_MAX_LINE_BYTES: int = 1048576 # Longest CSV row or NDJSON line accepted by an import, which bounds the memory of the parsers
+
+    # Product updates consumer configuration
+    PRODUCT_UPDATES_QUEUE: Optional[str] = None # Queue the pricing system publishes product changes to
+    CONSUMER_BATCH_SIZE: int = 500 # Maximum messages applied per transaction
+    CONSUMER_BATCH_DELAY: float = 0.5 # Maximum seconds a batch stays open after its first message
+    CONSUMER_REPORT_INTERVAL: float = 60 # Seconds between metrics log lines
+    CONSUMER_MAX_ATTEMPTS: int = 5 # Failures of a message on its own before it is dead-lettered
+
+    # Query result cache configuration
+    QUERY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024 # Total size of the cached encoded responses
+    QUERY_CACHE_TTL: float = 5 # Seconds a cached response is served, bounding staleness from writes in other workers
+
+    # Price analytics configuration
+    ANALYTICS_MAX_AGE: float = 60 # Seconds before the analytics snapshot is reloaded in the background, catching writes of other workers and the consumer; 0 to never reload
+
+    # Admission control configuration
+    ADMISSION_INITIAL_LIMIT: float = 20 # Concurrent requests admitted at startup
+    ADMISSION_MIN_LIMIT: float = 2 # Floor of the adaptive concurrency limit
+    ADMISSION_MAX_LIMIT: float = 200 # Ceiling of the adaptive concurrency limit
+    ADMISSION_TARGET_LATENCY: float = 0.25 # Seconds; slower requests shrink the limit
+    ADMISSION_MAX_QUEUE: int = 100 # Requests waiting for a slot before new ones are shed
+    ADMISSION_QUEUE_TIMEOUT: float = 1 # Seconds a request waits for a slot before it is shed
+    ADMISSION_RETRY_AFTER: int = 1 # Retry-After seconds sent with shed responses
+
+    # Request deadline configuration
+    REQUEST_TIMEOUT_READ: float = 5 # Default budget in seconds of GET requests
+    REQUEST_TIMEOUT_WRITE: float = 10 # Default budget in seconds of other requests
+    REQUEST_TIMEOUT_MAX: float = 60 # Largest budget a client may ask for with X-Request-Timeout-Ms
+    DB_POOL_TIMEOUT: float = 30 # Seconds to wait for a pooled connection when no deadline is tighter
+
+    # Rate limit configuration
+    RATE_LIMIT_DEFAULTS: str = '' # Comma-separated limits (e.g. '1000/hour,50/minute') applied per client to routes without their own @limiter.limit
+
+    # CORS configuration
+    CORS_ORIGINS: str = '' # Comma-separated origins allowed to call the API, '*' for any
+    CORS_ALLOW_METHODS: str = 'GET,POST,PATCH,DELETE' # Comma-separated methods allowed cross-origin
+    CORS_ALLOW_HEADERS: str = 'Authorization,Content-Type,X-Request-Timeout-Ms' # Comma-separated request headers allowed cross-origin
+    CORS_EXPOSE_HEADERS: str = 'Retry-After' # Comma-separated response headers readable by browser scripts
+    CORS_ALLOW_CREDENTIALS: bool = True # Whether cookies and Authorization may be sent cross-origin
+    CORS_MAX_AGE: int = 86400 # Seconds browsers may cache a preflight answer (Chromium caps it at 7200)
+
+    # Docs configuration
+    DOCS_ENABLED: bool = True # Serve the OpenAPI schema, Swagger UI and ReDoc; disable in production to skip them entirely
+
+    # Sharding configuration
+    SHARD_URLS: str = '' # Comma-separated SQLAlchemy URLs of the product shards; empty to use the MySQL database alone
+    SHARD_STRATEGY: Literal['hash', 'range'] = 'hash' # 'hash' (ID modulo shard count) or 'range' (consecutive ID ranges)
+    SHARD_RANGE_SIZE: int = 100000000 # IDs per shard with the range strategy
+    SHARD_ID_BLOCK_SIZE: int = 1000 # IDs a worker reserves from a shard at a time
+    SHARD_SCATTER_THREADS: int = 0 # Threads running queries scattered over the shards; 0 for one per shard and request thread
+
+    # Write-behind configuration
+    WRITE_BEHIND_ENABLED: bool = False # Buffer price-only updates in memory and commit them in batches; buffered prices are lost if the worker dies
+    WRITE_BEHIND_FLUSH_INTERVAL: float = 0.05 # Seconds between flushes of the price buffer
+    WRITE_BEHIND_MAX_BATCH: int = 1000 # Buffered products that trigger a flush before the interval
+
+    # Soft delete configuration
+    SOFT_DELETE_ENABLED: bool = False # Deletes only mark products deleted; a background purger removes the marked rows later
+    SOFT_DELETE_RETENTION: float = 0 # Seconds a deleted product is kept before it may be purged
+    SOFT_DELETE_PURGE_INTERVAL: float = 60 # Seconds between purge passes
+    SOFT_DELETE_PURGE_BATCH: int = 500 # Rows removed per purge transaction, and per transaction of a delete by filter
+    SOFT_DELETE_PURGE_PAUSE: float = 0.05 # Seconds between purge transactions, bounding the write rate of the purger
+
+    # Items (MongoDB) configuration
+    MONGO_MAX_POOL_SIZE: int = 100 # Connections the shared Mongo client may open per server
+    MONGO_MIN_POOL_SIZE: int = 10 # Connections kept open while idle, so bursts do not pay for new ones
+    MONGO_MAX_IDLE_TIME_MS: int = 60000 # Idle connections above the minimum are closed after this
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = 2000 # Longest wait for a free pooled connection
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000 # Longest wait for a reachable server before failing
+    ITEMS_MAX_BATCH: int = 1000 # Most items or operations accepted by one batch request
+
+    # Startup configuration
+    IMPORT_TIME_BUDGET_MS: float = 1500 # Longest acceptable cold import of app.app, checked by the import time test
+
+    # Profiling configuration
+    PROFILING_ENABLED: bool = False # Serve the admin CPU and memory profiling routes, to JWT users with the admin role
+    PROFILING_MAX_SECONDS: float = 60 # Longest CPU profile a request may ask for
+    PROFILING_MAX_SNAPSHOTS: int = 10 # Memory snapshots kept per worker; older ones are dropped
+
+    # Replica configuration
+    REPLICA_PRIMARY_URL: str = '' # Base URL of the primary API (e.g. http://primary:8000); set to serve product reads from a local copy and forward writes there
+    REPLICA_PATH: str = 'replica.db' # SQLite file holding the local copy of the products table
+    REPLICA_MAX_STALENESS: float = 30 # Staleness in seconds of the local copy after which product reads are forwarded to the primary; above SSE_KEEPALIVE_SECONDS
+    REPLICA_RESYNC_SECONDS: float = 20 # Seconds between full reloads of the copy, catching writes the followed primary worker did not see; below REPLICA_MAX_STALENESS, or 0 to never reload with REPLICA_STREAM_COMPLETE
+    REPLICA_STREAM_COMPLETE: bool = False # The primary runs a single worker and no consumer, so its stream carries every write and staleness counts from its last event or keepalive instead of the last full reload
+    REPLICA_RETRY_SECONDS: float = 1 # Seconds before reconnecting to the primary after losing it
+
+    class Config:
+        # The repository root, wherever the process is started from
+        env_file = Path(__file__).resolve().parents[3] / '.env'
+        case_sensitive = True
+
+    @root_validator(skip_on_failure=True)
+    def check_limits(cls, values):
+        if not values['ADMISSION_MIN_LIMIT'] <= values['ADMISSION_INITIAL_LIMIT'] <= values['ADMISSION_MAX_LIMIT']:
+            raise ValueError('ADMISSION_INITIAL_LIMIT must lie between ADMISSION_MIN_LIMIT and ADMISSION_MAX_LIMIT')
+        if values['MONGO_MIN_POOL_SIZE'] > values['MONGO_MAX_POOL_SIZE']:
+            raise ValueError('MONGO_MIN_POOL_SIZE cannot exceed MONGO_MAX_POOL_SIZE')
+        if values['REPLICA_PRIMARY_URL'] and values['REPLICA_MAX_STALENESS'] <= values['SSE_KEEPALIVE_SECONDS']:
+            raise ValueError('REPLICA_MAX_STALENESS must exceed SSE_KEEPALIVE_SECONDS, the longest silence of a healthy primary')
+        if (values['REPLICA_PRIMARY_URL'] and not values['REPLICA_STREAM_COMPLETE']
+                and not 0 < values['REPLICA_RESYNC_SECONDS'] < values['REPLICA_MAX_STALENESS']):
+            raise ValueError('REPLICA_RESYNC_SECONDS must lie between 0 and REPLICA_MAX_STALENESS unless REPLICA_STREAM_COMPLETE is set, or the copy is never fresh')
+        return values
+
+@lru_cache()
+def get_settings() -> Settings:
+    """
+    Settings of the process, loaded and validated on first use.
+
+    Returns:
+    - Settings: The same instance on every call.
+    """
+    return Settings()
+
+def __getattr__(name: str):
+    # Keeps `from app.api.config.env import X` working for every setting
+    if name in Settings.__fields__:
+        return getattr(get_settings(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
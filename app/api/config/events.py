@@ -0,0 +1,174 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+# Importing the stream configuration from the configuration module
+from app.api.config.env import SSE_BUFFER_SIZE
+
+# Comment line sent to idle clients so proxies keep the connection open
+KEEPALIVE = b": keepalive\n\n"
+
+
+class Subscription:
+    """
+    A single client of the product event stream.
+
+    Events are queued as already encoded SSE frames in a bounded buffer. When the
+    buffer fills up the subscriber is considered too slow and is dropped by the broker.
+    """
+    __slots__ = ("product_ids", "queue", "dropped")
+
+    def __init__(self, product_ids: Optional[Set[int]], buffer_size: int):
+        self.product_ids = product_ids
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+    async def next_event(self, timeout: float) -> Optional[bytes]:
+        """
+        Wait for the next SSE frame.
+
+        Args:
+        - timeout (float): Seconds to wait before returning a keepalive frame.
+
+        Returns:
+        - Optional[bytes]: Encoded frame, a keepalive comment, or None once the subscriber was dropped.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None if self.dropped else KEEPALIVE
+
+    def _drop(self):
+        # Discard the backlog so the sentinel fits and the client stops right away
+        self.dropped = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class ProductEventBroker:
+    """
+    In-process fan-out of product create/update/delete events to SSE subscribers.
+
+    Subscriptions live on the event loop, while the write functions in `app.api.database`
+    run in the threadpool. `publish` therefore encodes each event once and hands it to the
+    loop with a single `call_soon_threadsafe`; the loop then delivers it only to the
+    subscribers interested in that product, indexed by product ID. A "reset" event has no
+    product ID and goes to every subscriber.
+    """
+
+    def __init__(self, buffer_size: int = 256):
+        self.buffer_size = buffer_size
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._by_product: Dict[int, Set[Subscription]] = {}
+        self._wildcard: Set[Subscription] = set()
+        self._subscribers = 0
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, product_ids: Optional[Iterable[int]] = None) -> Subscription:
+        """
+        Register a new subscriber. Must be called from the event loop.
+
+        Args:
+        - product_ids (Optional[Iterable[int]]): IDs to receive events for, or None for every product.
+
+        Returns:
+        - Subscription: The new subscription.
+        """
+        self._loop = asyncio.get_event_loop()
+        ids = set(product_ids) if product_ids else None
+        subscription = Subscription(ids, self.buffer_size)
+        if ids is None:
+            self._wildcard.add(subscription)
+        else:
+            for product_id in ids:
+                self._by_product.setdefault(product_id, set()).add(subscription)
+        self._subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """
+        Remove a subscriber. Calling it more than once is harmless.
+
+        Args:
+        - subscription (Subscription): Subscription to remove.
+        """
+        if subscription.product_ids is None:
+            if subscription in self._wildcard:
+                self._wildcard.discard(subscription)
+                self._subscribers -= 1
+            return
+        removed = False
+        for product_id in subscription.product_ids:
+            subscribers = self._by_product.get(product_id)
+            if subscribers and subscription in subscribers:
+                subscribers.discard(subscription)
+                removed = True
+                if not subscribers:
+                    del self._by_product[product_id]
+        if removed:
+            self._subscribers -= 1
+
+    def publish(self, event_type: str, product: dict):
+        """
+        Publish a product event. Safe to call from any thread.
+
+        Args:
+        - event_type (str): One of "created", "updated", "deleted" or "reset".
+        - product (dict): Product data as returned by `ProductDB.as_dict()`, or `{"id": None, "count": n}` for a reset.
+        """
+        loop = self._loop
+        if not self._subscribers or loop is None:
+            return
+        with self._lock:
+            sequence = next(self._sequence)
+            self.published += 1
+        data = json.dumps({"type": event_type, "product": product, "timestamp": time.time()})
+        frame = f"id: {sequence}\nevent: {event_type}\ndata: {data}\n\n".encode()
+        try:
+            loop.call_soon_threadsafe(self._dispatch, product["id"], frame)
+        except RuntimeError:
+            # The loop that owned the subscribers is gone
+            self._loop = None
+
+    def _dispatch(self, product_id: int, frame: bytes):
+        slow: List[Subscription] = []
+        delivered = 0
+        if product_id is None:
+            # A subscriber to several products is indexed under each of them but gets the reset once
+            targets_by_product = [set().union(*self._by_product.values())]
+        else:
+            targets_by_product = [self._by_product.get(product_id, ())]
+        for targets in (self._wildcard, *targets_by_product):
+            for subscription in targets:
+                try:
+                    subscription.queue.put_nowait(frame)
+                    delivered += 1
+                except asyncio.QueueFull:
+                    slow.append(subscription)
+        for subscription in slow:
+            self.unsubscribe(subscription)
+            subscription._drop()
+        self.delivered += delivered
+        self.dropped += len(slow)
+
+    def stats(self) -> dict:
+        """
+        Current broker metrics.
+        """
+        return {
+            "subscribers": self._subscribers,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped,
+        }
+
+
+product_events = ProductEventBroker(SSE_BUFFER_SIZE)
@@ -1,4 +1,10 @@
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
-limiter = Limiter(key_func=get_remote_address)
+# Importing the rate limit configuration from the configuration module
+from app.api.config.env import RATE_LIMIT_DEFAULTS
+
+# Limits of the routes without their own @limiter.limit, enforced by the slowapi middleware
+DEFAULT_LIMITS = [limit.strip() for limit in RATE_LIMIT_DEFAULTS.split(',') if limit.strip()]
+
+limiter = Limiter(key_func=get_remote_address, default_limits=DEFAULT_LIMITS)
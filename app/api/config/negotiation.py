@@ -0,0 +1,90 @@
+import contextvars
+import re
+from typing import Any, Callable
+
+from fastapi import HTTPException, Request, status
+from fastapi.datastructures import DefaultPlaceholder
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+
+from app.api.methods.serialization import FORMAT_MEDIA_TYPES, body_format, cbor_available, decode, encode, negotiate
+
+# Routes whose request and response bodies are negotiated: every product route
+NEGOTIATED_PATHS = re.compile(r"/products(/|$|:)")
+
+# Response format picked for the current request
+_response_format: contextvars.ContextVar[str] = contextvars.ContextVar("response_format", default="json")
+
+
+def response_format() -> str:
+    """
+    Format negotiated for the current request: "json", "msgpack" or "cbor".
+    """
+    return _response_format.get()
+
+
+class NegotiatedRequest(Request):
+    """
+    Request whose body is decoded according to its `Content-Type`, so MessagePack and
+    CBOR bodies are validated against the route's body model like JSON ones.
+    """
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = decode(await self.body(), body_format(self.headers.get("content-type")))
+        return self._json
+
+
+class NegotiatedResponse(JSONResponse):
+    """
+    Response rendered in the format negotiated for the request, JSON by default.
+    """
+
+    def __init__(self, content: Any = None, status_code: int = 200, headers: dict = None, media_type: str = None,
+                 background=None):
+        self.format = response_format()
+        self.media_type = media_type or FORMAT_MEDIA_TYPES[self.format][0]
+        super().__init__(content, status_code, {**(headers or {}), "Vary": "Accept"}, None, background)
+
+    def render(self, content: Any) -> bytes:
+        return encode(content, self.format)
+
+
+def negotiated_response(body: bytes, status_code: int = 200) -> Response:
+    """
+    Response with a body already encoded in the negotiated format, such as a cached one.
+    """
+    return Response(content=body, status_code=status_code, media_type=FORMAT_MEDIA_TYPES[response_format()][0],
+                    headers={"Vary": "Accept"})
+
+
+class NegotiatedRoute(APIRoute):
+    """
+    Route class of the API router that negotiates the body formats of product routes.
+
+    Responses are encoded in the format picked from the `Accept` header (see `negotiate`),
+    and request bodies are decoded according to their `Content-Type`. Other routes,
+    routes that build their own response, and error responses are unchanged and stay JSON.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        self.negotiated = NEGOTIATED_PATHS.search(path) is not None
+        if self.negotiated and isinstance(kwargs.get("response_class"), DefaultPlaceholder):
+            kwargs["response_class"] = NegotiatedResponse
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not self.negotiated:
+            return handler
+
+        async def negotiated_handler(request: Request) -> Response:
+            if body_format(request.headers.get("content-type")) == "cbor" and not cbor_available():
+                raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail="CBOR is not supported.")
+            token = _response_format.set(negotiate(request.headers.get("accept")))
+            try:
+                return await handler(NegotiatedRequest(request.scope, request.receive))
+            finally:
+                _response_format.reset(token)
+
+        return negotiated_handler
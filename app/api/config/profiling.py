@@ -0,0 +1,219 @@
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException
+
+# Importing the profiling configuration from the configuration module
+from app.api.config.env import PROFILING_MAX_SNAPSHOTS
+
+# Leaf frames of threads that are blocked waiting for work, left out unless asked for
+IDLE_FRAMES = {
+    ("threading", "wait"),
+    ("selectors", "select"),
+    ("queue", "get"),
+    ("concurrent.futures.thread", "_worker"),
+}
+
+
+class ProfilerBusy(HTTPException):
+    """
+    Raised when a CPU profile is requested while another one is running. Being an
+    HTTPException, it is answered with 409 Conflict.
+    """
+    def __init__(self):
+        super().__init__(status_code=409, detail="A CPU profile is already running.")
+
+
+def _frame_label(frame) -> str:
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Statistical CPU profiler of the threads of this worker.
+
+    While a profile runs, the calling thread wakes up every interval, reads the current
+    stack of every other thread with `sys._current_frames()` and counts each distinct
+    stack. Nothing is installed in the interpreter, so the profiled code runs unchanged
+    and there is no cost at all between profiles. One profile runs at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.profiles = 0
+
+    def profile(self, seconds: float, interval: float, include_idle: bool = False) -> Tuple[Counter, int]:
+        """
+        Sample the stacks of every other thread for a while.
+
+        Args:
+        - seconds (float): Duration of the profile.
+        - interval (float): Seconds between samples.
+        - include_idle (bool): Also count threads blocked waiting for work (see IDLE_FRAMES).
+
+        Returns:
+        - Tuple[Counter, int]: Occurrences of each stack, as root-first tuples of frame
+          labels under the thread name, and the number of sampling rounds.
+
+        Raises:
+        - ProfilerBusy: If another profile is running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy()
+        try:
+            stacks: Counter = Counter()
+            me = threading.get_ident()
+            rounds = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    if not include_idle and (frame.f_globals.get('__name__'), frame.f_code.co_name) in IDLE_FRAMES:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    stacks[tuple(reversed(stack))] += 1
+                rounds += 1
+                time.sleep(interval)
+            self.profiles += 1
+            return stacks, rounds
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapse(stacks: Counter) -> str:
+        """
+        Stacks in the collapsed format read by flamegraph.pl, speedscope and similar tools:
+        one `root;...;leaf count` line per stack, most frequent first.
+        """
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in stacks.most_common())
+
+
+class MemoryTracer:
+    """
+    tracemalloc snapshots of this worker, for diffs of the allocations between two points in time.
+
+    Tracing is off until `start` is called, since tracemalloc slows every allocation
+    while it runs, and `stop` turns it off again and drops the kept snapshots. Only the
+    last `max_snapshots` snapshots are kept.
+    """
+
+    def __init__(self, max_snapshots: int = 10):
+        self.max_snapshots = max_snapshots
+        self._snapshots: "OrderedDict[int, Tuple[datetime, tracemalloc.Snapshot]]" = OrderedDict()
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    @property
+    def tracing(self) -> bool:
+        return tracemalloc.is_tracing()
+
+    def start(self, frames: int):
+        """
+        Start tracing allocations, keeping `frames` frames of traceback per allocation.
+        Does nothing if tracing already.
+        """
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self):
+        with self._lock:
+            self._snapshots.clear()
+        tracemalloc.stop()
+
+    def take(self) -> Tuple[int, datetime, tracemalloc.Snapshot]:
+        """
+        Take and keep a snapshot of the traced allocations.
+
+        Returns:
+        - Tuple[int, datetime, tracemalloc.Snapshot]: ID, time and the snapshot, without
+          the allocations of tracemalloc and the import machinery.
+
+        Raises:
+        - HTTPException: With a 409 status code if tracing is off.
+        """
+        if not tracemalloc.is_tracing():
+            raise HTTPException(status_code=409, detail="Memory tracing is not started.")
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        taken_at = datetime.utcnow()
+        with self._lock:
+            snapshot_id = self._next_id
+            self._next_id += 1
+            self._snapshots[snapshot_id] = (taken_at, snapshot)
+            while len(self._snapshots) > self.max_snapshots:
+                self._snapshots.popitem(last=False)
+        return snapshot_id, taken_at, snapshot
+
+    def get(self, snapshot_id: int) -> tracemalloc.Snapshot:
+        """
+        Raises:
+        - HTTPException: With a 404 status code if the snapshot is unknown or was dropped.
+        """
+        with self._lock:
+            entry = self._snapshots.get(snapshot_id)
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"Snapshot {snapshot_id} not found.")
+        return entry[1]
+
+    def snapshots(self) -> List[Tuple[int, datetime]]:
+        with self._lock:
+            return [(snapshot_id, taken_at) for snapshot_id, (taken_at, _) in self._snapshots.items()]
+
+    @staticmethod
+    def top(snapshot: tracemalloc.Snapshot, group_by: str, limit: int) -> List[Dict]:
+        """
+        Largest allocation sites of a snapshot.
+        """
+        return [
+            {"location": _location(stat.traceback, group_by), "size": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(group_by)[:limit]
+        ]
+
+    @staticmethod
+    def diff(old: tracemalloc.Snapshot, new: tracemalloc.Snapshot, group_by: str, limit: int) -> List[Dict]:
+        """
+        Allocation sites whose size changed the most from `old` to `new`.
+        """
+        return [
+            {"location": _location(stat.traceback, group_by), "size": stat.size, "size_diff": stat.size_diff,
+             "count": stat.count, "count_diff": stat.count_diff}
+            for stat in new.compare_to(old, group_by)[:limit]
+        ]
+
+    def stats(self) -> dict:
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "frames": tracemalloc.get_traceback_limit(),
+            "traced_bytes": traced,
+            "peak_bytes": peak,
+            "overhead_bytes": tracemalloc.get_tracemalloc_memory(),
+            "snapshots": len(self._snapshots),
+        }
+
+
+def _location(traceback: tracemalloc.Traceback, group_by: str) -> str:
+    if group_by == "traceback":
+        # Oldest frame first, like Python tracebacks
+        return " -> ".join(f"{frame.filename}:{frame.lineno}" for frame in traceback)
+    frame = traceback[0]
+    return frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}"
+
+
+# Profilers of this worker; each worker process profiles only itself
+cpu_profiler = SamplingProfiler()
+memory_tracer = MemoryTracer(PROFILING_MAX_SNAPSHOTS)
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+# Importing the soft delete configuration from the configuration module
+from app.api.config.env import (SOFT_DELETE_ENABLED, SOFT_DELETE_RETENTION, SOFT_DELETE_PURGE_INTERVAL,
+                                SOFT_DELETE_PURGE_BATCH, SOFT_DELETE_PURGE_PAUSE)
+
+logger = logging.getLogger(__name__)
+
+
+class ProductPurger:
+    """
+    Background remover of the products marked deleted in soft delete mode.
+
+    Every `interval` seconds a daemon thread removes the products deleted more than
+    `retention` seconds ago, through `purge_deleted_products`: `batch_size` rows per
+    shard and transaction, oldest first, with a pause of `pause` seconds between
+    transactions. Each transaction holds its row locks briefly, and the pause bounds the
+    rate at which the purge writes, so it does not starve the foreground writes nor lag
+    the MySQL replicas. A pass ends once nothing is left to purge.
+    """
+
+    def __init__(self, enabled: bool, retention: float, interval: float, batch_size: int, pause: float,
+                 purge_batch: Optional[Callable[[datetime, int], int]] = None):
+        self.enabled = enabled
+        self.retention = retention
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pause = pause
+        self._purge_batch = purge_batch
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.purged = 0
+        self.passes = 0
+        self.failures = 0
+        self.last_pass_seconds = 0.0
+        self.last_pass_at: Optional[datetime] = None
+
+    def purge_batch(self, deleted_before: datetime, batch_size: int) -> int:
+        if self._purge_batch is None:
+            # Imported here since the database module imports most of the configuration modules
+            from app.api.database import purge_deleted_products
+            self._purge_batch = purge_deleted_products
+        return self._purge_batch(deleted_before, batch_size)
+
+    def start(self):
+        """
+        Start purging in a daemon thread. Does nothing unless soft delete is enabled.
+        """
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="product-purger", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """
+        Stop the purger thread. A pass in progress stops after its current transaction.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.purge()
+
+    def purge(self) -> int:
+        """
+        Run one purge pass.
+
+        Returns:
+        - int: Number of products removed. A failed pass is logged and retried on the next one.
+        """
+        started = time.monotonic()
+        deleted_before = datetime.utcnow() - timedelta(seconds=self.retention)
+        removed = 0
+        try:
+            while not self._stop.is_set():
+                batch = self.purge_batch(deleted_before, self.batch_size)
+                removed += batch
+                if not batch or self._stop.wait(self.pause):
+                    break
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error purging deleted products: {str(e)}")
+        self.purged += removed
+        self.passes += 1
+        self.last_pass_seconds = time.monotonic() - started
+        self.last_pass_at = datetime.utcnow()
+        return removed
+
+    def stats(self) -> dict:
+        """
+        Current purger metrics.
+        """
+        return {
+            "enabled": self.enabled,
+            "purged": self.purged,
+            "passes": self.passes,
+            "failures": self.failures,
+            "last_pass_seconds": round(self.last_pass_seconds, 3),
+            "last_pass_at": self.last_pass_at.isoformat() if self.last_pass_at else None,
+        }
+
+
+product_purger = ProductPurger(SOFT_DELETE_ENABLED, SOFT_DELETE_RETENTION, SOFT_DELETE_PURGE_INTERVAL,
+                               SOFT_DELETE_PURGE_BATCH, SOFT_DELETE_PURGE_PAUSE)
@@ -0,0 +1,370 @@
+import json
+import logging
+import re
+import threading
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+# Importing the replica configuration from the configuration module
+from app.api.config.env import (API_NAME, IMPORT_BATCH_SIZE, REPLICA_PRIMARY_URL, REPLICA_MAX_STALENESS,
+                                REPLICA_RESYNC_SECONDS, REPLICA_RETRY_SECONDS, REPLICA_STREAM_COMPLETE)
+from app.api.config.deadlines import remaining
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a connection to the primary
+CONNECT_TIMEOUT = 5
+
+# Headers that describe one connection and are not forwarded
+HOP_BY_HOP = {b"connection", b"keep-alive", b"proxy-connection", b"transfer-encoding", b"te", b"trailer",
+              b"upgrade", b"host", b"content-length"}
+
+# Product reads whose data is not in the local copy, always forwarded to the primary
+PRIMARY_ONLY_READS = re.compile(r"/products/\d+/prices")
+
+# Read served locally even when stale: the stream follows the local copy, which replays the primary's events
+LOCAL_ONLY_READS = re.compile(r"/products/stream$")
+
+
+def parse_sse(lines: Iterable[bytes]) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    """
+    Parse a Server-Sent Events stream line by line.
+
+    Args:
+    - lines (Iterable[bytes]): Lines of the stream, without their line breaks.
+
+    Yields:
+    - Tuple[Optional[str], Optional[str]]: (event type, data) of every event, and (None, None)
+      for comments, which a quiet stream sends to show it is alive. Other fields, such as
+      `id` and `retry`, are ignored.
+    """
+    event, data = None, []
+    for line in lines:
+        if not line:
+            if data:
+                yield event or "message", "\n".join(data)
+            event, data = None, []
+            continue
+        field, _, value = line.decode().partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "event":
+            event = value
+        elif field == "data":
+            data.append(value)
+        elif not field:
+            yield None, None
+
+
+def ndjson_batches(lines: Iterable[bytes], batch_size: int) -> Iterator[List[dict]]:
+    """
+    Group the rows of an NDJSON export into batches.
+    """
+    batch = []
+    for line in lines:
+        if line.strip():
+            batch.append(json.loads(line))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+class ProductReplica:
+    """
+    Local read-only copy of the products table, kept current from a primary API.
+
+    The copy is the single shard of `product_shards` in replica mode (see
+    `build_router`), so every product read route queries it instead of MySQL. A
+    background thread subscribes to the primary's `/products/stream`, loads its
+    `/products/export` snapshot, and then applies each streamed change through
+    `apply_product_changes`, which keeps the query cache, the analytics snapshot and
+    the local event stream current too. Events sent while the snapshot loads wait in
+    the stream and are replayed on top of it, so no write is missed.
+
+    The stream of a primary worker only carries the writes made through that worker;
+    those of its other workers, of the consumer and of their write-behind flushes only
+    arrive with the full reload every `resync_seconds`. The staleness of the copy is
+    therefore the time since the last full reload, unless `complete_stream` says the
+    stream carries every write, in which case it is the time since the primary was last
+    heard from (an event or a keepalive). The copy counts as fresh while its staleness is
+    at most `max_staleness` seconds. `ReplicaMiddleware` forwards product reads to the
+    primary while it is not.
+
+    A "reset" event, sent for bulk writes, needs a full reload. A bulk import sends one
+    per batch, so resets are coalesced: the copy counts as stale from the first one, and
+    is reloaded once the primary goes quiet (its next keepalive), or after
+    `max_staleness / 2` seconds if the resets keep coming.
+    """
+
+    def __init__(self, primary_url: str, prefix: str, max_staleness: float, resync_seconds: float = 0,
+                 retry_seconds: float = 1, batch_size: int = 5000, complete_stream: bool = False):
+        self.primary_url = primary_url.rstrip("/")
+        self.prefix = prefix
+        self.max_staleness = max_staleness
+        self.resync_seconds = resync_seconds
+        self.retry_seconds = retry_seconds
+        self.batch_size = batch_size
+        self.complete_stream = complete_stream
+        self._session = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._response = None
+        self._last_contact: Optional[float] = None
+        self._synced_at: Optional[float] = None
+        self._reset_at: Optional[float] = None
+        self.products = 0
+        self.bootstraps = 0
+        self.events_applied = 0
+        self.reconnects = 0
+        self.forwarded = 0
+        self.last_event_lag: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.primary_url)
+
+    @property
+    def session(self):
+        # requests is only needed in replica mode
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def staleness(self) -> Optional[float]:
+        """
+        Seconds since the last full reload, or since the primary was last heard from if the
+        stream carries every write, or since a reset not reloaded yet if that is earlier.
+        None before the first snapshot was loaded.
+        """
+        if self._synced_at is None or self._last_contact is None:
+            return None
+        since = self._last_contact if self.complete_stream else self._synced_at
+        reset_at = self._reset_at
+        return time.monotonic() - (since if reset_at is None else min(since, reset_at))
+
+    def fresh(self) -> bool:
+        staleness = self.staleness()
+        return staleness is not None and staleness <= self.max_staleness
+
+    def start(self):
+        """
+        Create the local tables and start following the primary in a daemon thread.
+        """
+        if not self.enabled or self._thread is not None:
+            return
+        # Imported here since the database module imports most of the configuration modules
+        from app.api.database import product_shards
+        from app.api.models.models import Base
+        engine = product_shards.shards[0].engine
+        with engine.connect() as connection:
+            # Readers are not blocked while a change or a snapshot is written
+            connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        Base.metadata.create_all(engine)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="product-replica", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        response = self._response
+        if response is not None:
+            # Unblocks the thread waiting on the stream
+            response.close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._follow()
+            except Exception as e:
+                if not self._stop.is_set():
+                    logger.warning(f"Replica lost the primary, reconnecting: {str(e)}")
+            self._response = None
+            if self._stop.wait(self.retry_seconds):
+                return
+            self.reconnects += 1
+
+    def _follow(self):
+        # The read timeout ends a connection that stays silent for longer than a keepalive should take
+        with self.session.get(f"{self.primary_url}{self.prefix}/products/stream", stream=True,
+                              timeout=(CONNECT_TIMEOUT, self.max_staleness)) as response:
+            response.raise_for_status()
+            self._response = response
+            # Subscribed: from now on every write reaches the stream, so the snapshot can be loaded
+            self._bootstrap()
+            for event, data in parse_sse(response.iter_lines(chunk_size=None)):
+                if self._stop.is_set():
+                    return
+                self._last_contact = time.monotonic()
+                if event is not None:
+                    payload = json.loads(data)
+                    if event != "reset":
+                        self._apply(event, payload["product"])
+                        self.last_event_lag = round(time.time() - payload["timestamp"], 3)
+                    elif self._reset_at is None:
+                        self._reset_at = self._last_contact
+                # Checked on events too, since a busy stream sends no keepalives
+                now = time.monotonic()
+                if self._reset_at is not None and (event is None or now - self._reset_at >= self.max_staleness / 2):
+                    self._bootstrap()
+                elif self.resync_seconds and now - self._synced_at >= self.resync_seconds:
+                    self._bootstrap()
+
+    def _bootstrap(self):
+        from app.api.database import replace_products
+        started = time.monotonic()
+        with self.session.get(f"{self.primary_url}{self.prefix}/products/export", params={"format": "ndjson"},
+                              stream=True, timeout=(CONNECT_TIMEOUT, self.max_staleness)) as response:
+            response.raise_for_status()
+            self.products = replace_products(ndjson_batches(response.iter_lines(chunk_size=65536), self.batch_size))
+        # Changes are fresh from the moment the export started, which covers the resets received before it
+        self._synced_at = self._last_contact = started
+        self._reset_at = None
+        self.bootstraps += 1
+        logger.info(f"Replica loaded {self.products} products in {time.monotonic() - started:.2f} s.")
+
+    def _apply(self, event: str, product: dict):
+        from app.api.database import apply_product_changes
+        if event in ("created", "updated"):
+            apply_product_changes([product], [])
+        elif event == "deleted":
+            apply_product_changes([], [product["id"]])
+        self.events_applied += 1
+
+    def forwards(self, method: str, path: str) -> bool:
+        """
+        Whether a request is sent to the primary instead of being served here: product
+        writes, price history reads, and product reads while the copy is stale.
+        """
+        if not path.startswith(f"{self.prefix}/products"):
+            return False
+        if method not in ("GET", "HEAD"):
+            return True
+        if PRIMARY_ONLY_READS.search(path):
+            return True
+        return not LOCAL_ONLY_READS.search(path) and not self.fresh()
+
+    def stats(self) -> dict:
+        """
+        Current replica metrics.
+        """
+        staleness = self.staleness()
+        return {
+            "enabled": self.enabled,
+            "fresh": self.fresh(),
+            "staleness_seconds": None if staleness is None else round(staleness, 3),
+            "max_staleness_seconds": self.max_staleness,
+            "complete_stream": self.complete_stream,
+            "last_event_lag_seconds": self.last_event_lag,
+            "snapshot_products": self.products,
+            "bootstraps": self.bootstraps,
+            "events_applied": self.events_applied,
+            "reconnects": self.reconnects,
+            "forwarded": self.forwarded,
+        }
+
+
+class ReplicaMiddleware:
+    """
+    Pure ASGI middleware of replica mode that proxies the requests `ProductReplica.forwards`
+    selects to the primary, and marks the product reads served locally with their
+    staleness in `X-Replica-Staleness`.
+
+    Forwarded requests carry the client address in `X-Forwarded-For` and the remaining
+    request budget in `X-Request-Timeout-Ms`. Responses are streamed back unchanged.
+    """
+
+    def __init__(self, app, replica: ProductReplica):
+        self.app = app
+        self.replica = replica
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(f"{self.replica.prefix}/products"):
+            await self.app(scope, receive, send)
+            return
+        if self.replica.forwards(scope["method"], scope["path"]):
+            self.replica.forwarded += 1
+            await self.forward(scope, receive, send)
+            return
+
+        async def send_with_staleness(message):
+            if message["type"] == "http.response.start":
+                staleness = self.replica.staleness()
+                headers = list(message.get("headers", []))
+                headers.append((b"x-replica-staleness", f"{staleness or 0:.3f}".encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_staleness)
+
+    async def forward(self, scope, receive, send):
+        import requests
+        body, more_body = [], True
+        while more_body:
+            message = await receive()
+            body.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]
+                   if name not in HOP_BY_HOP}
+        client = scope.get("client")
+        if client:
+            forwarded_for = headers.get("x-forwarded-for")
+            headers["x-forwarded-for"] = f"{forwarded_for}, {client[0]}" if forwarded_for else client[0]
+        budget = remaining()
+        if budget is not None:
+            headers["x-request-timeout-ms"] = str(max(1, int(budget * 1000)))
+        query = scope.get("query_string", b"").decode("latin-1")
+        url = f"{self.replica.primary_url}{scope['path']}" + (f"?{query}" if query else "")
+
+        try:
+            response = await run_in_threadpool(
+                self.replica.session.request, scope["method"], url, data=b"".join(body), headers=headers,
+                stream=True, allow_redirects=False, timeout=(CONNECT_TIMEOUT, budget),
+            )
+        except requests.Timeout:
+            await self._error(send, 504, b'{"detail":"Primary did not answer in time."}')
+            return
+        except requests.RequestException as e:
+            logger.error(f"Error forwarding to the primary: {str(e)}")
+            await self._error(send, 502, b'{"detail":"Primary unavailable."}')
+            return
+
+        try:
+            response_headers = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                                for name, value in response.raw.headers.items()
+                                if name.lower().encode("latin-1") not in HOP_BY_HOP - {b"content-length"}]
+            response_headers.append((b"x-served-by", b"primary"))
+            await send({"type": "http.response.start", "status": response.status_code, "headers": response_headers})
+            # The body is passed through as received, still compressed if it was
+            chunks = response.raw.stream(65536, decode_content=False)
+            while True:
+                chunk = await run_in_threadpool(next, chunks, None)
+                if chunk is None:
+                    break
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            response.close()
+
+    @staticmethod
+    async def _error(send, status: int, body: bytes):
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+
+product_replica = ProductReplica(
+    REPLICA_PRIMARY_URL,
+    f'/api/v1/{API_NAME}',
+    REPLICA_MAX_STALENESS,
+    REPLICA_RESYNC_SECONDS,
+    REPLICA_RETRY_SECONDS,
+    IMPORT_BATCH_SIZE,
+    REPLICA_STREAM_COMPLETE,
+)
@@ -0,0 +1,245 @@
+import contextvars
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple, TypeVar
+
+from sqlalchemy import func, select, update, insert
+from sqlalchemy.exc import IntegrityError
+
+# Importing the sharding configuration and the default database from the configuration module
+from app.api.config.env import (SHARD_URLS, SHARD_STRATEGY, SHARD_RANGE_SIZE, SHARD_ID_BLOCK_SIZE, SHARD_SCATTER_THREADS,
+                                REPLICA_PRIMARY_URL, REPLICA_PATH)
+from app.api.config.db import SQLDatabase, mysql_db
+from app.api.models.models import ProductDB, ProductIdBlockDB
+
+T = TypeVar("T")
+
+
+class ReservedIdError(ValueError):
+    """
+    Raised when a product is inserted with an explicit ID that the shard's ID generator
+    may already have handed out.
+    """
+
+
+class ShardRouter:
+    """
+    Maps product IDs to the databases (shards) holding them.
+
+    With the "hash" strategy a product lives on shard `id % N`; with the "range" strategy
+    shard `s` holds the IDs from `s * range_size` up to `(s + 1) * range_size - 1`, and the
+    last shard also holds any ID beyond. New products are placed on the shards in turn
+    and take an ID from `ShardIdGenerator`, so the ID alone tells where a product lives.
+
+    With a single shard, nothing is routed: IDs come from the table's auto-increment and
+    queries run inline, exactly as without sharding. Otherwise scattered queries run on a
+    pool shared by the requests of the process, by default of one thread per shard for
+    each thread of the request threadpool, so every request can query all shards at once.
+    """
+
+    def __init__(self, shards: Sequence[SQLDatabase], strategy: str = "hash", range_size: int = 0,
+                 id_block_size: int = 1000, scatter_threads: int = 0):
+        if strategy not in ("hash", "range"):
+            raise ValueError(f"Unknown sharding strategy {strategy!r}.")
+        if strategy == "range" and range_size <= 0:
+            raise ValueError("The range strategy needs a positive range size.")
+        self.shards = list(shards)
+        self.strategy = strategy
+        self.range_size = range_size
+        self.ids = ShardIdGenerator(self, id_block_size)
+        self._placement = itertools.count()
+        # The request threadpool is the event loop's default executor, of min(32, CPUs + 4) threads
+        scatter_threads = scatter_threads or len(self.shards) * min(32, (os.cpu_count() or 1) + 4)
+        self._executor = ThreadPoolExecutor(max_workers=scatter_threads, thread_name_prefix="shard") if len(self.shards) > 1 else None
+
+    @property
+    def sharded(self) -> bool:
+        return len(self.shards) > 1
+
+    def index_of(self, product_id: int) -> int:
+        """
+        Index of the shard holding a product.
+        """
+        if self.strategy == "hash":
+            return product_id % len(self.shards)
+        return min(product_id // self.range_size, len(self.shards) - 1)
+
+    def shard_for(self, product_id: int) -> SQLDatabase:
+        """
+        Shard holding a product.
+        """
+        return self.shards[self.index_of(product_id)]
+
+    def compose_id(self, index: int, sequence: int) -> int:
+        """
+        ID of the `sequence`-th product created on shard `index`.
+        """
+        if self.strategy == "hash":
+            return sequence * len(self.shards) + index
+        if sequence >= self.range_size:
+            raise ValueError(f"Shard {index} has used up its range of {self.range_size} IDs.")
+        return index * self.range_size + sequence
+
+    def sequence_of(self, product_id: int) -> int:
+        """
+        Sequence number of a product ID on its shard, the inverse of `compose_id`.
+        """
+        if self.strategy == "hash":
+            return product_id // len(self.shards)
+        return product_id - self.index_of(product_id) * self.range_size
+
+    def place_new(self) -> Tuple[SQLDatabase, Optional[int]]:
+        """
+        Choose the shard and ID of a new product.
+
+        Returns:
+        - Tuple[SQLDatabase, Optional[int]]: Shard to insert into, and the product ID, or
+          None to let the table's auto-increment choose it when there is a single shard.
+        """
+        if not self.sharded:
+            return self.shards[0], None
+        index = next(self._placement) % len(self.shards)
+        return self.shards[index], self.ids.next_id(index)
+
+    def group_ids(self, product_ids: Iterable[int]) -> Dict[int, List[int]]:
+        """
+        Group product IDs by the index of their shard, keeping their order.
+        """
+        groups: Dict[int, List[int]] = {}
+        for product_id in product_ids:
+            groups.setdefault(self.index_of(product_id), []).append(product_id)
+        return groups
+
+    def scatter(self, fn: Callable[[int, SQLDatabase], T], indexes: Optional[Iterable[int]] = None) -> List[T]:
+        """
+        Run `fn` on several shards in parallel and gather the results in shard order.
+
+        The calls run in the context of the caller, so they keep its request deadline.
+
+        Args:
+        - fn (Callable[[int, SQLDatabase], T]): Function querying one shard, given its index and database.
+        - indexes (Optional[Iterable[int]]): Shards to query. Defaults to all of them.
+
+        Returns:
+        - List[T]: Result of each call.
+
+        Raises:
+        - Exception: The error of the first failed shard in shard order, once every call has finished.
+        """
+        indexes = range(len(self.shards)) if indexes is None else sorted(indexes)
+        if self._executor is None or len(indexes) == 1:
+            return [fn(index, self.shards[index]) for index in indexes]
+        futures = [self._executor.submit(contextvars.copy_context().run, fn, index, self.shards[index]) for index in indexes]
+        wait(futures)
+        return [future.result() for future in futures]
+
+
+class ShardIdGenerator:
+    """
+    Hands out product IDs that encode their shard, without coordination between workers.
+
+    Each shard keeps a counter of ID blocks in its `product_id_blocks` table. A worker
+    reserves a whole block of `block_size` sequence numbers with one short transaction,
+    then numbers new products from it in memory; the router turns a sequence number into
+    an ID of that shard. Sequence number 0 is never used.
+
+    The counter of a shard starts past the highest ID already stored there, such as
+    migrated rows. Products inserted with an explicit ID go through `claim`, which moves
+    the counter past them, or rejects them if they fall in a block that may already have
+    been handed out.
+    """
+
+    def __init__(self, router: ShardRouter, block_size: int):
+        self.router = router
+        self.block_size = block_size
+        self._lock = threading.Lock()
+        self._next: Dict[int, int] = {}
+        self._end: Dict[int, int] = {}
+        self._seeded = set()
+
+    def next_id(self, index: int) -> int:
+        """
+        Next product ID of shard `index`.
+        """
+        with self._lock:
+            sequence = self._next.get(index, 0)
+            if sequence >= self._end.get(index, 0):
+                block = self._reserve_block(index)
+                sequence, self._end[index] = block * self.block_size, (block + 1) * self.block_size
+            self._next[index] = sequence + 1
+        if sequence == 0:
+            return self.next_id(index)
+        return self.router.compose_id(index, sequence)
+
+    def _first_free_block(self, connection, index: int, product_ids: Sequence[int] = ()) -> int:
+        # First block past the IDs stored on the shard and `product_ids`
+        highest = connection.execute(select(func.max(ProductDB.__table__.c.id))).scalar()
+        highest = max([product_id for product_id in (highest, *product_ids) if product_id is not None], default=None)
+        return 0 if highest is None else self.router.sequence_of(highest) // self.block_size + 1
+
+    def _ensure_counter(self, index: int):
+        # Creates the counter of a shard, starting past the IDs already stored there
+        if index in self._seeded:
+            return
+        table = ProductIdBlockDB.__table__
+        try:
+            with self.router.shards[index].engine.begin() as connection:
+                if connection.execute(select(table.c.shard).where(table.c.shard == index)).first() is None:
+                    connection.execute(insert(table).values(shard=index, next_block=self._first_free_block(connection, index)))
+        except IntegrityError:
+            # Another worker created the row first
+            pass
+        self._seeded.add(index)
+
+    def _reserve_block(self, index: int) -> int:
+        table = ProductIdBlockDB.__table__
+        self._ensure_counter(index)
+        with self.router.shards[index].engine.begin() as connection:
+            # The UPDATE locks the row until commit, so concurrent workers get distinct blocks
+            connection.execute(update(table).where(table.c.shard == index).values(next_block=table.c.next_block + 1))
+            return connection.execute(select(table.c.next_block).where(table.c.shard == index)).scalar() - 1
+
+    def claim(self, connection, index: int, product_ids: Sequence[int]):
+        """
+        Keep explicit IDs about to be inserted on shard `index` out of the generated ones.
+
+        Runs in the transaction inserting them, so the counter row stays locked until they
+        are committed. Does nothing with a single shard, whose IDs come from auto-increment.
+
+        Args:
+        - connection: Connection of the inserting transaction on shard `index`.
+        - product_ids (Sequence[int]): Explicit IDs of the inserted products.
+
+        Raises:
+        - ReservedIdError: If one of the IDs lies in a block that may already have been handed out.
+        """
+        if not self.router.sharded or not product_ids:
+            return
+        table = ProductIdBlockDB.__table__
+        sequences = [self.router.sequence_of(product_id) for product_id in product_ids]
+        next_block = connection.execute(select(table.c.next_block).where(table.c.shard == index).with_for_update()).scalar()
+        if next_block is None:
+            # No ID was generated on this shard yet; the counter starts past these ones.
+            # Created in this transaction, which may already hold the write lock of the shard
+            connection.execute(insert(table).values(shard=index, next_block=self._first_free_block(connection, index, product_ids)))
+            return
+        if min(sequences) < next_block * self.block_size:
+            raise ReservedIdError(f"Product ID {product_ids[sequences.index(min(sequences))]} is reserved for new products of shard {index}.")
+        connection.execute(update(table).where(table.c.shard == index).values(next_block=max(sequences) // self.block_size + 1))
+
+
+def build_router() -> ShardRouter:
+    """
+    Router over the databases listed in `SHARD_URLS`, or over the MySQL database alone.
+    In replica mode, over the local SQLite copy of the products table alone.
+    """
+    if REPLICA_PRIMARY_URL:
+        return ShardRouter([SQLDatabase(f"sqlite:///{REPLICA_PATH}")])
+    urls = [url.strip() for url in SHARD_URLS.split(',') if url.strip()]
+    shards = [SQLDatabase(url) for url in urls] if urls else [mysql_db]
+    return ShardRouter(shards, SHARD_STRATEGY, SHARD_RANGE_SIZE, SHARD_ID_BLOCK_SIZE, SHARD_SCATTER_THREADS)
+
+
+product_shards = build_router()
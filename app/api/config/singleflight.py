@@ -0,0 +1,132 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+# Importing the coalescing configuration from the configuration module
+from app.api.config.env import SINGLE_FLIGHT_TIMEOUT
+from app.api.config.deadlines import DeadlineExceeded, remaining
+
+
+class SingleFlightTimeout(Exception):
+    """
+    Raised when a coalesced caller gives up waiting for the in-flight call it joined.
+    """
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one.
+
+    The first caller for a key (the leader) runs the function; every caller that arrives
+    while it is still running waits for and shares its result, or its exception. Routes
+    are sync and run in the threadpool, so waiting is done on a `threading.Event`.
+
+    The function runs under the leader's request deadline. When it fails with
+    `DeadlineExceeded`, that is the leader's budget running out, not the followers': each
+    follower with time left tries again, the first one leading the new call, so a client
+    sending a tiny budget cannot fail the reads it was coalesced with.
+    """
+
+    def __init__(self, timeout: float = 5.0):
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.collapsed = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.retries = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run `fn` unless an identical call is already in flight, and return its result.
+
+        Args:
+        - key (Hashable): Identity of the call, e.g. ("product", 42).
+        - fn (Callable[[], Any]): Function doing the actual work.
+        - timeout (Optional[float]): Seconds a coalesced caller waits for the leader. Defaults to the instance timeout.
+
+        Returns:
+        - Any: Result of the shared call.
+
+        Raises:
+        - SingleFlightTimeout: If the shared call does not finish in time.
+        - DeadlineExceeded: If the request deadline runs out while waiting for the shared call.
+        - Exception: Whatever the shared call raised.
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.leaders += 1
+                else:
+                    self.collapsed += 1
+
+            if leader:
+                try:
+                    call.result = fn()
+                except BaseException as e:
+                    call.error = e
+                finally:
+                    with self._lock:
+                        if self._calls.get(key) is call:
+                            del self._calls[key]
+                        if call.error is not None:
+                            self.errors += 1
+                    call.done.set()
+            else:
+                wait = self.timeout if timeout is None else timeout
+                budget = remaining()
+                if not call.done.wait(wait if budget is None else max(min(wait, budget), 0)):
+                    with self._lock:
+                        self.timeouts += 1
+                    if budget is not None and budget < wait:
+                        raise DeadlineExceeded()
+                    raise SingleFlightTimeout(f"Timed out waiting for in-flight call {key!r}.")
+                if isinstance(call.error, DeadlineExceeded):
+                    budget = remaining()
+                    if budget is None or budget > 0:
+                        # The leader's deadline ran out, not this caller's
+                        with self._lock:
+                            self.retries += 1
+                        continue
+
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+    def forget_all(self):
+        """
+        Detach every in-flight call, so callers arriving from now on start a fresh one.
+
+        Called after writes: a read that started before the commit may return stale data,
+        and only the callers that already joined it should get that result.
+        """
+        with self._lock:
+            self._calls.clear()
+
+    def stats(self) -> dict:
+        """
+        Current coalescing metrics.
+        """
+        return {
+            "in_flight": len(self._calls),
+            "leaders": self.leaders,
+            "collapsed": self.collapsed,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+        }
+
+
+product_reads = SingleFlight(SINGLE_FLIGHT_TIMEOUT)
@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Importing the write-behind configuration from the configuration module
+from app.api.config.env import WRITE_BEHIND_ENABLED, WRITE_BEHIND_FLUSH_INTERVAL, WRITE_BEHIND_MAX_BATCH
+
+logger = logging.getLogger(__name__)
+
+
+class PriceWriteBehind:
+    """
+    In-memory buffer that coalesces price updates and writes them behind in batches.
+
+    Each product keeps only its latest buffered price. A background thread flushes the
+    buffer every `flush_interval` seconds, or as soon as it holds `max_batch` products, in
+    one transaction through `apply_product_changes`. Until a price is committed, reads
+    overlay it from the buffer, so a client reads back what it just wrote.
+
+    Buffered prices live only in this worker's memory: they are lost if the process
+    dies before the flush, and other workers see them only once flushed. `stats()`
+    reports how many prices are pending and how old the oldest one is.
+    """
+
+    def __init__(self, enabled: bool, flush_interval: float, max_batch: int,
+                 apply_batch: Optional[Callable[[List[dict], List[int]], Tuple[int, int, int]]] = None):
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._apply_batch = apply_batch
+        self._pending: Dict[int, float] = {}
+        self._since: Dict[int, float] = {}
+        self._in_flight: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.buffered = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+        self.last_flush_lag = 0.0
+        self.max_flush_lag = 0.0
+
+    def apply_batch(self, upserts: List[dict], deletes: List[int]) -> Tuple[int, int, int]:
+        if self._apply_batch is None:
+            # Imported here because app.api.database buffers its price updates in this module
+            from app.api.database import apply_product_changes
+            self._apply_batch = apply_product_changes
+        return self._apply_batch(upserts, deletes)
+
+    def put(self, product_id: int, price: float):
+        """
+        Buffer the new price of a product, replacing any price buffered before.
+
+        Args:
+        - product_id (int): ID of the product.
+        - price (float): New price.
+        """
+        with self._lock:
+            if product_id in self._pending:
+                self.coalesced += 1
+            else:
+                self._since[product_id] = time.monotonic()
+            self._pending[product_id] = price
+            self.buffered += 1
+            full = len(self._pending) >= self.max_batch
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="price-write-behind", daemon=True)
+                self._thread.start()
+        if full:
+            self._wakeup.set()
+
+    def get(self, product_id: int) -> Optional[float]:
+        """
+        Price of a product not committed yet, or None if it has none.
+        """
+        with self._lock:
+            price = self._pending.get(product_id)
+            return self._in_flight.get(product_id) if price is None else price
+
+    def overlay(self) -> Dict[int, float]:
+        """
+        Copy of every price not committed yet, by product ID.
+        """
+        with self._lock:
+            if not self._pending and not self._in_flight:
+                return {}
+            return {**self._in_flight, **self._pending}
+
+    def discard(self, product_id: int):
+        """
+        Drop the buffered price of a product that is about to be written or deleted directly.
+
+        Waits for a flush in progress, so it cannot commit an older price after the direct write.
+        """
+        with self._flush_lock, self._lock:
+            self._pending.pop(product_id, None)
+            self._since.pop(product_id, None)
+
+    def flush(self) -> int:
+        """
+        Commit every buffered price now.
+
+        Returns:
+        - int: Number of products written. On failure the prices go back to the buffer,
+          unless a newer price was buffered meanwhile, and 0 is returned.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                since, self._since = self._since, {}
+                self._in_flight = batch
+            try:
+                self.apply_batch([{"id": product_id, "price": price} for product_id, price in batch.items()], [])
+            except Exception as e:
+                with self._lock:
+                    for product_id, price in batch.items():
+                        if product_id not in self._pending:
+                            self._pending[product_id] = price
+                            self._since[product_id] = since[product_id]
+                    self._in_flight = {}
+                    self.failures += 1
+                logger.error(f"Error flushing {len(batch)} buffered prices, retrying: {str(e)}")
+                return 0
+            lag = time.monotonic() - min(since.values())
+            with self._lock:
+                self._in_flight = {}
+                self.flushed += len(batch)
+                self.flushes += 1
+                self.last_flush_lag = lag
+                self.max_flush_lag = max(self.max_flush_lag, lag)
+            return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def close(self):
+        """
+        Stop the flusher thread and commit what is left in the buffer.
+        """
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self._stop.clear()
+
+    def stats(self) -> dict:
+        """
+        Current write-behind metrics.
+        """
+        with self._lock:
+            oldest = min(self._since.values(), default=None)
+            return {
+                "enabled": self.enabled,
+                "pending": len(self._pending),
+                "oldest_pending_seconds": round(time.monotonic() - oldest, 3) if oldest is not None else 0.0,
+                "buffered": self.buffered,
+                "coalesced": self.coalesced,
+                "flushed": self.flushed,
+                "flushes": self.flushes,
+                "failures": self.failures,
+                "last_flush_lag_seconds": round(self.last_flush_lag, 3),
+                "max_flush_lag_seconds": round(self.max_flush_lag, 3),
+            }
+
+
+price_write_behind = PriceWriteBehind(WRITE_BEHIND_ENABLED, WRITE_BEHIND_FLUSH_INTERVAL, WRITE_BEHIND_MAX_BATCH)
@@ -1,8 +1,179 @@
-from app.api.models.models import ProductDB, ProductCreate, ProductPatch
-from app.api.config.db import mysql_db
-from typing import List, Optional
+from app.api.models.models import ProductDB, ProductCreate, ProductPatch, PriceHistoryDB, PriceDailyDB
+from app.api.config.shards import product_shards
+from app.api.config.env import MULTI_GET_CHUNK_SIZE, EXPORT_BATCH_SIZE, SOFT_DELETE_ENABLED, SOFT_DELETE_PURGE_BATCH
+from app.api.config.analytics import catalog_snapshot
+from app.api.config.cache import query_cache
+from app.api.config.events import product_events
+from app.api.config.singleflight import product_reads
+from app.api.config.write_behind import price_write_behind
+from app.api.adapters.n8 import n8_webhook
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from contextlib import ExitStack
+from datetime import date, datetime
+import heapq
+import itertools
+from operator import itemgetter
+from sqlalchemy import bindparam, case, delete, insert, select, update
+from sqlalchemy.dialects import mysql, sqlite
 from sqlalchemy.orm.exc import NoResultFound
 
+def _notify_write(event_type: str, product: dict):
+    """
+    Propagate a committed product write to the in-process consumers of product changes.
+
+    Args:
+    - event_type (str): One of "created", "updated" or "deleted".
+    - product (dict): Product data after the write (before it, for deletions).
+    """
+    # Reads started before the commit are detached first: a reader seeing the new cache
+    # generation must not join one of them and store its stale result under that generation
+    product_reads.forget_all()
+    query_cache.bump()
+    catalog_snapshot.apply(event_type, product)
+    product_events.publish(event_type, product)
+    n8_webhook.publish(event_type, product)
+
+def _notify_bulk_write(event_type: str, products: List[dict]):
+    """
+    Propagate a committed batch of product writes.
+
+    Rows inserted without an explicit ID cannot be announced one by one, so in that
+    case a single "reset" event tells followers of every product to resync.
+
+    Args:
+    - event_type (str): One of "created", "updated" or "deleted".
+    - products (List[dict]): Product data of the batch.
+    """
+    if not all("id" in product for product in products):
+        _notify_reset(len(products))
+        return
+    product_reads.forget_all()
+    query_cache.bump()
+    for product in products:
+        catalog_snapshot.apply(event_type, product)
+        product_events.publish(event_type, product)
+        n8_webhook.publish(event_type, product)
+
+def _notify_reset(count: int):
+    """
+    Tell the consumers of product changes to resync from the table, after `count` rows
+    were written that cannot be announced one by one.
+    """
+    product_reads.forget_all()
+    query_cache.bump()
+    catalog_snapshot.apply("reset", {})
+    product_events.publish("reset", {"id": None, "count": count})
+    n8_webhook.publish("reset", {"id": None, "count": count})
+
+def _merge_by_id(results: List[list], key=itemgetter(0)) -> list:
+    """
+    Merge per-shard results, each already ordered by product ID, into one ordered list.
+    """
+    if len(results) == 1:
+        return results[0]
+    return list(heapq.merge(*results, key=key))
+
+def _with_buffered_price(product: Optional[ProductDB]) -> Optional[ProductDB]:
+    """
+    The product with its price not committed yet by the write-behind buffer, if any.
+
+    The instance may be shared by concurrent readers, so a detached copy is returned
+    rather than changing it.
+    """
+    price = price_write_behind.get(product.id) if product is not None else None
+    if price is None:
+        return product
+    buffered = ProductDB(**product.as_dict())
+    buffered.price = price
+    return buffered
+
+def _with_buffered_prices(rows: List[tuple]) -> List[tuple]:
+    """
+    Product rows with the prices not committed yet by the write-behind buffer.
+    """
+    overlay = price_write_behind.overlay()
+    if not overlay:
+        return rows
+    return [(*row[:3], overlay[row[0]]) if row[0] in overlay else row for row in rows]
+
+def _record_prices(connection, prices: List[Tuple[int, float]]):
+    """
+    Append price changes to the price history and fold them into the daily candles.
+
+    Runs in the transaction that changes the prices, so history and products commit together.
+
+    Args:
+    - connection: Connection of the transaction.
+    - prices (List[Tuple[int, float]]): (product ID, new price) pairs, in the order they were applied.
+    """
+    if not prices:
+        return
+    changed_at = datetime.utcnow()
+    connection.execute(insert(PriceHistoryDB.__table__), [
+        {"product_id": product_id, "price": price, "changed_at": changed_at} for product_id, price in prices
+    ])
+    candles: Dict[int, dict] = {}
+    for product_id, price in prices:
+        candle = candles.get(product_id)
+        if candle is None:
+            candles[product_id] = {"product_id": product_id, "day": changed_at.date(), "open": price, "high": price,
+                                   "low": price, "close": price, "changes": 1}
+        else:
+            candle.update(high=max(candle["high"], price), low=min(candle["low"], price), close=price, changes=candle["changes"] + 1)
+    connection.execute(_upsert_daily_candles(connection.dialect.name), list(candles.values()))
+
+def _upsert_daily_candles(dialect_name: str):
+    table = PriceDailyDB.__table__
+    if dialect_name == "mysql":
+        statement = mysql.insert(table)
+        new = statement.inserted
+    else:
+        statement = sqlite.insert(table)
+        new = statement.excluded
+    # The open price of an existing day is kept; the others widen or move on
+    merged = {
+        "high": case((new.high > table.c.high, new.high), else_=table.c.high),
+        "low": case((new.low < table.c.low, new.low), else_=table.c.low),
+        "close": new.close,
+        "changes": table.c.changes + new.changes,
+    }
+    if dialect_name == "mysql":
+        return statement.on_duplicate_key_update(**merged)
+    return statement.on_conflict_do_update(index_elements=[table.c.product_id, table.c.day], set_=merged)
+
+def _product_columns():
+    table = ProductDB.__table__
+    return table.c.id, table.c.name, table.c.description, table.c.price
+
+def _live_products():
+    """
+    Condition matching the products that are not deleted, served by the index on `deleted_at`.
+    """
+    return ProductDB.__table__.c.deleted_at.is_(None)
+
+def _delete_rows(connection, product_ids: List[int]) -> List[int]:
+    """
+    Delete products in the transaction of `connection`: in soft delete mode a single
+    UPDATE marks them deleted and the purger removes them later, otherwise they are
+    removed right away.
+
+    The live products among `product_ids` are selected and locked first, so only
+    products this transaction actually deletes are reported.
+
+    Returns:
+    - List[int]: IDs of the deleted products, not counting unknown ones or those deleted before.
+    """
+    table = ProductDB.__table__
+    live = list(connection.execute(select(table.c.id).where(table.c.id.in_(product_ids), _live_products()).with_for_update()).scalars())
+    if not live:
+        return []
+    if SOFT_DELETE_ENABLED:
+        statement = update(table).where(table.c.id.in_(live)).values(deleted_at=datetime.utcnow())
+    else:
+        statement = delete(table).where(table.c.id.in_(live))
+    connection.execute(statement)
+    return live
+
 def create_product_in_db(product_data: ProductCreate) -> ProductDB:
     """
     Create a new product in the database.
@@ -16,20 +187,27 @@ def create_product_in_db(product_data: ProductCreate) -> ProductDB:
     Raises:
     - Exception: If there's an error during the database operation.
     """
-    db = mysql_db.SessionLocal()
+    shard, product_id = product_shards.place_new()
+    db = shard.SessionLocal()
     try:
-        new_product = ProductDB(name=product_data.name, description=product_data.description, price=product_data.price)
+        new_product = ProductDB(id=product_id, name=product_data.name, description=product_data.description, price=product_data.price)
         db.add(new_product)
         db.commit()
         db.refresh(new_product)
+        _notify_write("created", new_product.as_dict())
         return new_product
     except Exception as e:
         db.rollback()
         raise e
+    finally:
+        db.close()
 
 def get_all_products() -> List[ProductDB]:
     """
-    Retrieve all products from the database.
+    Retrieve all products from the database, ordered by ID.
+
+    Every shard is queried in parallel and the results are merged. Concurrent calls share
+    a single query.
 
     Returns:
     - List[ProductDB]: List of all products.
@@ -37,16 +215,49 @@ def get_all_products() -> List[ProductDB]:
     Raises:
     - Exception: If there's an error during the database operation.
     """
-    db = mysql_db.SessionLocal()
-    try:
-        return db.query(ProductDB).all()
-    except Exception as e:
-        raise e
+    products = product_reads.do(("products", "all"), _query_all_products)
+    if not price_write_behind.overlay():
+        return products
+    return [_with_buffered_price(product) for product in products]
+
+def get_all_product_rows() -> List[tuple]:
+    """
+    Retrieve all products from the database as plain (id, name, description, price) tuples.
+
+    Unlike `get_all_products` this goes through SQLAlchemy Core: no ORM instances, no
+    identity map and no instance state are created, which keeps large lists cheap.
+    Rows are ordered by ID. Concurrent calls share a single query.
+
+    Returns:
+    - List[tuple]: List of all product rows.
+
+    Raises:
+    - Exception: If there's an error during the database operation.
+    """
+    return _with_buffered_prices(product_reads.do(("products:rows", "all"), _query_all_product_rows))
+
+def _query_all_product_rows() -> List[tuple]:
+    query = select(*_product_columns()).where(_live_products()).order_by(ProductDB.id)
+    def query_shard(index, shard):
+        with shard.engine.connect() as connection:
+            return [tuple(row) for row in connection.execute(query)]
+    return _merge_by_id(product_shards.scatter(query_shard))
+
+def _query_all_products() -> List[ProductDB]:
+    def query_shard(index, shard):
+        db = shard.SessionLocal()
+        try:
+            return db.query(ProductDB).filter(_live_products()).order_by(ProductDB.id).all()
+        finally:
+            db.close()
+    return _merge_by_id(product_shards.scatter(query_shard), key=lambda product: product.id)
 
 def get_product_by_id(product_id: int) -> Optional[ProductDB]:
     """
     Retrieve a product from the database by its ID.
 
+    Concurrent calls for the same ID share a single query.
+
     Args:
     - product_id (int): ID of the product to be fetched.
 
@@ -56,16 +267,102 @@ def get_product_by_id(product_id: int) -> Optional[ProductDB]:
     Raises:
     - Exception: If there's an error during the database operation.
     """
-    db = mysql_db.SessionLocal()
+    return _with_buffered_price(product_reads.do(("product", product_id), lambda: _query_product_by_id(product_id)))
+
+def _query_product_by_id(product_id: int) -> Optional[ProductDB]:
+    db = product_shards.shard_for(product_id).SessionLocal()
     try:
-        return db.query(ProductDB).filter(ProductDB.id == product_id).first()
+        return db.query(ProductDB).filter(ProductDB.id == product_id, _live_products()).first()
     except Exception as e:
         raise e
+    finally:
+        db.close()
+
+def get_products_by_ids(product_ids: List[int]) -> Tuple[List[ProductDB], List[int]]:
+    """
+    Retrieve many products from the database in as few queries as possible.
+
+    IDs are resolved with a single `IN (...)` query per shard holding some of them, run in
+    parallel, or one query per chunk of `MULTI_GET_CHUNK_SIZE` IDs for very large lists.
+    Concurrent calls for the same set of IDs, in any order, share those queries.
+
+    Args:
+    - product_ids (List[int]): IDs of the products to be fetched. Duplicates are ignored.
+
+    Returns:
+    - Tuple[List[ProductDB], List[int]]: Found products and missing IDs, both in request order.
+
+    Raises:
+    - Exception: If there's an error during the database operation.
+    """
+    unique_ids = list(dict.fromkeys(product_ids))
+    normalized = tuple(sorted(unique_ids))
+    found = product_reads.do(("products:ids", normalized), lambda: _query_products_by_ids(normalized))
+    products = [_with_buffered_price(found[product_id]) for product_id in unique_ids if product_id in found]
+    missing = [product_id for product_id in unique_ids if product_id not in found]
+    return products, missing
+
+def _query_products_by_ids(product_ids: Tuple[int, ...]) -> Dict[int, ProductDB]:
+    groups = product_shards.group_ids(product_ids)
+    def query_shard(index, shard):
+        shard_ids = groups[index]
+        db = shard.SessionLocal()
+        try:
+            found = {}
+            for start in range(0, len(shard_ids), MULTI_GET_CHUNK_SIZE):
+                chunk = shard_ids[start:start + MULTI_GET_CHUNK_SIZE]
+                for product in db.query(ProductDB).filter(ProductDB.id.in_(chunk), _live_products()):
+                    found[product.id] = product
+            return found
+        finally:
+            db.close()
+    found = {}
+    for shard_found in product_shards.scatter(query_shard, groups):
+        found.update(shard_found)
+    return found
+
+def get_products_page(after_id: Optional[int], limit: int, min_price: Optional[float] = None,
+                      max_price: Optional[float] = None) -> List[tuple]:
+    """
+    Retrieve a page of products ordered by ID, optionally filtered by price.
+
+    Pages are keyset-paginated: each shard returns its first `limit` matching rows after
+    `after_id`, in parallel, and the merged rows are cut to `limit`. This costs the same
+    for every page, unlike an OFFSET. The price filter applies to committed prices.
+
+    Args:
+    - after_id (Optional[int]): ID of the last product of the previous page, or None for the first page.
+    - limit (int): Maximum number of products.
+    - min_price (Optional[float]): Lowest price, inclusive.
+    - max_price (Optional[float]): Highest price, inclusive.
+
+    Returns:
+    - List[tuple]: Rows of (id, name, description, price).
+
+    Raises:
+    - Exception: If there's an error during the database operation.
+    """
+    table = ProductDB.__table__
+    query = select(*_product_columns()).where(_live_products()).order_by(table.c.id).limit(limit)
+    if after_id is not None:
+        query = query.where(table.c.id > after_id)
+    if min_price is not None:
+        query = query.where(table.c.price >= min_price)
+    if max_price is not None:
+        query = query.where(table.c.price <= max_price)
+    def query_shard(index, shard):
+        with shard.engine.connect() as connection:
+            return [tuple(row) for row in connection.execute(query)]
+    page = list(itertools.islice(heapq.merge(*product_shards.scatter(query_shard), key=itemgetter(0)), limit))
+    return _with_buffered_prices(page)
 
 def delete_product_by_id(product_id: int) -> ProductDB:
     """
     Delete a product from the database by its ID.
 
+    In soft delete mode the product is marked deleted by a single UPDATE, and read back
+    in the same short transaction; the purger removes the row later.
+
     Args:
     - product_id (int): ID of the product to be deleted.
 
@@ -76,23 +373,39 @@ def delete_product_by_id(product_id: int) -> ProductDB:
     - NoResultFound: If no product is found with the given ID.
     - Exception: If there's an error during the database operation.
     """
-    db = mysql_db.SessionLocal()
+    price_write_behind.discard(product_id)
+    if SOFT_DELETE_ENABLED:
+        with product_shards.shard_for(product_id).engine.begin() as connection:
+            if not _delete_rows(connection, [product_id]):
+                return None
+            row = connection.execute(select(*_product_columns()).where(ProductDB.id == product_id)).first()
+        product = ProductDB(id=row[0], name=row[1], description=row[2], price=row[3])
+        _notify_write("deleted", product.as_dict())
+        return product
+    db = product_shards.shard_for(product_id).SessionLocal()
     try:
-        product = db.query(ProductDB).filter(ProductDB.id == product_id).first()
+        product = db.query(ProductDB).filter(ProductDB.id == product_id, _live_products()).first()
         if product is None:
             return None
+        deleted = product.as_dict()
         db.delete(product)
         db.commit()
+        _notify_write("deleted", deleted)
         return product
     except NoResultFound:
         return None
     except Exception as e:
         raise e
+    finally:
+        db.close()
 
 def update_product_in_db(product_id: int, product_update: ProductPatch) -> Optional[ProductDB]:
     """
     Update a product in the database.
 
+    With write-behind enabled, an update of the price alone is buffered and committed
+    with the next flush; the returned product already carries the new price.
+
     Args:
     - product_id (int): ID of the product to be updated.
     - product_update (ProductPatch): Data with which the product is to be updated.
@@ -103,19 +416,362 @@ def update_product_in_db(product_id: int, product_update: ProductPatch) -> Optio
     Raises:
     - Exception: If there's an error during the database operation.
     """
-    db = mysql_db.SessionLocal()
+    update_data = product_update.dict(exclude_unset=True)
+    if price_write_behind.enabled and update_data.keys() == {"price"} and update_data["price"] is not None:
+        product = get_product_by_id(product_id)
+        if product is None:
+            return None
+        price_write_behind.put(product_id, update_data["price"])
+        query_cache.bump()
+        return _with_buffered_price(product)
+    if "price" in update_data:
+        # A direct price write must not be overwritten by an older buffered price
+        price_write_behind.discard(product_id)
+
+    db = product_shards.shard_for(product_id).SessionLocal()
     try:
-        product = db.query(ProductDB).filter(ProductDB.id == product_id).first()
+        product = db.query(ProductDB).filter(ProductDB.id == product_id, _live_products()).first()
         if not product:
             return None
 
-        update_data = product_update.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(product, key, value)
+        if update_data.get("price") is not None:
+            _record_prices(db.connection(), [(product_id, update_data["price"])])
         
         db.commit()
         db.refresh(product)
-        return product
+        _notify_write("updated", product.as_dict())
+        return _with_buffered_price(product)
     except Exception as e:
         db.rollback()
         raise e
+    finally:
+        db.close()
+
+def iter_product_batches(batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[Sequence[tuple]]:
+    """
+    Stream every product from the database through server-side cursors.
+
+    Rows are fetched `batch_size` at a time as plain (id, name, description, price)
+    tuples, so memory stays bounded whatever the size of the table. With several shards,
+    one cursor per shard is read in step and the rows are merged by ID.
+
+    Args:
+    - batch_size (int): Number of rows per batch.
+
+    Yields:
+    - Sequence[tuple]: Next batch of rows, ordered by ID.
+
+    Raises:
+    - Exception: If there's an error during the database operation.
+    """
+    query = select(*_product_columns()).where(_live_products()).order_by(ProductDB.id)
+    def stream_shard(shard) -> Iterator[Sequence[tuple]]:
+        with shard.engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, max_row_buffer=batch_size).execute(query)
+            for batch in result.partitions(batch_size):
+                yield batch
+    if not product_shards.sharded:
+        yield from stream_shard(product_shards.shards[0])
+        return
+    rows = heapq.merge(*(itertools.chain.from_iterable(stream_shard(shard)) for shard in product_shards.shards), key=itemgetter(0))
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def bulk_insert_products(products: List[dict]) -> int:
+    """
+    Insert a batch of products in a single transaction per shard.
+
+    With several shards, products without an ID get one from the shard-aware generator,
+    and the shards are written in parallel.
+
+    Args:
+    - products (List[dict]): Rows with `name`, `description`, `price` and optionally `id`.
+
+    Returns:
+    - int: Number of inserted products.
+
+    Raises:
+    - Exception: If there's an error during the database operation. Nothing from the batch is inserted
+      then on the shard that failed; the other shards may have committed their part.
+    """
+    if not products:
+        return 0
+    explicit_ids = {product["id"] for product in products if "id" in product}
+    if product_shards.sharded:
+        products = [product if "id" in product else {**product, "id": product_shards.place_new()[1]} for product in products]
+        groups = {}
+        for product in products:
+            groups.setdefault(product_shards.index_of(product["id"]), []).append(product)
+    else:
+        groups = {0: products}
+    def insert_shard(index, shard):
+        with_id = [product for product in groups[index] if "id" in product]
+        without_id = [product for product in groups[index] if "id" not in product]
+        with shard.engine.begin() as connection:
+            product_shards.ids.claim(connection, index, [product["id"] for product in with_id if product["id"] in explicit_ids])
+            # An executemany needs the same columns in every row
+            for rows in (with_id, without_id):
+                if rows:
+                    connection.execute(insert(ProductDB.__table__), rows)
+    product_shards.scatter(insert_shard, groups)
+    _notify_bulk_write("created", products)
+    return len(products)
+
+def replace_products(batches: Iterable[List[dict]]) -> int:
+    """
+    Replace every product with the given rows, in a single transaction per shard.
+
+    Readers keep seeing the previous rows until the transactions commit. It is how a
+    local replica loads a snapshot of the catalog.
+
+    Args:
+    - batches (Iterable[List[dict]]): Batches of complete rows (`id`, `name`, `description` and `price`).
+
+    Returns:
+    - int: Number of products after the replacement.
+
+    Raises:
+    - Exception: If there's an error during the database operation or while reading the batches; nothing is
+      replaced then on the shards that had not committed yet.
+    """
+    table = ProductDB.__table__
+    count = 0
+    with ExitStack() as stack:
+        connections = [stack.enter_context(shard.engine.begin()) for shard in product_shards.shards]
+        for connection in connections:
+            connection.execute(delete(table))
+        for batch in batches:
+            groups = {}
+            for row in batch:
+                groups.setdefault(product_shards.index_of(row["id"]), []).append(row)
+            for index, rows in groups.items():
+                connections[index].execute(insert(table), rows)
+            count += len(batch)
+    _notify_reset(count)
+    return count
+
+def apply_product_changes(upserts: List[dict], deletes: List[int]) -> Tuple[int, int, int]:
+    """
+    Apply a batch of product upserts and deletions in a single transaction per shard.
+
+    Upserts of existing products update only the given fields; upserts of unknown
+    products are inserted and must carry every column. Updates are grouped by the set of
+    columns they change, so each group is a single executemany.
+
+    Args:
+    - upserts (List[dict]): Rows with an `id` and any of `name`, `description` and `price`.
+    - deletes (List[int]): IDs of the products to be deleted.
+
+    Returns:
+    - Tuple[int, int, int]: Number of upserted products, deleted products and rejected upserts
+      (unknown products without every column).
+
+    Raises:
+    - Exception: If there's an error during the database operation. Nothing from the batch is applied then
+      on the shard that failed; the other shards may have committed their part.
+    """
+    table = ProductDB.__table__
+    upserts_by_shard = {}
+    for row in upserts:
+        upserts_by_shard.setdefault(product_shards.index_of(row["id"]), []).append(row)
+    deletes_by_shard = product_shards.group_ids(deletes)
+
+    def apply_shard(index, shard) -> Tuple[List[dict], List[dict], List[int], int]:
+        shard_upserts = upserts_by_shard.get(index, [])
+        shard_deletes = deletes_by_shard.get(index, [])
+        upsert_ids = [row["id"] for row in shard_upserts]
+        with shard.engine.begin() as connection:
+            existing, deleted_rows = set(), set()
+            for start in range(0, len(upsert_ids), MULTI_GET_CHUNK_SIZE):
+                chunk = upsert_ids[start:start + MULTI_GET_CHUNK_SIZE]
+                for product_id, deleted_at in connection.execute(select(table.c.id, table.c.deleted_at).where(table.c.id.in_(chunk))):
+                    (existing if deleted_at is None else deleted_rows).add(product_id)
+
+            updates: Dict[Tuple[str, ...], List[dict]] = {}
+            inserts, revived, rejected = [], set(), 0
+            for row in shard_upserts:
+                columns = tuple(sorted(key for key in row if key != "id"))
+                if row["id"] in existing:
+                    if columns:
+                        updates.setdefault(columns, []).append({"_id": row["id"], **{key: row[key] for key in columns}})
+                elif columns == ("description", "name", "price"):
+                    if row["id"] in deleted_rows:
+                        # A deleted product that is not purged yet is created again in place
+                        updates.setdefault(columns + ("deleted_at",), []).append({"_id": row["id"], **{key: row[key] for key in columns}, "deleted_at": None})
+                        revived.add(row["id"])
+                    else:
+                        inserts.append(row)
+                else:
+                    rejected += 1
+
+            # The SET clause of each executemany is built from the columns present in its rows
+            for rows in updates.values():
+                connection.execute(update(table).where(table.c.id == bindparam("_id")), rows)
+            _record_prices(connection, [(row["_id"], row["price"]) for columns, rows in updates.items() if "price" in columns
+                                        for row in rows if row["price"] is not None])
+            if inserts:
+                product_shards.ids.claim(connection, index, [row["id"] for row in inserts])
+                connection.execute(insert(table), inserts)
+            deleted = []
+            for start in range(0, len(shard_deletes), MULTI_GET_CHUNK_SIZE):
+                deleted.extend(_delete_rows(connection, shard_deletes[start:start + MULTI_GET_CHUNK_SIZE]))
+
+            # Read back the full rows, so followers of product changes get complete products
+            written = [row["id"] for row in inserts] + [row["_id"] for rows in updates.values() for row in rows]
+            products = []
+            for start in range(0, len(written), MULTI_GET_CHUNK_SIZE):
+                chunk = written[start:start + MULTI_GET_CHUNK_SIZE]
+                products.extend(dict(row._mapping) for row in connection.execute(select(*_product_columns()).where(table.c.id.in_(chunk))))
+        inserted_ids = {row["id"] for row in inserts} | revived
+        created = [product for product in products if product["id"] in inserted_ids]
+        updated = [product for product in products if product["id"] not in inserted_ids]
+        return created, updated, deleted, rejected
+
+    results = product_shards.scatter(apply_shard, set(upserts_by_shard) | set(deletes_by_shard))
+    created = [product for result in results for product in result[0]]
+    updated = [product for result in results for product in result[1]]
+    _notify_bulk_write("created", created)
+    _notify_bulk_write("updated", updated)
+    deleted = [product_id for result in results for product_id in result[2]]
+    # Only products that were live are announced, not unknown or already deleted IDs
+    _notify_bulk_write("deleted", [{"id": product_id} for product_id in deleted])
+    return len(created) + len(updated), len(deleted), sum(result[3] for result in results)
+
+def delete_products_by_filter(ids: Optional[List[int]] = None, name_prefix: Optional[str] = None,
+                              min_price: Optional[float] = None, max_price: Optional[float] = None,
+                              batch_size: int = SOFT_DELETE_PURGE_BATCH) -> int:
+    """
+    Delete every product matching all the given criteria.
+
+    Each shard is walked in ID order, `batch_size` matching products per transaction, so
+    no transaction holds many row locks for long. In soft delete mode each batch is a
+    single UPDATE marking the products deleted, and the purger removes them later.
+
+    Args:
+    - ids (Optional[List[int]]): Only products with these IDs.
+    - name_prefix (Optional[str]): Only products whose name starts with this.
+    - min_price (Optional[float]): Lowest price, inclusive.
+    - max_price (Optional[float]): Highest price, inclusive.
+    - batch_size (int): Products deleted per transaction.
+
+    Returns:
+    - int: Number of deleted products.
+
+    Raises:
+    - ValueError: If no criterion is given, or `ids` or `name_prefix` is empty, which would match every product.
+    - Exception: If there's an error during the database operation. The batches committed before it stay deleted.
+    """
+    if ids == [] or name_prefix == "" or (ids is None and name_prefix is None and min_price is None and max_price is None):
+        raise ValueError("A filter that narrows the products to delete is required.")
+    table = ProductDB.__table__
+    query = select(table.c.id).where(_live_products()).order_by(table.c.id).limit(batch_size)
+    if ids is not None:
+        query = query.where(table.c.id.in_(ids))
+    if name_prefix is not None:
+        query = query.where(table.c.name.startswith(name_prefix, autoescape=True))
+    if min_price is not None:
+        query = query.where(table.c.price >= min_price)
+    if max_price is not None:
+        query = query.where(table.c.price <= max_price)
+
+    def delete_shard(index, shard) -> List[int]:
+        deleted, after_id = [], None
+        while True:
+            with shard.engine.begin() as connection:
+                batch_query = query if after_id is None else query.where(table.c.id > after_id)
+                batch = list(connection.execute(batch_query).scalars())
+                if not batch:
+                    return deleted
+                # Products deleted concurrently since they were selected are left out
+                deleted.extend(_delete_rows(connection, batch))
+            after_id = batch[-1]
+
+    shards = None if ids is None else product_shards.group_ids(ids)
+    deleted = [product_id for shard_deleted in product_shards.scatter(delete_shard, shards) for product_id in shard_deleted]
+    for product_id in deleted:
+        price_write_behind.discard(product_id)
+    _notify_bulk_write("deleted", [{"id": product_id} for product_id in deleted])
+    return len(deleted)
+
+def purge_deleted_products(deleted_before: datetime, batch_size: int) -> int:
+    """
+    Remove for good up to `batch_size` products per shard that were marked deleted
+    before `deleted_before`, oldest first, in one short transaction per shard.
+
+    The removed products were announced as deleted when they were marked, so nothing
+    is notified.
+
+    Returns:
+    - int: Number of removed rows; 0 once there is nothing left to purge.
+
+    Raises:
+    - Exception: If there's an error during the database operation.
+    """
+    table = ProductDB.__table__
+    query = select(table.c.id).where(table.c.deleted_at <= deleted_before).order_by(table.c.deleted_at).limit(batch_size)
+    def purge_shard(index, shard) -> int:
+        with shard.engine.begin() as connection:
+            batch = list(connection.execute(query).scalars())
+            if not batch:
+                return 0
+            # Products created again since they were selected are kept
+            return connection.execute(delete(table).where(table.c.id.in_(batch), table.c.deleted_at.isnot(None))).rowcount
+    return sum(product_shards.scatter(purge_shard))
+
+def get_price_history(product_id: int, start: Optional[datetime], end: Optional[datetime], limit: int) -> List[tuple]:
+    """
+    Retrieve the price changes of a product in a time range, oldest first.
+
+    The query is a range scan of the (product_id, changed_at) index, and in MySQL only
+    the monthly partitions overlapping the range are read.
+
+    Args:
+    - product_id (int): ID of the product.
+    - start (Optional[datetime]): Start of the range in UTC, inclusive.
+    - end (Optional[datetime]): End of the range in UTC, exclusive.
+    - limit (int): Maximum number of changes.
+
+    Returns:
+    - List[tuple]: Rows of (price, changed_at).
+
+    Raises:
+    - Exception: If there's an error during the database operation.
+    """
+    table = PriceHistoryDB.__table__
+    query = select(table.c.price, table.c.changed_at).where(table.c.product_id == product_id)
+    if start is not None:
+        query = query.where(table.c.changed_at >= start)
+    if end is not None:
+        query = query.where(table.c.changed_at < end)
+    query = query.order_by(table.c.changed_at, table.c.id).limit(limit)
+    with product_shards.shard_for(product_id).engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(query)]
+
+def get_daily_price_candles(product_id: int, start: Optional[date], end: Optional[date]) -> List[tuple]:
+    """
+    Retrieve the daily price candles of a product, oldest first.
+
+    Args:
+    - product_id (int): ID of the product.
+    - start (Optional[date]): First day, inclusive.
+    - end (Optional[date]): Last day, inclusive.
+
+    Returns:
+    - List[tuple]: Rows of (day, open, high, low, close, changes), for the days with a price change.
+
+    Raises:
+    - Exception: If there's an error during the database operation.
+    """
+    table = PriceDailyDB.__table__
+    query = select(table.c.day, table.c.open, table.c.high, table.c.low, table.c.close, table.c.changes).where(table.c.product_id == product_id)
+    if start is not None:
+        query = query.where(table.c.day >= start)
+    if end is not None:
+        query = query.where(table.c.day <= end)
+    with product_shards.shard_for(product_id).engine.connect() as connection:
+        return [tuple(row) for row in connection.execute(query.order_by(table.c.day))]
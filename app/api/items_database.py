@@ -0,0 +1,180 @@
+from app.api.config.db import MongoUnavailable, mongo_db
+from app.api.config.deadlines import DeadlineExceeded, check, remaining
+from typing import Dict, List, Optional, Sequence, Tuple
+import functools
+import logging
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# Fields of an item document besides its `_id`
+ITEM_FIELDS = ("name", "description")
+
+def _translate_errors(fn):
+    """
+    Answer unreachable databases with 503 and queries cut by the request deadline with 504.
+
+    pymongo is only imported once a query failed, since by then the client has loaded it.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            from pymongo.errors import ConnectionFailure, ExecutionTimeout
+            if isinstance(e, ExecutionTimeout):
+                raise DeadlineExceeded()
+            if isinstance(e, ConnectionFailure):
+                logger.error(f"Items database unreachable: {str(e)}")
+                raise MongoUnavailable()
+            raise
+    return wrapper
+
+def _max_time_ms() -> Optional[int]:
+    """
+    Server-side time limit of a query, from the remaining request deadline.
+    """
+    seconds = remaining()
+    if seconds is None:
+        return None
+    check()
+    return max(1, int(seconds * 1000))
+
+def item_projection(fields: Optional[Sequence[str]]) -> Optional[Dict[str, int]]:
+    """
+    Projection returning only the given fields (and the ID), or whole documents for None.
+    """
+    if not fields:
+        return None
+    return {field: 1 for field in fields}
+
+def _read_options() -> dict:
+    max_time_ms = _max_time_ms()
+    return {} if max_time_ms is None else {"max_time_ms": max_time_ms}
+
+def _command_options() -> dict:
+    max_time_ms = _max_time_ms()
+    return {} if max_time_ms is None else {"maxTimeMS": max_time_ms}
+
+@_translate_errors
+async def create_item(item: dict) -> ObjectId:
+    """
+    Insert an item.
+
+    Args:
+    - item (dict): Item fields.
+
+    Returns:
+    - ObjectId: ID of the new item.
+    """
+    check()
+    result = await mongo_db.items.insert_one(dict(item))
+    return result.inserted_id
+
+@_translate_errors
+async def create_items(items: List[dict]) -> List[ObjectId]:
+    """
+    Insert many items with a single unordered `insert_many`.
+
+    Args:
+    - items (List[dict]): Item fields of each item.
+
+    Returns:
+    - List[ObjectId]: IDs of the new items, in the order of `items`.
+    """
+    check()
+    result = await mongo_db.items.insert_many([dict(item) for item in items], ordered=False)
+    return result.inserted_ids
+
+@_translate_errors
+async def get_items_page(after: Optional[ObjectId], limit: int, fields: Optional[Sequence[str]] = None) -> List[dict]:
+    """
+    Retrieve a page of items ordered by ID.
+
+    Pages are keyset-paginated on `_id`, so each page is a range scan of the `_id` index
+    whatever its position, and the projection keeps unrequested fields off the wire.
+
+    Args:
+    - after (Optional[ObjectId]): ID of the last item of the previous page, or None for the first page.
+    - limit (int): Maximum number of items.
+    - fields (Optional[Sequence[str]]): Fields to return besides the ID; all of them if empty.
+
+    Returns:
+    - List[dict]: Item documents.
+    """
+    query = {} if after is None else {"_id": {"$gt": after}}
+    cursor = mongo_db.items.find(query, item_projection(fields), **_read_options()).sort("_id", 1).limit(limit).batch_size(limit)
+    return await cursor.to_list(length=limit)
+
+@_translate_errors
+async def get_item(item_id: ObjectId, fields: Optional[Sequence[str]] = None) -> Optional[dict]:
+    """
+    Retrieve an item by its ID.
+
+    Returns:
+    - Optional[dict]: Item document if found, else None.
+    """
+    return await mongo_db.items.find_one({"_id": item_id}, item_projection(fields), **_read_options())
+
+@_translate_errors
+async def update_item(item_id: ObjectId, fields: dict) -> Optional[dict]:
+    """
+    Set fields of an item.
+
+    Args:
+    - item_id (ObjectId): ID of the item.
+    - fields (dict): Fields to set. With no fields the item is returned unchanged.
+
+    Returns:
+    - Optional[dict]: Item document after the update if found, else None.
+    """
+    if not fields:
+        return await get_item(item_id)
+    from pymongo import ReturnDocument
+    return await mongo_db.items.find_one_and_update(
+        {"_id": item_id}, {"$set": fields}, return_document=ReturnDocument.AFTER, **_command_options()
+    )
+
+@_translate_errors
+async def delete_item(item_id: ObjectId) -> Optional[dict]:
+    """
+    Delete an item by its ID.
+
+    Returns:
+    - Optional[dict]: Deleted item document if found, else None.
+    """
+    return await mongo_db.items.find_one_and_delete({"_id": item_id}, **_command_options())
+
+@_translate_errors
+async def bulk_write_items(operations: List[Tuple[str, Optional[ObjectId], dict]], ordered: bool = True) -> dict:
+    """
+    Apply item inserts, updates and deletions with a single `bulk_write`.
+
+    Args:
+    - operations (List[Tuple[str, Optional[ObjectId], dict]]): ("insert", None, fields), ("update", id, fields)
+      or ("delete", id, {}) tuples.
+    - ordered (bool): Run the operations in order and stop at the first error.
+
+    Returns:
+    - dict: IDs of the inserted items, in operation order, and the numbers of matched, modified and deleted items.
+    """
+    from pymongo import DeleteOne, InsertOne, UpdateOne
+    requests, inserted_ids = [], []
+    for op, item_id, fields in operations:
+        if op == "insert":
+            # IDs are assigned here, since bulk_write results do not report them
+            document = {"_id": ObjectId(), **fields}
+            inserted_ids.append(document["_id"])
+            requests.append(InsertOne(document))
+        elif op == "update":
+            requests.append(UpdateOne({"_id": item_id}, {"$set": fields}))
+        else:
+            requests.append(DeleteOne({"_id": item_id}))
+    check()
+    result = await mongo_db.items.bulk_write(requests, ordered=ordered)
+    return {
+        "inserted_ids": inserted_ids,
+        "matched": result.matched_count,
+        "modified": result.modified_count,
+        "deleted": result.deleted_count,
+    }
@@ -0,0 +1,290 @@
+import codecs
+import csv
+import io
+import json
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence
+
+# Importing the import configuration from the configuration module
+from app.api.config.env import IMPORT_MAX_LINE_BYTES
+
+# Column order shared by every bulk format
+COLUMNS = ("id", "name", "description", "price")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class BulkFormatError(ValueError):
+    """
+    Raised when an uploaded file cannot be parsed or one of its rows is invalid.
+    """
+
+
+def require_pyarrow():
+    """Import pyarrow, which is only needed for the Arrow and Parquet formats.
+
+    Returns:
+    - module: The pyarrow module.
+
+    Raises:
+    - ImportError: If pyarrow is not installed.
+    """
+    import pyarrow
+    return pyarrow
+
+
+def normalize_row(row: Dict, line: int) -> Dict:
+    """Validate an imported row and convert it to the column types of the products table.
+
+    Args:
+    - row (dict): Parsed row. `id` is optional, every other column is required.
+    - line (int): Position of the row in the upload, used in error messages.
+
+    Returns:
+    - dict: Row ready to be inserted.
+
+    Raises:
+    - BulkFormatError: If a column is missing or has the wrong type.
+    """
+    try:
+        product = {"name": str(row["name"]), "description": str(row["description"]), "price": float(row["price"])}
+        if row.get("id") not in (None, ""):
+            product["id"] = int(row["id"])
+        return product
+    except KeyError as e:
+        raise BulkFormatError(f"Invalid product at row {line}: missing column {e}.")
+    except (TypeError, ValueError) as e:
+        raise BulkFormatError(f"Invalid product at row {line}: {e}.")
+
+
+# Export encoders: each one takes batches of (id, name, description, price) tuples
+# and yields encoded chunks, so only one batch is held in memory at a time.
+
+def encode_csv(batches: Iterable[Sequence[tuple]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def encode_ndjson(batches: Iterable[Sequence[tuple]]) -> Iterator[bytes]:
+    for batch in batches:
+        yield "".join(
+            json.dumps({"id": row[0], "name": row[1], "description": row[2], "price": row[3]}) + "\n"
+            for row in batch
+        ).encode()
+
+def _arrow_schema(pa):
+    return pa.schema([("id", pa.int64()), ("name", pa.string()), ("description", pa.string()), ("price", pa.float64())])
+
+def _arrow_batch(pa, schema, batch: Sequence[tuple]):
+    columns = list(zip(*batch))
+    return pa.RecordBatch.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema)
+
+def _drain(buffer: io.BytesIO) -> bytes:
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+def encode_arrow(batches: Iterable[Sequence[tuple]]) -> Iterator[bytes]:
+    pa = require_pyarrow()
+    schema = _arrow_schema(pa)
+    buffer = io.BytesIO()
+    with pa.ipc.new_stream(buffer, schema) as writer:
+        for batch in batches:
+            if batch:
+                writer.write_batch(_arrow_batch(pa, schema, batch))
+                yield _drain(buffer)
+    yield _drain(buffer)
+
+def encode_parquet(batches: Iterable[Sequence[tuple]]) -> Iterator[bytes]:
+    pa = require_pyarrow()
+    import pyarrow.parquet as pq
+    schema = _arrow_schema(pa)
+    buffer = io.BytesIO()
+    with pq.ParquetWriter(buffer, schema) as writer:
+        for batch in batches:
+            if batch:
+                writer.write_batch(_arrow_batch(pa, schema, batch))
+                yield _drain(buffer)
+    yield _drain(buffer)
+
+ENCODERS = {
+    "csv": encode_csv,
+    "ndjson": encode_ndjson,
+    "arrow": encode_arrow,
+    "parquet": encode_parquet,
+}
+
+
+# Import parsers. CSV and NDJSON are parsed incrementally from the request body:
+# `feed` takes the next chunk and returns the rows completed by it. Only the new chunk
+# is scanned, and a line or record longer than `max_line_bytes` is rejected, so neither
+# time nor memory depends on how the body is split into lines.
+
+class NdjsonParser:
+    def __init__(self, max_line_bytes: int = IMPORT_MAX_LINE_BYTES):
+        self.max_line_bytes = max_line_bytes
+        self._pending = bytearray()
+        self._line = 0
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        end = chunk.rfind(b"\n")
+        if end < 0:
+            self._pending += chunk
+            self._check_pending()
+            return []
+        lines = chunk[:end].split(b"\n")
+        lines[0] = bytes(self._pending) + lines[0]
+        self._pending = bytearray(chunk[end + 1:])
+        rows = self._parse(lines)
+        self._check_pending()
+        return rows
+
+    def close(self) -> List[Dict]:
+        lines, self._pending = [bytes(self._pending)], bytearray()
+        return self._parse(lines)
+
+    def _check_pending(self):
+        if len(self._pending) > self.max_line_bytes:
+            raise BulkFormatError(f"Line {self._line + 1} is longer than {self.max_line_bytes} bytes.")
+
+    def _parse(self, lines: List[bytes]) -> List[Dict]:
+        rows = []
+        for line in lines:
+            self._line += 1
+            if len(line) > self.max_line_bytes:
+                raise BulkFormatError(f"Line {self._line} is longer than {self.max_line_bytes} bytes.")
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                raise BulkFormatError(f"Invalid JSON at line {self._line}: {e}")
+            if not isinstance(row, dict):
+                raise BulkFormatError(f"Invalid product at line {self._line}: expected an object.")
+            rows.append(normalize_row(row, self._line))
+        return rows
+
+
+class CsvParser:
+    def __init__(self, max_line_bytes: int = IMPORT_MAX_LINE_BYTES):
+        self.max_line_bytes = max_line_bytes
+        # The incremental decoder keeps UTF-8 characters split across chunks
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        # Start of the current line, and lines of the current record with their size and quote count
+        self._pending: List[str] = []
+        self._pending_size = 0
+        self._record: List[str] = []
+        self._record_size = 0
+        self._quotes = 0
+        self._header: Optional[List[str]] = None
+        self._line = 0
+
+    def feed(self, chunk: bytes) -> List[Dict]:
+        text = self._decode(chunk)
+        end = text.rfind("\n")
+        if end < 0:
+            self._pending.append(text)
+            self._pending_size += len(text)
+            self._check_size()
+            return []
+        lines = text[:end].split("\n")
+        lines[0] = "".join(self._pending) + lines[0]
+        self._pending, self._pending_size = [text[end + 1:]], len(text) - end - 1
+        rows = self._parse(lines)
+        self._check_size()
+        return rows
+
+    def close(self) -> List[Dict]:
+        lines = ["".join(self._pending) + self._decode(b"", final=True)]
+        self._pending, self._pending_size = [], 0
+        rows = self._parse(lines)
+        if self._record:
+            raise BulkFormatError(f"Unterminated quoted field at row {self._line + 1}.")
+        return rows
+
+    def _decode(self, chunk: bytes, final: bool = False) -> str:
+        try:
+            return self._decoder.decode(chunk, final)
+        except UnicodeDecodeError as e:
+            raise BulkFormatError(f"Invalid UTF-8 in CSV upload: {e}")
+
+    def _check_size(self):
+        # Sizes are counted in characters, which never exceed the bytes they were decoded from
+        if self._record_size + self._pending_size > self.max_line_bytes:
+            raise BulkFormatError(f"Row {self._line + 1} is longer than {self.max_line_bytes} bytes.")
+
+    def _parse(self, lines: List[str]) -> List[Dict]:
+        rows = []
+        for line in lines:
+            # A record is complete once its quotes are balanced; until then it spans several lines
+            self._record.append(line)
+            self._record_size += len(line) + 1
+            self._quotes += line.count('"')
+            if self._quotes % 2:
+                self._check_size()
+                continue
+            record = "\n".join(self._record).rstrip("\r")
+            self._record, self._record_size, self._quotes = [], 0, 0
+            if len(record) > self.max_line_bytes:
+                raise BulkFormatError(f"Row {self._line + 1} is longer than {self.max_line_bytes} bytes.")
+            if not record:
+                continue
+            self._line += 1
+            values = next(csv.reader([record]))
+            if self._header is None:
+                self._header = [value.strip() for value in values]
+                continue
+            rows.append(normalize_row(dict(zip(self._header, values)), self._line))
+        return rows
+
+PARSERS = {
+    "csv": CsvParser,
+    "ndjson": NdjsonParser,
+}
+
+
+# Arrow and Parquet uploads are spooled to a temporary file first: Parquet keeps its
+# metadata in the footer, so both are read back one record batch at a time from there.
+
+def iter_arrow_rows(file: BinaryIO, batch_size: int) -> Iterator[List[Dict]]:
+    pa = require_pyarrow()
+    try:
+        reader = pa.ipc.open_stream(file)
+        yield from _iter_record_batches(reader, batch_size)
+    except pa.ArrowInvalid as e:
+        raise BulkFormatError(f"Invalid Arrow stream: {e}")
+
+def iter_parquet_rows(file: BinaryIO, batch_size: int) -> Iterator[List[Dict]]:
+    pa = require_pyarrow()
+    import pyarrow.parquet as pq
+    try:
+        yield from _iter_record_batches(pq.ParquetFile(file).iter_batches(batch_size=batch_size), batch_size)
+    except pa.ArrowInvalid as e:
+        raise BulkFormatError(f"Invalid Parquet file: {e}")
+
+def _iter_record_batches(record_batches, batch_size: int) -> Iterator[List[Dict]]:
+    line = 0
+    for record_batch in record_batches:
+        for offset in range(0, record_batch.num_rows, batch_size):
+            rows = []
+            for row in record_batch.slice(offset, batch_size).to_pylist():
+                line += 1
+                rows.append(normalize_row(row, line))
+            yield rows
+
+FILE_READERS = {
+    "arrow": iter_arrow_rows,
+    "parquet": iter_parquet_rows,
+}
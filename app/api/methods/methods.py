@@ -1,12 +1,16 @@
 # handle_error
+import json
 import re
 from fastapi import HTTPException, status
 from logging import Logger
-from app.api.config.exceptions import bugReportsInstance
 from app.api.config.env import IS_PRODUCTION, JIRA_PROJECT_ID
 
-from typing import Union, List, Dict
-from datetime import date
+from bson import ObjectId
+from bson.errors import InvalidId
+from typing import Any, Union, List, Dict, Sequence
+from datetime import date, datetime, timedelta
+
+_OBJECTID_PATTERN = re.compile(r'[a-fA-F0-9]{24}')
 
 def is_valid_objectid(oid: str) -> bool:
     """
@@ -20,7 +24,7 @@ def is_valid_objectid(oid: str) -> bool:
     """
     if not oid or not isinstance(oid, str):
         return False
-    return bool(re.match(r'^[a-fA-F0-9]{24}$', oid))
+    return _OBJECTID_PATTERN.fullmatch(oid) is not None
 
 def convert_objectid_to_str(data):
     """Convert ObjectId to string in a dictionary or list of dictionaries.
@@ -77,5 +81,133 @@ def handle_error(e: Exception, logger: Logger):
     logger.error(f"Error : {str(e)}")
     if int(IS_PRODUCTION) and (not hasattr(e, 'status_code') or (hasattr(e, 'status_code') and e.status_code == 500)): # Handling HTTP and no HTTP exceptions
         logger.info("Creating incidence on JIRA.")
+        # The incidents client is created on the first reported error, not at import
+        from app.api.config.exceptions import bugReportsInstance
         bugReportsInstance.bugReports(JIRA_PROJECT_ID, "[DEVELOPER]", str(e))
-    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
\ No newline at end of file
+    raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+def parse_id_list(raw: str) -> List[int]:
+    """Parse a comma-separated list of integer IDs, as sent in query strings.
+    
+    Args:
+    - raw (str): Value like "1,2,3". Blank entries are ignored.
+    
+    Returns:
+    - List[int]: Parsed IDs in their original order.
+    
+    Raises:
+    - HTTPException: With a 400 status code if any entry is not an integer.
+    """
+    try:
+        return [int(part) for part in raw.split(',') if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="IDs must be comma-separated integers.")
+
+
+def parse_objectid(raw: str) -> ObjectId:
+    """Parse an item ID sent in a path or body.
+    
+    Args:
+    - raw (str): 24 hexadecimal characters.
+    
+    Returns:
+    - ObjectId: Parsed ID.
+    
+    Raises:
+    - HTTPException: With a 400 status code if it is not a valid ObjectId.
+    """
+    try:
+        return ObjectId(raw)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid item_id format.")
+
+
+# Encoder with the same output as FastAPI's JSONResponse
+_encode_json = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode
+
+def _encode_bson_value(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+# Encoder for Mongo documents: ObjectIds and dates are converted while encoding
+_encode_documents = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_encode_bson_value).encode
+
+def encode_item_documents(documents: Union[Dict, Sequence[Dict]]) -> bytes:
+    """Encode Mongo item documents as JSON items, with `_id` as a string `id`.
+    
+    Unlike `convert_objectid_to_str`, the documents are left untouched: the ID is renamed in
+    a shallow copy and converted by the encoder.
+    
+    Args:
+    - documents (Union[Dict, Sequence[Dict]]): One document, or a list of them.
+    
+    Returns:
+    - bytes: Encoded JSON object, or list of objects.
+    """
+    if isinstance(documents, dict):
+        return _encode_documents(_as_item(documents)).encode()
+    return _encode_documents([_as_item(document) for document in documents]).encode()
+
+def encode_item_page(documents: Sequence[Dict], next_after: Union[ObjectId, None]) -> bytes:
+    """Encode a page of Mongo item documents with the cursor of the next page, like `encode_item_documents`."""
+    return _encode_documents({"items": [_as_item(document) for document in documents], "next_after": next_after}).encode()
+
+def _as_item(document: Dict) -> Dict:
+    item = {"id": document["_id"]}
+    item.update(document)
+    del item["_id"]
+    return item
+
+def encode_product_rows(rows: Sequence[tuple], chunk_size: int = 1000) -> bytes:
+    """Encode (id, name, description, price) row tuples as a JSON list of products.
+    
+    Rows are turned into dicts one chunk at a time, so the C encoder does the work while
+    only `chunk_size` dicts are alive at once.
+    
+    Args:
+    - rows (Sequence[tuple]): Product rows, as returned by `get_all_product_rows`.
+    - chunk_size (int): Rows converted per chunk.
+    
+    Returns:
+    - bytes: Encoded JSON list.
+    """
+    parts = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = [{"id": row[0], "name": row[1], "description": row[2], "price": row[3]} for row in rows[start:start + chunk_size]]
+        parts.append(_encode_json(chunk)[1:-1])
+    return ("[" + ",".join(parts) + "]").encode()
+
+
+def interval_start(day: date, interval: str) -> date:
+    """Return the first day of the interval ("day", "week" or "month") containing `day`. Weeks start on Monday."""
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    if interval == "month":
+        return day.replace(day=1)
+    return day
+
+def downsample_candles(rows: Sequence[tuple], interval: str) -> List[Dict]:
+    """Merge daily price candles into candles of a longer interval.
+    
+    Args:
+    - rows (Sequence[tuple]): Daily (day, open, high, low, close, changes) rows, ordered by day.
+    - interval (str): "day", "week" or "month".
+    
+    Returns:
+    - List[Dict]: One candle per interval with a price change, ordered by start.
+    """
+    candles = []
+    for day, open_, high, low, close, changes in rows:
+        start = interval_start(day, interval)
+        if candles and candles[-1]["start"] == start:
+            candle = candles[-1]
+            candle["high"] = max(candle["high"], high)
+            candle["low"] = min(candle["low"], low)
+            candle["close"] = close
+            candle["changes"] += changes
+        else:
+            candles.append({"start": start, "open": open_, "high": high, "low": low, "close": close, "changes": changes})
+    return candles
@@ -0,0 +1,145 @@
+import importlib.util
+import json
+from functools import lru_cache
+from typing import Any, Optional, Sequence
+
+from app.api.methods.bulk import COLUMNS
+from app.api.methods.methods import encode_product_rows
+
+# Media types of each negotiable format; the first one is sent in responses
+FORMAT_MEDIA_TYPES = {
+    "json": ("application/json",),
+    "msgpack": ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack"),
+    "cbor": ("application/cbor",),
+}
+
+MEDIA_TYPE_FORMATS = {media_type: name for name, media_types in FORMAT_MEDIA_TYPES.items() for media_type in media_types}
+
+# Wildcards answered with JSON, the default format
+MEDIA_TYPE_FORMATS.update({"*/*": "json", "application/*": "json"})
+
+_encode_json = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode
+
+
+@lru_cache()
+def cbor_available() -> bool:
+    """Whether cbor2 is installed. CBOR is only offered when it is; MessagePack always is."""
+    return importlib.util.find_spec("cbor2") is not None
+
+
+def _format_of(media_type: str) -> Optional[str]:
+    format_name = MEDIA_TYPE_FORMATS.get(media_type.strip().lower())
+    if format_name == "cbor" and not cbor_available():
+        return None
+    return format_name
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Pick the response format from an `Accept` header.
+
+    The supported type with the highest q-value wins, the first listed on a tie. JSON is
+    answered when nothing else is asked for, including for types that are not supported.
+
+    Args:
+    - accept (Optional[str]): Value of the `Accept` header.
+
+    Returns:
+    - str: "json", "msgpack" or "cbor".
+    """
+    if not accept or ("msgpack" not in accept and "cbor" not in accept):
+        return "json"
+    best, best_q = "json", 0.0
+    for entry in accept.split(","):
+        media_range, *params = entry.split(";")
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        format_name = _format_of(media_range)
+        if format_name is not None and q > best_q:
+            best, best_q = format_name, q
+    return best
+
+
+def body_format(content_type: Optional[str]) -> str:
+    """Format of a request body from its `Content-Type`. Bodies that are not MessagePack or CBOR are read as JSON."""
+    if not content_type:
+        return "json"
+    return MEDIA_TYPE_FORMATS.get(content_type.split(";", 1)[0].strip().lower(), "json")
+
+
+def encode(content: Any, format_name: str) -> bytes:
+    """Encode JSON-compatible content.
+
+    Args:
+    - content (Any): Content made only of dicts, lists, strings, numbers, booleans and None.
+    - format_name (str): "json", "msgpack" or "cbor".
+
+    Returns:
+    - bytes: Encoded content.
+    """
+    if format_name == "msgpack":
+        import msgpack
+        return msgpack.packb(content)
+    if format_name == "cbor":
+        import cbor2
+        return cbor2.dumps(content)
+    return _encode_json(content).encode()
+
+
+def decode(body: bytes, format_name: str) -> Any:
+    """Decode a request body.
+
+    Raises:
+    - ValueError: If the body is not valid in its format.
+    """
+    if format_name == "msgpack":
+        import msgpack
+        return msgpack.unpackb(body)
+    if format_name == "cbor":
+        import cbor2
+        return cbor2.loads(body)
+    return json.loads(body)
+
+
+def encode_product_rows_msgpack(rows: Sequence[tuple]) -> bytes:
+    """Encode (id, name, description, price) row tuples as a MessagePack array of product maps.
+
+    The rows are packed field by field into one buffer, without building a dict per
+    product first. The output is the same as packing the list of product dicts.
+
+    Args:
+    - rows (Sequence[tuple]): Product rows, as returned by `get_all_product_rows`.
+
+    Returns:
+    - bytes: Encoded array.
+    """
+    import msgpack
+    packer = msgpack.Packer(autoreset=False)
+    pack, pack_map_header = packer.pack, packer.pack_map_header
+    id_key, name_key, description_key, price_key = COLUMNS
+    packer.pack_array_header(len(rows))
+    for product_id, name, description, price in rows:
+        pack_map_header(4)
+        pack(id_key)
+        pack(product_id)
+        pack(name_key)
+        pack(name)
+        pack(description_key)
+        pack(description)
+        pack(price_key)
+        pack(price)
+    return packer.bytes()
+
+
+def encode_product_list(rows: Sequence[tuple], format_name: str) -> bytes:
+    """Encode product row tuples as a list of products in the given format."""
+    if format_name == "msgpack":
+        return encode_product_rows_msgpack(rows)
+    if format_name == "cbor":
+        return encode([dict(zip(COLUMNS, row)) for row in rows], "cbor")
+    return encode_product_rows(rows)
@@ -1,6 +1,9 @@
-from typing import Optional
+from datetime import date, datetime
+from enum import Enum
+from typing import Dict, List, Optional
 from pydantic import BaseModel
-from sqlalchemy import Column, Integer, String, Float
+from sqlalchemy import Column, Date, DateTime, Index, Integer, String, Float
+from sqlalchemy.dialects import mysql
 from sqlalchemy.orm import declarative_base
 
 # Define your data models and schemas here
@@ -38,6 +41,74 @@ class Item(ItemCreate):
     """
     id: str
 
+class ItemView(BaseModel):
+    """
+    Data model for an item as listed, with only the fields requested through `fields`.
+    """
+    id: str
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+class ItemPage(BaseModel):
+    """
+    Data model for a page of items ordered by ID.
+
+    `next_after` is the value of `after` that fetches the next page, or None on the last page.
+    """
+    items: List[ItemView]
+    next_after: Optional[str]
+
+class ItemBatchCreate(BaseModel):
+    """
+    Data model for creating many items in a single request.
+    """
+    items: List[ItemCreate]
+
+class ItemBatchCreated(BaseModel):
+    """
+    Data model for the IDs of the items created by a batch, in request order.
+    """
+    ids: List[str]
+
+class ItemOperationType(str, Enum):
+    """
+    Operations accepted by the item bulk write endpoint.
+    """
+    insert = "insert"
+    update = "update"
+    delete = "delete"
+
+class ItemOperation(BaseModel):
+    """
+    Data model for one operation of a bulk write.
+
+    Inserts carry `name` and `description` and no `id`; updates carry the `id` and the fields
+    to change; deletes carry only the `id`.
+    """
+    op: ItemOperationType
+    id: Optional[str] = None
+    name: Optional[str] = None
+    description: Optional[str] = None
+
+class ItemBulkWrite(BaseModel):
+    """
+    Data model for a bulk write of items.
+
+    With `ordered` the operations run in order and stop at the first error; without it the
+    server may run them in any order and continues past errors.
+    """
+    operations: List[ItemOperation]
+    ordered: bool = True
+
+class ItemBulkWriteResult(BaseModel):
+    """
+    Data model for the result of a bulk write.
+    """
+    inserted_ids: List[str]
+    matched: int
+    modified: int
+    deleted: int
+
 
 # Product Model
     
@@ -46,18 +117,63 @@ Base = declarative_base()
 class ProductDB(Base):
     """
     Database model representing a product entity.
+
+    `deleted_at` is set on products deleted in soft delete mode until the purger removes
+    them; every read skips those rows through its index.
     """
     __tablename__ = "products"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, index=True)
     description = Column(String, index=True)
     price = Column(Float)
+    deleted_at = Column(DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"), index=True)
 
     def as_dict(self):
         """
-        Converts the ProductDB instance into a dictionary.
+        Converts the ProductDB instance into a dictionary of its product fields.
         """
-        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns if c.name != "deleted_at"}
+
+class ProductIdBlockDB(Base):
+    """
+    Database model of the product ID blocks handed out by a shard.
+
+    Each shard has one row; `next_block` is the next block of ID sequence numbers that
+    the shard-aware ID generator may allocate.
+    """
+    __tablename__ = "product_id_blocks"
+    shard = Column(Integer, primary_key=True, autoincrement=False)
+    next_block = Column(Integer, nullable=False)
+
+class PriceHistoryDB(Base):
+    """
+    Database model of the append-only log of product price changes.
+
+    Rows are only ever inserted, in the transaction that changes the price. In MySQL the
+    table is partitioned by month of `changed_at` (see the README), and time-range
+    queries of one product use the (product_id, changed_at) index.
+    """
+    __tablename__ = "product_price_history"
+    __table_args__ = (Index("ix_price_history_product_time", "product_id", "changed_at"),)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    changed_at = Column(DateTime().with_variant(mysql.DATETIME(fsp=6), "mysql"), nullable=False)
+
+class PriceDailyDB(Base):
+    """
+    Database model of the daily open/high/low/close prices of a product, in UTC days.
+
+    Kept up to date with each price change, so aggregates never scan the history.
+    """
+    __tablename__ = "product_price_daily"
+    product_id = Column(Integer, primary_key=True, autoincrement=False)
+    day = Column(Date, primary_key=True)
+    open = Column(Float, nullable=False)
+    high = Column(Float, nullable=False)
+    low = Column(Float, nullable=False)
+    close = Column(Float, nullable=False)
+    changes = Column(Integer, nullable=False)
     
 class ProductPatch(BaseModel):
     """
@@ -95,6 +211,180 @@ class Product(BaseModel):
     description: str
     price: float
 
+class ProductPage(BaseModel):
+    """
+    Data model for a page of products ordered by ID.
+
+    `next_after` is the value of `after` that fetches the next page, or None on the last page.
+    """
+    products: List[Product]
+    next_after: Optional[int]
+
+class ProductBatchGet(BaseModel):
+    """
+    Data model for fetching many products by ID in a single request.
+    """
+    ids: List[int]
+
+class ProductBatch(BaseModel):
+    """
+    Data model for the result of a multi-get.
+    
+    `products` follows the order of the requested IDs, and `missing` lists the requested IDs that
+    do not exist, so clients can tell a missing product apart from a dropped one.
+    """
+    products: List[Product]
+    missing: List[int]
+
+class BulkFormat(str, Enum):
+    """
+    File formats supported by the bulk import and export endpoints.
+    """
+    csv = "csv"
+    ndjson = "ndjson"
+    arrow = "arrow"
+    parquet = "parquet"
+
+class ProductImportResult(BaseModel):
+    """
+    Data model for the result of a bulk import.
+    """
+    imported: int
+
+class ProductDeleteFilter(BaseModel):
+    """
+    Data model for deleting every product that matches a filter.
+
+    All the given criteria must match. At least one is required, and `ids` and
+    `name_prefix` must not be empty, so a filter cannot delete the whole catalog by
+    accident: an empty prefix would match every name.
+    """
+    ids: Optional[List[int]] = None
+    name_prefix: Optional[str] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+
+class ProductDeleteResult(BaseModel):
+    """
+    Data model for the result of a delete by filter.
+    """
+    deleted: int
+
+class PriceChange(BaseModel):
+    """
+    Data model for a change of the price of a product.
+    """
+    price: float
+    changed_at: datetime
+
+class PriceHistory(BaseModel):
+    """
+    Data model for the price changes of a product in a time range, oldest first.
+
+    `next_from` is the value of `from` that fetches the rest of the range, or None when it is complete.
+    """
+    changes: List[PriceChange]
+    next_from: Optional[datetime]
+
+class PriceInterval(str, Enum):
+    """
+    Intervals that price candles can be aggregated over.
+    """
+    day = "day"
+    week = "week"
+    month = "month"
+
+class PriceCandle(BaseModel):
+    """
+    Data model for the open, high, low and close prices of a product over an interval starting on `start`.
+    """
+    start: date
+    open: float
+    high: float
+    low: float
+    close: float
+    changes: int
+
+
+# Analytics Models
+
+class PriceSummary(BaseModel):
+    """
+    Data model for the aggregate statistics of product prices.
+    """
+    count: int
+    min: Optional[float]
+    max: Optional[float]
+    mean: Optional[float]
+    std: Optional[float]
+    total: float
+
+class PricePercentiles(BaseModel):
+    """
+    Data model for price percentiles, keyed by the requested percentile.
+    """
+    percentiles: Dict[str, Optional[float]]
+
+class PriceHistogram(BaseModel):
+    """
+    Data model for a price histogram. `edges` holds one more value than `counts`.
+    """
+    edges: List[float]
+    counts: List[int]
+
+class PricePoint(BaseModel):
+    """
+    Data model for a product in price rankings.
+    """
+    id: int
+    name: str
+    price: float
+
+class PriceExtremes(BaseModel):
+    """
+    Data model for the cheapest and most expensive products.
+    """
+    cheapest: List[PricePoint]
+    most_expensive: List[PricePoint]
+
+
+class AllocationGrouping(str, Enum):
+    """
+    How allocations are grouped in memory snapshots: by line, by file or by whole traceback.
+    """
+    lineno = "lineno"
+    filename = "filename"
+    traceback = "traceback"
+
+class AllocationStat(BaseModel):
+    """
+    Data model for the memory allocated at one site, a line, file or traceback.
+    The `_diff` fields are only set in snapshot diffs.
+    """
+    location: str
+    size: int
+    count: int
+    size_diff: Optional[int] = None
+    count_diff: Optional[int] = None
+
+class MemorySnapshot(BaseModel):
+    """
+    Data model for a tracemalloc snapshot and its largest allocation sites.
+    """
+    id: int
+    taken_at: datetime
+    traced_bytes: int
+    top: List[AllocationStat]
+
+class MemoryDiff(BaseModel):
+    """
+    Data model for the allocation changes between two snapshots, largest change first.
+    """
+    from_id: int
+    to_id: int
+    size_diff: int
+    top: List[AllocationStat]
+
 
 # Responser Error Model
 class ResponseError(BaseModel):
@@ -0,0 +1,217 @@
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from fastapi.responses import Response
+from slowapi.errors import RateLimitExceeded
+from typing import Optional
+import logging
+
+# Configuration, models and authentication modules imports
+
+from app.api.config.limiter import limiter
+from app.api.config.env import PROFILING_MAX_SECONDS
+from app.api.config.profiling import cpu_profiler, memory_tracer
+from app.api.models.models import ResponseError, AllocationGrouping, MemorySnapshot, MemoryDiff
+from app.api.auth.auth import auth_handler
+
+# Profiling routes of the worker that serves the request, for admins only. They are
+# registered only with PROFILING_ENABLED=true, and cost nothing until they are called.
+admin_router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+PROFILING_RESPONSES = {
+    500: {"model": ResponseError, "description": "Internal server error."},
+    429: {"model": ResponseError, "description": "Too many requests."},
+    409: {"model": ResponseError, "description": "Profiler busy or memory tracing not started."},
+    403: {"model": ResponseError, "description": "Admin role required."},
+    401: {"model": ResponseError, "description": "Invalid or expired token."},
+}
+
+
+@admin_router.post('/admin/profile/cpu',
+                   response_class=Response,
+                   tags=["Profiling"],
+                   responses={200: {"content": {"text/plain": {}}, "description": "Collapsed stacks."}, **PROFILING_RESPONSES})
+@limiter.limit("5/minute")
+def profile_cpu(request: Request,
+                seconds: float = Query(5, gt=0, le=PROFILING_MAX_SECONDS),
+                interval_ms: float = Query(5, ge=1, le=1000),
+                include_idle: bool = False,
+                auth=Depends(auth_handler.require_admin)):
+    """
+    Sample the stacks of every thread of this worker for a while.
+
+    The answer has one `frame;frame;...;frame count` line per distinct stack, root
+    first, the collapsed format read by `flamegraph.pl`, speedscope and similar tools.
+    Frames are `module:function`, under the thread name.
+
+    Args:
+        - seconds (float): Duration of the profile, at most PROFILING_MAX_SECONDS.
+        - interval_ms (float): Milliseconds between samples.
+        - include_idle (bool): Also count threads blocked waiting for work.
+
+    Returns:
+        - Response: Collapsed stacks, most frequent first, with the number of sampling rounds in `X-Profile-Samples`.
+
+    Raises:
+        - HTTPException: If a profile is already running or if there are too many requests.
+    """
+    try:
+        stacks, rounds = cpu_profiler.profile(seconds, interval_ms / 1000, include_idle)
+        return Response(content=cpu_profiler.collapse(stacks), media_type="text/plain",
+                        headers={"X-Profile-Samples": str(rounds)})
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error profiling CPU: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@admin_router.get('/admin/profile/memory', tags=["Profiling"], responses=PROFILING_RESPONSES)
+@limiter.limit("5/minute")
+def get_memory_tracing(request: Request, auth=Depends(auth_handler.require_admin)):
+    """
+    State of memory tracing in this worker and the snapshots it keeps.
+
+    Returns:
+        - dict: Whether tracing is on, traced and peak bytes, tracemalloc's own overhead and the kept snapshots.
+    """
+    try:
+        return {
+            **memory_tracer.stats(),
+            "kept": [{"id": snapshot_id, "taken_at": taken_at} for snapshot_id, taken_at in memory_tracer.snapshots()],
+        }
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error reading memory tracing state: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@admin_router.post('/admin/profile/memory/start', tags=["Profiling"], responses=PROFILING_RESPONSES)
+@limiter.limit("5/minute")
+def start_memory_tracing(request: Request, frames: int = Query(1, ge=1, le=100), auth=Depends(auth_handler.require_admin)):
+    """
+    Start tracing the allocations of this worker. Every allocation is slower until tracing is stopped.
+
+    Args:
+        - frames (int): Frames of traceback kept per allocation; more are needed to group by traceback.
+
+    Returns:
+        - dict: Tracing state.
+    """
+    try:
+        memory_tracer.start(frames)
+        return memory_tracer.stats()
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error starting memory tracing: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@admin_router.post('/admin/profile/memory/stop', tags=["Profiling"], responses=PROFILING_RESPONSES)
+@limiter.limit("5/minute")
+def stop_memory_tracing(request: Request, auth=Depends(auth_handler.require_admin)):
+    """
+    Stop tracing allocations and drop the kept snapshots.
+
+    Returns:
+        - dict: Tracing state.
+    """
+    try:
+        memory_tracer.stop()
+        return memory_tracer.stats()
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error stopping memory tracing: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@admin_router.post('/admin/profile/memory/snapshots', response_model=MemorySnapshot, tags=["Profiling"], responses=PROFILING_RESPONSES)
+@limiter.limit("5/minute")
+def take_memory_snapshot(request: Request,
+                         group_by: AllocationGrouping = AllocationGrouping.lineno,
+                         top: int = Query(20, ge=1, le=500),
+                         auth=Depends(auth_handler.require_admin)):
+    """
+    Take a snapshot of the traced allocations, kept for later diffs.
+
+    Args:
+        - group_by (AllocationGrouping): Group the largest allocations by line, file or traceback.
+        - top (int): Number of allocation sites returned.
+
+    Returns:
+        - MemorySnapshot: ID of the snapshot and its largest allocation sites.
+
+    Raises:
+        - HTTPException: If tracing is not started or if there are too many requests.
+    """
+    try:
+        snapshot_id, taken_at, snapshot = memory_tracer.take()
+        return {
+            "id": snapshot_id,
+            "taken_at": taken_at,
+            "traced_bytes": sum(trace.size for trace in snapshot.traces),
+            "top": memory_tracer.top(snapshot, group_by.value, top),
+        }
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error taking memory snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@admin_router.get('/admin/profile/memory/diff', response_model=MemoryDiff, tags=["Profiling"], responses=PROFILING_RESPONSES)
+@limiter.limit("5/minute")
+def diff_memory_snapshots(request: Request,
+                          from_id: int = Query(..., alias="from"),
+                          to_id: Optional[int] = Query(None, alias="to"),
+                          group_by: AllocationGrouping = AllocationGrouping.lineno,
+                          top: int = Query(20, ge=1, le=500),
+                          auth=Depends(auth_handler.require_admin)):
+    """
+    Allocation changes between two snapshots, largest change first.
+
+    Args:
+        - from (int): ID of the earlier snapshot.
+        - to (Optional[int]): ID of the later snapshot; a new snapshot is taken if omitted.
+        - group_by (AllocationGrouping): Group allocations by line, file or traceback.
+        - top (int): Number of allocation sites returned.
+
+    Returns:
+        - MemoryDiff: Total change in traced bytes and the allocation sites that changed the most.
+
+    Raises:
+        - HTTPException: If a snapshot is not found, if tracing is not started or if there are too many requests.
+    """
+    try:
+        old = memory_tracer.get(from_id)
+        if to_id is None:
+            to_id, _, new = memory_tracer.take()
+        else:
+            new = memory_tracer.get(to_id)
+        stats = memory_tracer.diff(old, new, group_by.value, top)
+        return {
+            "from_id": from_id,
+            "to_id": to_id,
+            "size_diff": sum(trace.size for trace in new.traces) - sum(trace.size for trace in old.traces),
+            "top": stats,
+        }
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error diffing memory snapshots: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
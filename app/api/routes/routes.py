@@ -1,21 +1,39 @@
-from fastapi import APIRouter, HTTPException, Request, Depends, status
+from fastapi import APIRouter, HTTPException, Request, Depends, Query, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from slowapi.errors import RateLimitExceeded
-#from bson import ObjectId
-#import pymongo.errors
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from typing import Callable, Hashable, Iterable, List, Optional
+from datetime import date, datetime, timedelta, timezone
 import logging
+import tempfile
 
 # Configuration, models, methods and authentication modules imports
 
-#from app.api.config.db import database
 from app.api.config.limiter import limiter
-from app.api.config.env import API_NAME
-from app.api.models.models import ResponseError, ItemPatch, ItemCreate, Item, Product, ProductCreate, ProductPatch
+from app.api.config.env import API_NAME, SSE_KEEPALIVE_SECONDS, MULTI_GET_MAX_IDS, EXPORT_BATCH_SIZE, IMPORT_BATCH_SIZE, ITEMS_MAX_BATCH
+from app.api.config.admission import admission_controller
+from app.api.config.analytics import catalog_snapshot
+from app.api.config.cache import query_cache
+from app.api.config.events import product_events
+from app.api.config.singleflight import product_reads
+from app.api.config.write_behind import price_write_behind
+from app.api.config.replica import product_replica
+from app.api.config.purger import product_purger
+from app.api.config.shards import ReservedIdError
+from app.api.adapters.n8 import n8_webhook
+from app.api.config.negotiation import NegotiatedRoute, negotiated_response, response_format
+from app.api.models.models import ResponseError, ItemPatch, ItemCreate, Item, ItemView, ItemPage, ItemBatchCreate, ItemBatchCreated, ItemOperationType, ItemBulkWrite, ItemBulkWriteResult, Product, ProductCreate, ProductPatch, ProductBatch, ProductBatchGet, ProductPage, ProductDeleteFilter, ProductDeleteResult, BulkFormat, ProductImportResult, PriceHistory, PriceInterval, PriceCandle, PriceSummary, PricePercentiles, PriceHistogram, PriceExtremes
 from app.api.auth.auth import auth_handler
 #from app.api.methods.methods import is_valid_objectid, convert_objectid_to_str, handle_error
-from app.api.database import create_product_in_db, get_all_products, get_product_by_id, delete_product_by_id, update_product_in_db
+from app.api.methods.methods import parse_id_list, parse_objectid, encode_item_documents, encode_item_page, downsample_candles, interval_start
+from app.api.methods.serialization import encode, encode_product_list
+from app.api.methods.bulk import ENCODERS, PARSERS, FILE_READERS, MEDIA_TYPES, BulkFormatError, require_pyarrow
+from app.api.database import create_product_in_db, get_all_product_rows, get_product_by_id, get_products_by_ids, get_products_page, delete_product_by_id, delete_products_by_filter, update_product_in_db, iter_product_batches, bulk_insert_products, get_price_history, get_daily_price_candles
+from app.api import items_database
 
-router = APIRouter()
+# Product routes negotiate their body formats (see NegotiatedRoute)
+router = APIRouter(route_class=NegotiatedRoute)
 
 # Log file name
 log_filename = f"api_{API_NAME}.log"
@@ -29,6 +47,30 @@ logging.basicConfig(level=logging.INFO,
 logger = logging.getLogger(__name__)
 
 
+def cached_response(key: Hashable, render: Callable[[str], bytes]) -> Response:
+    """
+    Serve a response from the query cache in the negotiated format, rendering and caching it on a miss.
+
+    Hits skip both the database and the serialization, since the cache holds encoded bytes,
+    one entry per format.
+
+    Args:
+        - key (Hashable): Normalized query.
+        - render (Callable[[str], bytes]): Produces the body encoded in the given format on a miss.
+
+    Returns:
+        - Response: The encoded response.
+    """
+    format_name = response_format()
+    key = (format_name, key)
+    body = query_cache.get(key)
+    if body is None:
+        generation = query_cache.generation
+        body = render(format_name)
+        query_cache.put(key, body, generation)
+    return negotiated_response(body)
+
+
 # Products routes
 
 @router.post('/products/',
@@ -62,6 +104,8 @@ def create_product(product: ProductCreate, request: Request):
         
         product = new_product.as_dict()
         return product
+    except HTTPException as http_exception:
+        raise http_exception
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
     except Exception as e:
@@ -89,8 +133,9 @@ def get_products(request: Request):
         - HTTPException: If there is an error retrieving products or if there are too many requests.
     """
     try:
-        products = [product.as_dict() for product in get_all_products()]
-        return products
+        return cached_response(("products", "all"), lambda format_name: encode_product_list(get_all_product_rows(), format_name))
+    except HTTPException as http_exception:
+        raise http_exception
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
     except Exception as e:
@@ -98,6 +143,139 @@ def get_products(request: Request):
         raise HTTPException(status_code=500, detail="Internal server error.")
 
 
+def batch_get_products(product_ids: List[int]) -> dict:
+    """
+    Resolve a multi-get request through a single database call.
+
+    Args:
+        - product_ids (List[int]): Requested product IDs.
+
+    Returns:
+        - dict: Found products and missing IDs, in request order.
+
+    Raises:
+        - HTTPException: If no IDs or more than `MULTI_GET_MAX_IDS` IDs are requested.
+    """
+    if not product_ids:
+        raise HTTPException(status_code=400, detail="At least one product ID is required.")
+    if len(product_ids) > MULTI_GET_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MULTI_GET_MAX_IDS} product IDs can be requested at once.")
+    products, missing = get_products_by_ids(product_ids)
+    return {"products": [product.as_dict() for product in products], "missing": missing}
+
+
+@router.get('/products',
+            response_model=ProductBatch,
+            tags=["CRUD"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+                400: {"model": ResponseError, "description": "Invalid or too many product IDs."},
+            })
+@limiter.limit("5/minute")
+def get_products_batch(ids: str, request: Request):
+    """
+    Retrieve many products by ID in one request.
+
+    Args:
+        - ids (str): Comma-separated product IDs.
+
+    Returns:
+        - ProductBatch: Found products in request order and the IDs that were not found.
+
+    Raises:
+        - HTTPException: If the IDs are invalid, if there is an error retrieving products or if there are too many requests.
+    """
+    try:
+        product_ids = tuple(dict.fromkeys(parse_id_list(ids)))
+        return cached_response(("products:ids", product_ids), lambda format_name: encode(batch_get_products(list(product_ids)), format_name))
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error retrieving products batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.get('/products/page',
+            response_model=ProductPage,
+            tags=["CRUD"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+                400: {"model": ResponseError, "description": "Invalid price range."},
+            })
+@limiter.limit("5/minute")
+def get_products_paginated(request: Request,
+                           after: Optional[int] = None,
+                           limit: int = Query(100, ge=1, le=1000),
+                           min_price: Optional[float] = None,
+                           max_price: Optional[float] = None):
+    """
+    Retrieve a page of products ordered by ID, optionally filtered by price.
+
+    Args:
+        - after (Optional[int]): `next_after` of the previous page. Omit it for the first page.
+        - limit (int): Maximum number of products in the page.
+        - min_price (Optional[float]): Lowest price, inclusive.
+        - max_price (Optional[float]): Highest price, inclusive.
+
+    Returns:
+        - ProductPage: Products of the page and the cursor of the next one.
+
+    Raises:
+        - HTTPException: If the price range is invalid, if there is an error retrieving products or if there are too many requests.
+    """
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise HTTPException(status_code=400, detail="min_price must not be greater than max_price.")
+    try:
+        rows = get_products_page(after, limit, min_price, max_price)
+        next_after = rows[-1][0] if len(rows) == limit else None
+        return {"products": [dict(zip(("id", "name", "description", "price"), row)) for row in rows], "next_after": next_after}
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error retrieving products page: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.post('/products/:batchGet',
+             response_model=ProductBatch,
+             tags=["CRUD"],
+             responses={
+                 500: {"model": ResponseError, "description": "Internal server error."},
+                 429: {"model": ResponseError, "description": "Too many requests."},
+                 400: {"model": ResponseError, "description": "Invalid or too many product IDs."},
+             })
+@limiter.limit("5/minute")
+def post_products_batch(batch: ProductBatchGet, request: Request):
+    """
+    Retrieve many products by ID in one request, for ID lists too long for a query string.
+
+    Args:
+        - batch (ProductBatchGet): Requested product IDs.
+
+    Returns:
+        - ProductBatch: Found products in request order and the IDs that were not found.
+
+    Raises:
+        - HTTPException: If the IDs are invalid, if there is an error retrieving products or if there are too many requests.
+    """
+    try:
+        product_ids = tuple(dict.fromkeys(batch.ids))
+        return cached_response(("products:ids", product_ids), lambda format_name: encode(batch_get_products(list(product_ids)), format_name))
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error retrieving products batch: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
 @router.get('/products/{product_id}/', 
             response_model=Product, 
             tags=["CRUD"],
@@ -132,6 +310,48 @@ def get_product(product_id: int, request: Request):
     except Exception as e:
         logger.error(f"Error retrieving product: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error.")
+
+@router.get('/products/stream',
+            tags=["Streaming"],
+            responses={
+                200: {"content": {"text/event-stream": {}}, "description": "Stream of product events."},
+                400: {"model": ResponseError, "description": "Invalid product IDs."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+            })
+@limiter.limit("5/minute")
+async def stream_products(request: Request, ids: Optional[str] = None):
+    """
+    Stream product create/update/delete events as Server-Sent Events.
+
+    Args:
+        - ids (Optional[str]): Comma-separated product IDs to follow. All products when omitted.
+
+    Returns:
+        - StreamingResponse: `text/event-stream` with one `created`, `updated` or `deleted` event per write.
+          Clients that fall too far behind are disconnected and should reconnect.
+
+    Raises:
+        - HTTPException: If the IDs are invalid or if there are too many requests.
+    """
+    product_ids = parse_id_list(ids) if ids else None
+    subscription = product_events.subscribe(product_ids)
+
+    async def event_stream():
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                frame = await subscription.next_event(SSE_KEEPALIVE_SECONDS)
+                if frame is None:
+                    logger.warning("Dropping slow product stream subscriber.")
+                    break
+                yield frame
+        finally:
+            product_events.unsubscribe(subscription)
+
+    return StreamingResponse(event_stream(),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
     
 @router.delete('/products/{product_id}/',
                response_model=Product,
@@ -167,6 +387,51 @@ def delete_product(product_id: int, request: Request):
         raise HTTPException(status_code=429, detail="Too many requests.")
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.post('/products/:batchDelete',
+             response_model=ProductDeleteResult,
+             tags=["CRUD"],
+             responses={
+                 500: {"model": ResponseError, "description": "Internal server error."},
+                 429: {"model": ResponseError, "description": "Too many requests."},
+                 400: {"model": ResponseError, "description": "Empty filter or criterion, too many product IDs or invalid price range."},
+             })
+@limiter.limit("5/minute")
+def delete_products_batch(delete_filter: ProductDeleteFilter, request: Request):
+    """
+    Delete every product matching a filter, in small batched transactions.
+
+    In soft delete mode the products are only marked deleted, and the purger removes them later.
+
+    Args:
+        - delete_filter (ProductDeleteFilter): IDs, name prefix and price range the products must all match.
+
+    Returns:
+        - ProductDeleteResult: Number of deleted products.
+
+    Raises:
+        - HTTPException: If the filter is empty or invalid, if there is an error deleting products or if there are too many requests.
+    """
+    criteria = delete_filter.dict(exclude_none=True)
+    if not criteria:
+        raise HTTPException(status_code=400, detail="At least one filter criterion is required.")
+    if delete_filter.ids == [] or delete_filter.name_prefix == "":
+        raise HTTPException(status_code=400, detail="ids and name_prefix must not be empty.")
+    if delete_filter.ids is not None and len(delete_filter.ids) > MULTI_GET_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MULTI_GET_MAX_IDS} product IDs can be deleted at once.")
+    if delete_filter.min_price is not None and delete_filter.max_price is not None and delete_filter.min_price > delete_filter.max_price:
+        raise HTTPException(status_code=400, detail="min_price must not be greater than max_price.")
+    try:
+        return {"deleted": delete_products_by_filter(**criteria)}
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error deleting products by filter: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
     
 @router.patch('/products/{product_id}/',
               response_model=Product,
@@ -209,270 +474,696 @@ def update_product(product_id: int, product_update: ProductPatch, request: Reque
     except Exception as e:
         logger.error(f"Error updating product: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error.")
-'''
-These endpoints are commented out because there is no connection to MongoDB, 
-which causes errors. When the connection with MongoDB is available, they can 
-be uncommented.
 
-# Item routes
-    
-@router.post('/items/', 
-             response_model=Item, 
-             status_code=status.HTTP_201_CREATED, 
-             tags=["CRUD"],
-             responses={
-                 500: {"model": ResponseError, "description": "Internal server error."},
-                 429: {"model": ResponseError, "description": "Too many requests."}
-             })
+# Price history routes
+
+def as_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """
+    Convert a datetime to naive UTC, as the price history stores it. Naive datetimes are taken as UTC.
+    """
+    if moment is None or moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+@router.get('/products/{product_id}/prices',
+            response_model=PriceHistory,
+            tags=["Price history"],
+            responses={
+                500: {"model": ResponseError, "description": "Internal server error."},
+                429: {"model": ResponseError, "description": "Too many requests."},
+                404: {"model": ResponseError, "description": "Product not found."},
+                400: {"model": ResponseError, "description": "Invalid time range."},
+            })
 @limiter.limit("5/minute")
-def create_item(item: ItemCreate, request: Request):#, auth=Depends(auth_handler.authenticate)):
-    """Create a new item in the database.
-    
+def get_product_prices(product_id: int, request: Request,
+                       start: Optional[datetime] = Query(None, alias="from"),
+                       end: Optional[datetime] = Query(None, alias="to"),
+                       limit: int = Query(1000, ge=1, le=10000)):
+    """
+    Retrieve the price changes of a product in a time range, oldest first.
+
     Args:
-    - item (ItemCreate): Item to be created.
-    
+        - product_id (int): ID of the product.
+        - from (Optional[datetime]): Start of the range, inclusive. ISO 8601; UTC unless it has an offset.
+        - to (Optional[datetime]): End of the range, exclusive.
+        - limit (int): Maximum number of changes.
+
     Returns:
-    - Item: Created item with its ID.
+        - PriceHistory: Price changes and the `from` of the rest of the range, if it has more changes than `limit`.
+
+    Raises:
+        - HTTPException: If the product is not found, if the range is invalid, if there is an error retrieving the history or if there are too many requests.
     """
+    start, end = as_utc(start), as_utc(end)
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="from must not be later than to.")
     try:
-        logger.info("Creating a new item.")
-        new_item = database.items.insert_one(item.dict())
-        if not new_item.inserted_id:
-            logger.warning("Failed to create a new item.")
-            raise HTTPException(status_code=500, detail="Item creation failed.")
-        logger.info(f"Item with ID {str(new_item.inserted_id)} successfully created.")
-        item = item.dict()
-        item["id"] = str(new_item.inserted_id)
-        return item
-    except pymongo.errors.PyMongoError as e:
-        # Handle any PyMongo errors here
-        logger.critical(f"Error interacting with the database: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error updating password.")
+        if get_product_by_id(product_id) is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        rows = get_price_history(product_id, start, end, limit)
+        next_from = rows[-1][1] + timedelta(microseconds=1) if len(rows) == limit else None
+        return {"changes": [{"price": price, "changed_at": changed_at} for price, changed_at in rows], "next_from": next_from}
+    except HTTPException as http_exception:
+        raise http_exception
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
-    except HTTPException:
-        # This is to ensure HTTPException is not caught in the generic Exception
-        raise
     except Exception as e:
-        handle_error(e, logger)
+        logger.error(f"Error retrieving price history: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
 
-@router.get('/items/', 
-            response_model=List[Item],
-            tags=["CRUD"],
+
+@router.get('/products/{product_id}/prices/ohlc',
+            response_model=List[PriceCandle],
+            tags=["Price history"],
             responses={
                 500: {"model": ResponseError, "description": "Internal server error."},
                 429: {"model": ResponseError, "description": "Too many requests."},
-                404: {"model": ResponseError, "description": "Not items found."},
+                404: {"model": ResponseError, "description": "Product not found."},
+                400: {"model": ResponseError, "description": "Invalid date range."},
             })
 @limiter.limit("5/minute")
-def list_items(request: Request):#, auth=Depends(auth_handler.authenticate)):
-    """Fetch all items from the database.
-    
+def get_product_price_candles(product_id: int, request: Request,
+                              interval: PriceInterval = PriceInterval.day,
+                              start: Optional[date] = Query(None, alias="from"),
+                              end: Optional[date] = Query(None, alias="to")):
+    """
+    Retrieve the open, high, low and close prices of a product per day, week or month.
+
+    Candles are built from daily aggregates kept up to date by every price change, so
+    the price history itself is never scanned.
+
+    Args:
+        - product_id (int): ID of the product.
+        - interval (PriceInterval): Length of each candle. Weeks start on Monday.
+        - from (Optional[date]): First day, in UTC. Widened to the start of its interval.
+        - to (Optional[date]): Last day, in UTC, inclusive.
+
     Returns:
-    - List[Item]: List of items.
+        - List[PriceCandle]: One candle per interval with a price change, oldest first.
+
+    Raises:
+        - HTTPException: If the product is not found, if the range is invalid, if there is an error retrieving the prices or if there are too many requests.
     """
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="from must not be later than to.")
     try:
-        logger.info("Fetching all items.")
-        items = list(database.items.find())
-        if not items:
-            logger.warning("No items found in the database.")
-            raise HTTPException(status_code=404, detail="No items found.")
-        logger.info("Items successfully fetched.")
-        items = convert_objectid_to_str(items)
-        return items
-    except pymongo.errors.PyMongoError as e:
-        # Handle any PyMongo errors here
-        logger.critical(f"Error interacting with the database: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error updating password.")
+        if get_product_by_id(product_id) is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        if start is not None:
+            start = interval_start(start, interval.value)
+        return downsample_candles(get_daily_price_candles(product_id, start, end), interval.value)
+    except HTTPException as http_exception:
+        raise http_exception
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
-    except HTTPException:
-        # This is to ensure HTTPException is not caught in the generic Exception
-        raise
     except Exception as e:
-        handle_error(e, logger)
+        logger.error(f"Error retrieving price candles: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
 
-@router.get('/items/{item_id}/',
-            response_model=Item,
-            tags=["CRUD"],
+# Bulk import/export routes
+
+def check_bulk_format(file_format: BulkFormat):
+    """
+    Make sure the dependencies of a bulk format are installed.
+
+    Raises:
+        - HTTPException: With a 501 status code if pyarrow is required but missing.
+    """
+    if file_format.value in FILE_READERS:
+        try:
+            require_pyarrow()
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Arrow and Parquet support requires pyarrow to be installed.")
+
+
+@router.get('/products/export',
+            tags=["Bulk"],
             responses={
-                500: {"model": ResponseError, "description": "Internal server error."},
+                200: {"content": {media_type: {} for media_type in MEDIA_TYPES.values()}, "description": "Catalog file."},
                 429: {"model": ResponseError, "description": "Too many requests."},
-                404: {"model": ResponseError, "description": "Item not found."},
-                400: {"model": ResponseError, "description": "Invalid item_id format."},
+                501: {"model": ResponseError, "description": "Format not supported by this server."},
             })
 @limiter.limit("5/minute")
-def get_item(item_id: str, request: Request):#, auth=Depends(auth_handler.authenticate)):
-    """Fetch a single item from the database using its ID.
-    
+def export_products(request: Request, file_format: BulkFormat = Query(BulkFormat.ndjson, alias="format")):
+    """
+    Export the whole catalog as CSV, NDJSON, Arrow IPC stream or Parquet.
+
+    Rows are streamed from a server-side cursor and encoded batch by batch, so memory
+    stays bounded whatever the size of the catalog.
+
     Args:
-    - item_id (str): ID of the item to be fetched.
-    
+        - format (BulkFormat): Output format, NDJSON by default.
+
     Returns:
-    - Item: Fetched item.
-    
+        - StreamingResponse: The encoded catalog, ordered by ID.
+
+    Raises:
+        - HTTPException: If the format is not available or if there are too many requests.
+    """
+    check_bulk_format(file_format)
+    encoder = ENCODERS[file_format.value]
+    return StreamingResponse(encoder(iter_product_batches(EXPORT_BATCH_SIZE)),
+                             media_type=MEDIA_TYPES[file_format.value],
+                             headers={"Content-Disposition": f'attachment; filename="products.{file_format.value}"'})
+
+
+def import_file_batches(batches: Iterable[List[dict]], imported: List[int]):
+    # Runs in the threadpool; `imported` keeps the count available if a later batch fails
+    for batch in batches:
+        imported[0] += bulk_insert_products(batch)
+
+
+@router.post('/products/import',
+             response_model=ProductImportResult,
+             status_code=status.HTTP_201_CREATED,
+             tags=["Bulk"],
+             responses={
+                 500: {"model": ResponseError, "description": "Internal server error."},
+                 429: {"model": ResponseError, "description": "Too many requests."},
+                 400: {"model": ResponseError, "description": "Invalid file."},
+                 409: {"model": ResponseError, "description": "Product ID already exists or is reserved for new products."},
+                 501: {"model": ResponseError, "description": "Format not supported by this server."},
+             })
+@limiter.limit("5/minute")
+async def import_products(request: Request, file_format: BulkFormat = Query(BulkFormat.ndjson, alias="format")):
+    """
+    Import products from a CSV, NDJSON, Arrow IPC stream or Parquet request body.
+
+    CSV and NDJSON bodies are parsed incrementally as they arrive; Arrow and Parquet bodies
+    are spooled to a temporary file and read back one record batch at a time. Rows are
+    inserted in transactions of `IMPORT_BATCH_SIZE` rows. If a row is invalid the import
+    stops there, and the batches committed before it are kept.
+
+    Args:
+        - format (BulkFormat): Body format, NDJSON by default.
+
+    Returns:
+        - ProductImportResult: Number of imported products.
+
+    Raises:
+        - HTTPException: If the file is invalid, the format is not available or if there are too many requests.
+    """
+    check_bulk_format(file_format)
+    imported = [0]
+    try:
+        if file_format.value in PARSERS:
+            parser = PARSERS[file_format.value]()
+            batch = []
+            async for chunk in request.stream():
+                # Parsing a chunk takes too long to run on the event loop
+                batch.extend(await run_in_threadpool(parser.feed, chunk))
+                while len(batch) >= IMPORT_BATCH_SIZE:
+                    await run_in_threadpool(import_file_batches, [batch[:IMPORT_BATCH_SIZE]], imported)
+                    del batch[:IMPORT_BATCH_SIZE]
+            batch.extend(await run_in_threadpool(parser.close))
+            await run_in_threadpool(import_file_batches, [batch], imported)
+        else:
+            with tempfile.TemporaryFile() as spool:
+                async for chunk in request.stream():
+                    spool.write(chunk)
+                spool.seek(0)
+                batches = FILE_READERS[file_format.value](spool, IMPORT_BATCH_SIZE)
+                await run_in_threadpool(import_file_batches, batches, imported)
+        return {"imported": imported[0]}
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=f"{e} {imported[0]} products were imported before the error.")
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail=f"Some product IDs already exist. {imported[0]} products were imported before the error.")
+    except ReservedIdError as e:
+        raise HTTPException(status_code=409, detail=f"{e} {imported[0]} products were imported before the error.")
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error importing products: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+# Analytics routes
+#
+# Served from an in-memory columnar snapshot of the catalog, kept current by product writes.
+
+ANALYTICS_RESPONSES = {
+    500: {"model": ResponseError, "description": "Internal server error."},
+    429: {"model": ResponseError, "description": "Too many requests."},
+    400: {"model": ResponseError, "description": "Invalid parameters."},
+}
+
+
+@router.get('/products/analytics/summary', response_model=PriceSummary, tags=["Analytics"], responses=ANALYTICS_RESPONSES)
+@limiter.limit("5/minute")
+def get_price_summary(request: Request):
+    """
+    Count, minimum, maximum, mean, standard deviation and total of product prices.
+
+    Returns:
+        - PriceSummary: Price statistics. Products without a price are not counted.
+
+    Raises:
+        - HTTPException: If the snapshot cannot be loaded or if there are too many requests.
+    """
+    try:
+        return catalog_snapshot.summary()
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error computing price summary: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.get('/products/analytics/percentiles', response_model=PricePercentiles, tags=["Analytics"], responses=ANALYTICS_RESPONSES)
+@limiter.limit("5/minute")
+def get_price_percentiles(request: Request, q: str = "50,90,95,99"):
+    """
+    Percentiles of product prices.
+
+    Args:
+        - q (str): Comma-separated percentiles between 0 and 100.
+
+    Returns:
+        - PricePercentiles: Price at each requested percentile.
+
+    Raises:
+        - HTTPException: If a percentile is invalid, the snapshot cannot be loaded or if there are too many requests.
+    """
+    try:
+        quantiles = [float(part) for part in q.split(',') if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Percentiles must be comma-separated numbers.")
+    if not quantiles or any(not 0 <= quantile <= 100 for quantile in quantiles):
+        raise HTTPException(status_code=400, detail="Percentiles must be between 0 and 100.")
+    try:
+        return {"percentiles": catalog_snapshot.percentiles(quantiles)}
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error computing price percentiles: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.get('/products/analytics/histogram', response_model=PriceHistogram, tags=["Analytics"], responses=ANALYTICS_RESPONSES)
+@limiter.limit("5/minute")
+def get_price_histogram(request: Request,
+                        buckets: int = Query(10, ge=1, le=1000),
+                        low: Optional[float] = Query(None, alias="min"),
+                        high: Optional[float] = Query(None, alias="max")):
+    """
+    Number of products per price bucket.
+
+    Args:
+        - buckets (int): Number of equal-width buckets.
+        - min (Optional[float]): Lower edge of the first bucket. Defaults to the lowest price.
+        - max (Optional[float]): Upper edge of the last bucket. Defaults to the highest price.
+
+    Returns:
+        - PriceHistogram: Bucket edges and counts.
+
+    Raises:
+        - HTTPException: If the range is invalid, the snapshot cannot be loaded or if there are too many requests.
+    """
+    if low is not None and high is not None and low > high:
+        raise HTTPException(status_code=400, detail="min must not be greater than max.")
+    try:
+        return catalog_snapshot.histogram(buckets, low, high)
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error computing price histogram: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.get('/products/analytics/extremes', response_model=PriceExtremes, tags=["Analytics"], responses=ANALYTICS_RESPONSES)
+@limiter.limit("5/minute")
+def get_price_extremes(request: Request, n: int = Query(5, ge=1, le=100)):
+    """
+    The cheapest and most expensive products.
+
+    Args:
+        - n (int): Number of products on each side.
+
+    Returns:
+        - PriceExtremes: Cheapest products first, and most expensive products first.
+
+    Raises:
+        - HTTPException: If the snapshot cannot be loaded or if there are too many requests.
+    """
+    try:
+        return catalog_snapshot.extremes(n)
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error computing price extremes: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+# Metrics routes
+
+@router.get('/metrics/', tags=["Metrics"])
+def get_metrics():
+    """
+    Report runtime metrics of this worker.
+
+    Returns:
+        - dict: Metrics grouped by subsystem.
+    """
+    return {
+        "events": product_events.stats(),
+        "single_flight": product_reads.stats(),
+        "query_cache": query_cache.stats(),
+        "analytics": catalog_snapshot.stats(),
+        "admission": admission_controller.stats(),
+        "write_behind": price_write_behind.stats(),
+        "replica": product_replica.stats(),
+        "purger": product_purger.stats(),
+        "n8": n8_webhook.stats(),
+    }
+
+# Item routes
+
+# Served from MongoDB through the shared async client; the handlers never block the event loop.
+
+def parse_item_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Parse the comma-separated `fields` of item queries.
+
+    Raises:
+        - HTTPException: With a 400 status code if a field is unknown.
+    """
+    if fields is None:
+        return None
+    names = [name.strip() for name in fields.split(',') if name.strip()]
+    unknown = [name for name in names if name not in items_database.ITEM_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown item fields: {', '.join(unknown)}.")
+    return names
+
+ITEM_RESPONSES = {
+    500: {"model": ResponseError, "description": "Internal server error."},
+    503: {"model": ResponseError, "description": "Items database unavailable."},
+    429: {"model": ResponseError, "description": "Too many requests."},
+}
+
+@router.post('/items/',
+             response_model=Item,
+             status_code=status.HTTP_201_CREATED,
+             tags=["CRUD"],
+             responses=ITEM_RESPONSES)
+@limiter.limit("5/minute")
+async def create_item(item: ItemCreate, request: Request):#, auth=Depends(auth_handler.authenticate)):
+    """
+    Create a new item in the database.
+
+    Args:
+        - item (ItemCreate): Item to be created.
+
+    Returns:
+        - Item: Created item with its ID.
+
+    Raises:
+        - HTTPException: If the item could not be created or if there are too many requests.
+    """
+    try:
+        item_id = await items_database.create_item(item.dict())
+        return {"id": str(item_id), **item.dict()}
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error creating item: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.post('/items/:batchCreate',
+             response_model=ItemBatchCreated,
+             status_code=status.HTTP_201_CREATED,
+             tags=["CRUD"],
+             responses={**ITEM_RESPONSES, 400: {"model": ResponseError, "description": "Empty or too large batch."}})
+@limiter.limit("5/minute")
+async def create_items_batch(batch: ItemBatchCreate, request: Request):
+    """
+    Create many items with a single `insert_many`.
+
+    Args:
+        - batch (ItemBatchCreate): Items to be created, at most `ITEMS_MAX_BATCH`.
+
+    Returns:
+        - ItemBatchCreated: IDs of the created items, in request order.
+
+    Raises:
+        - HTTPException: If the batch is empty or too large, if the items could not be created or if there are too many requests.
+    """
+    if not batch.items or len(batch.items) > ITEMS_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {ITEMS_MAX_BATCH} items.")
+    try:
+        item_ids = await items_database.create_items([item.dict() for item in batch.items])
+        return {"ids": [str(item_id) for item_id in item_ids]}
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error creating items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.post('/items/:bulkWrite',
+             response_model=ItemBulkWriteResult,
+             tags=["CRUD"],
+             responses={**ITEM_RESPONSES, 400: {"model": ResponseError, "description": "Invalid or too many operations."}})
+@limiter.limit("5/minute")
+async def bulk_write_items(bulk: ItemBulkWrite, request: Request):
+    """
+    Apply item inserts, updates and deletions with a single `bulk_write`.
+
+    Args:
+        - bulk (ItemBulkWrite): Operations, at most `ITEMS_MAX_BATCH`, and whether they are ordered.
+
+    Returns:
+        - ItemBulkWriteResult: IDs of the inserted items and the numbers of matched, modified and deleted items.
+
     Raises:
-    - HTTPException: If the item is not found.
+        - HTTPException: If an operation is invalid, if there are too many of them, if the write fails or if there are too many requests.
     """
+    if not bulk.operations or len(bulk.operations) > ITEMS_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"Send between 1 and {ITEMS_MAX_BATCH} operations.")
+    operations = []
+    for position, operation in enumerate(bulk.operations):
+        fields = operation.dict(include=set(items_database.ITEM_FIELDS), exclude_none=True)
+        if operation.op == ItemOperationType.insert:
+            if operation.id is not None or len(fields) != len(items_database.ITEM_FIELDS):
+                raise HTTPException(status_code=400, detail=f"Operation {position}: inserts need every item field and no id.")
+            operations.append((operation.op.value, None, fields))
+            continue
+        if operation.id is None:
+            raise HTTPException(status_code=400, detail=f"Operation {position}: {operation.op.value} needs an id.")
+        if operation.op == ItemOperationType.update and not fields:
+            raise HTTPException(status_code=400, detail=f"Operation {position}: update needs a field to set.")
+        operations.append((operation.op.value, parse_objectid(operation.id), fields))
     try:
-        logger.info(f"Fetching item with ID {item_id}.")
-        if not is_valid_objectid(item_id):
-            raise HTTPException(status_code=400, detail="Invalid item_id format.")
-        item = database.items.find_one({"_id": ObjectId(item_id)})
-        if not item:
-            logger.warning(f"No item found with ID {item_id}.")
+        result = await items_database.bulk_write_items(operations, ordered=bulk.ordered)
+        return {**result, "inserted_ids": [str(item_id) for item_id in result["inserted_ids"]]}
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error in item bulk write: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.get('/items/',
+            response_model=ItemPage,
+            tags=["CRUD"],
+            responses={**ITEM_RESPONSES, 400: {"model": ResponseError, "description": "Invalid cursor or fields."}})
+@limiter.limit("5/minute")
+async def list_items(request: Request,
+                     after: Optional[str] = None,
+                     limit: int = Query(100, ge=1, le=1000),
+                     fields: Optional[str] = None):#, auth=Depends(auth_handler.authenticate)):
+    """
+    Retrieve a page of items ordered by ID.
+
+    Args:
+        - after (Optional[str]): `next_after` of the previous page. Omit it for the first page.
+        - limit (int): Maximum number of items in the page.
+        - fields (Optional[str]): Comma-separated fields to return besides the ID, e.g. `name`. All of them by default.
+
+    Returns:
+        - ItemPage: Items of the page and the cursor of the next one.
+
+    Raises:
+        - HTTPException: If the cursor or fields are invalid, if there is an error retrieving items or if there are too many requests.
+    """
+    after_id = parse_objectid(after) if after is not None else None
+    names = parse_item_fields(fields)
+    try:
+        documents = await items_database.get_items_page(after_id, limit, names)
+        next_after = documents[-1]["_id"] if len(documents) == limit else None
+        return Response(encode_item_page(documents, next_after), media_type="application/json")
+    except HTTPException as http_exception:
+        raise http_exception
+    except RateLimitExceeded:
+        raise HTTPException(status_code=429, detail="Too many requests.")
+    except Exception as e:
+        logger.error(f"Error retrieving items: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+
+@router.get('/items/{item_id}/',
+            response_model=ItemView,
+            tags=["CRUD"],
+            responses={**ITEM_RESPONSES,
+                       404: {"model": ResponseError, "description": "Item not found."},
+                       400: {"model": ResponseError, "description": "Invalid item_id format or fields."}})
+@limiter.limit("5/minute")
+async def get_item(item_id: str, request: Request, fields: Optional[str] = None):#, auth=Depends(auth_handler.authenticate)):
+    """
+    Retrieve an item by its ID.
+
+    Args:
+        - item_id (str): ID of the item.
+        - fields (Optional[str]): Comma-separated fields to return besides the ID. All of them by default.
+
+    Returns:
+        - ItemView: The item.
+
+    Raises:
+        - HTTPException: If the ID or fields are invalid, if the item is not found or if there are too many requests.
+    """
+    object_id = parse_objectid(item_id)
+    names = parse_item_fields(fields)
+    try:
+        document = await items_database.get_item(object_id, names)
+        if document is None:
             raise HTTPException(status_code=404, detail="Item not found.")
-        logger.info(f"Item with ID {item_id} successfully fetched.")
-        item = convert_objectid_to_str(item)
-        return item
-    except pymongo.errors.PyMongoError as e:
-        # Handle any PyMongo errors here
-        logger.critical(f"Error interacting with the database: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error updating password.")
+        return Response(encode_item_documents(document), media_type="application/json")
+    except HTTPException as http_exception:
+        raise http_exception
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
-    except HTTPException:
-        # This is to ensure HTTPException is not caught in the generic Exception
-        raise
     except Exception as e:
-        handle_error(e, logger)
+        logger.error(f"Error retrieving item: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
 
-@router.put('/items/{item_id}/', 
+@router.put('/items/{item_id}/',
             response_model=Item,
             tags=["CRUD"],
-            responses={
-                500: {"model": ResponseError, "description": "Internal server error."},
-                429: {"model": ResponseError, "description": "Too many requests."},
-                404: {"model": ResponseError, "description": "Item not found or not updated."},
-                400: {"model": ResponseError, "description": "Invalid item_id format."},
-            })
+            responses={**ITEM_RESPONSES,
+                       404: {"model": ResponseError, "description": "Item not found."},
+                       400: {"model": ResponseError, "description": "Invalid item_id format."}})
 @limiter.limit("5/minute")
-def update_item(item_id: str, item_update: ItemCreate, request: Request):#, auth=Depends(auth_handler.authenticate)):
-    """Update an item in the database.
-    
+async def update_item(item_id: str, item_update: ItemCreate, request: Request):#, auth=Depends(auth_handler.authenticate)):
+    """
+    Replace the fields of an item.
+
     Args:
-    - item_id (str): ID of the item to be updated.
-    - item_update (ItemCreate): New data for the item.
-    
+        - item_id (str): ID of the item.
+        - item_update (ItemCreate): New data for the item.
+
     Returns:
-    - Item: Updated item.
-    
+        - Item: Updated item.
+
     Raises:
-    - HTTPException: If the item is not found.
+        - HTTPException: If the ID is invalid, if the item is not found or if there are too many requests.
     """
+    object_id = parse_objectid(item_id)
     try:
-        logger.info(f"Updating item with ID {item_id}.")
-        if not is_valid_objectid(item_id):
-            raise HTTPException(status_code=400, detail="Invalid item_id format.")
-        updated_item = database.items.find_one_and_update({"_id": ObjectId(item_id)}, {"$set": item_update.dict()}, return_document=True)
-        if not updated_item:
-            logger.warning(f"Failed to update item with ID {item_id}.")
-            raise HTTPException(status_code=404, detail="Item not found or not updated.")
-        logger.info(f"Item with ID {item_id} successfully updated.")
-        updated_item = convert_objectid_to_str(updated_item)
-        return updated_item
-    except pymongo.errors.PyMongoError as e:
-        # Handle any PyMongo errors here
-        logger.critical(f"Error interacting with the database: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error updating password.")
+        document = await items_database.update_item(object_id, item_update.dict())
+        if document is None:
+            raise HTTPException(status_code=404, detail="Item not found.")
+        return Response(encode_item_documents(document), media_type="application/json")
+    except HTTPException as http_exception:
+        raise http_exception
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
-    except HTTPException:
-        # This is to ensure HTTPException is not caught in the generic Exception
-        raise
     except Exception as e:
-        handle_error(e, logger)
+        logger.error(f"Error updating item: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
 
 @router.patch('/items/{item_id}/',
               response_model=Item,
               tags=["CRUD"],
-              responses={
-                  500: {"model": ResponseError, "description": "Internal server error."},
-                  429: {"model": ResponseError, "description": "Too many requests."},
-                  404: {"model": ResponseError, "description": "Item not found or not patched."},
-                  400: {"model": ResponseError, "description": "Invalid item_id format."},
-              })
+              responses={**ITEM_RESPONSES,
+                         404: {"model": ResponseError, "description": "Item not found."},
+                         400: {"model": ResponseError, "description": "Invalid item_id format."}})
 @limiter.limit("5/minute")
-def patch_item(item_id: str, item_patch: ItemPatch, request: Request):#, auth=Depends(auth_handler.authenticate)):
-    """Partially update an item in the database.
-    
+async def patch_item(item_id: str, item_patch: ItemPatch, request: Request):#, auth=Depends(auth_handler.authenticate)):
+    """
+    Partially update an item. Only the fields sent are changed.
+
     Args:
-    - item_id (str): ID of the item to be updated.
-    - item_update (ItemCreate): New data for the item.
-    
+        - item_id (str): ID of the item.
+        - item_patch (ItemPatch): Fields to change.
+
     Returns:
-    - Item: Updated item.
-    
+        - Item: Updated item.
+
     Raises:
-    - HTTPException: If the item is not found.
+        - HTTPException: If the ID is invalid, if the item is not found or if there are too many requests.
     """
+    object_id = parse_objectid(item_id)
     try:
-        logger.info(f"Partially updating item with ID {item_id}.")
-        if not is_valid_objectid(item_id):
-            raise HTTPException(status_code=400, detail="Invalid item_id format.")
-        updated_item = database.items.find_one_and_update({"_id": ObjectId(item_id)}, {"$set": item_patch.dict()}, return_document=True)
-        if not updated_item:
-            logger.warning(f"Failed to patch item with ID {item_id}.")
-            raise HTTPException(status_code=404, detail="Item not found or not patched.")
-        logger.info(f"Item with ID {item_id} successfully patched.")
-        updated_item = convert_objectid_to_str(updated_item)
-        return updated_item
-    except pymongo.errors.PyMongoError as e:
-        # Handle any PyMongo errors here
-        logger.critical(f"Error interacting with the database: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error updating password.")
+        document = await items_database.update_item(object_id, item_patch.dict(exclude_unset=True))
+        if document is None:
+            raise HTTPException(status_code=404, detail="Item not found.")
+        return Response(encode_item_documents(document), media_type="application/json")
+    except HTTPException as http_exception:
+        raise http_exception
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
-    except HTTPException:
-        # This is to ensure HTTPException is not caught in the generic Exception
-        raise
     except Exception as e:
-        handle_error(e, logger)
+        logger.error(f"Error patching item: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
 
 @router.delete('/items/{item_id}/',
                response_model=Item,
                tags=["CRUD"],
-               responses={
-                   500: {"model": ResponseError, "description": "Internal server error."},
-                   429: {"model": ResponseError, "description": "Too many requests."},
-                   404: {"model": ResponseError, "description": "Item not found or not deleted."},
-                   400: {"model": ResponseError, "description": "Invalid item_id format."},
-               })
+               responses={**ITEM_RESPONSES,
+                          404: {"model": ResponseError, "description": "Item not found."},
+                          400: {"model": ResponseError, "description": "Invalid item_id format."}})
 @limiter.limit("5/minute")
-def delete_item(item_id: str, request: Request):#, auth=Depends(auth_handler.authenticate)):
-    """Delete an item from the database.
-    
+async def delete_item(item_id: str, request: Request):#, auth=Depends(auth_handler.authenticate)):
+    """
+    Delete an item by its ID.
+
     Args:
-    - item_id (str): ID of the item to be deleted.
-    
+        - item_id (str): ID of the item.
+
     Returns:
-    - Item: Deleted item.
-    
+        - Item: Deleted item.
+
     Raises:
-    - HTTPException: If the item is not found.
+        - HTTPException: If the ID is invalid, if the item is not found or if there are too many requests.
     """
+    object_id = parse_objectid(item_id)
     try:
-        logger.info(f"Deleting item with ID {item_id}.")
-        if not is_valid_objectid(item_id):
-            raise HTTPException(status_code=400, detail="Invalid item_id format.")
-        deleted_item = database.items.find_one_and_delete({"_id": ObjectId(item_id)})
-        if not deleted_item:
-            logger.warning(f"Failed to delete item with ID {item_id}.")
-            raise HTTPException(status_code=404, detail="Item not found or not deleted.")
-        logger.info(f"Item with ID {item_id} successfully deleted.")
-        deleted_item = convert_objectid_to_str(deleted_item)
-        return deleted_item
-    except pymongo.errors.PyMongoError as e:
-        # Handle any PyMongo errors here
-        logger.critical(f"Error interacting with the database: {str(e)}")
-        raise HTTPException(status_code=500, detail="Error updating password.")
+        document = await items_database.delete_item(object_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="Item not found.")
+        return Response(encode_item_documents(document), media_type="application/json")
+    except HTTPException as http_exception:
+        raise http_exception
     except RateLimitExceeded:
         raise HTTPException(status_code=429, detail="Too many requests.")
-    except HTTPException:
-        # This is to ensure HTTPException is not caught in the generic Exception
-        raise
     except Exception as e:
-        handle_error(e, logger)
+        logger.error(f"Error deleting item: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error.")
+
+'''
+This endpoint is commented out because it only illustrates background tasks.
 
 """
 This module serves as an example of using FastAPI's BackgroundTasks feature.
@@ -0,0 +1,131 @@
+import asyncio
+import time
+
+from app.api.config.admission import AIMDLimit, AdmissionController, AdmissionControlMiddleware, READ, BULK
+
+# Simulated database: 8 connections, 10 ms per query, so at most 800 requests per second
+CONNECTIONS = 8
+QUERY_SECONDS = 0.01
+# Closed-loop clients, far more than the database can serve within their timeout
+CLIENTS = 200
+CLIENT_TIMEOUT = 0.15
+DURATION = 1.5
+
+def database_app():
+    connections = asyncio.Semaphore(CONNECTIONS)
+    async def app(scope, receive, send):
+        async with connections:
+            await asyncio.sleep(QUERY_SECONDS)
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+    return app
+
+async def call(app, method="GET", path="/api/v1/example/products/1"):
+    messages = []
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        messages.append(message)
+    scope = {"type": "http", "method": method, "path": path, "headers": []}
+    await app(scope, receive, send)
+    return messages[0]["status"], dict(messages[0]["headers"])
+
+async def measure_goodput(admission=None):
+    app = database_app()
+    if admission is not None:
+        app = AdmissionControlMiddleware(app, admission)
+    # Requests keep running on the server after their client gave up, as they would behind a real socket
+    good = 0
+    deadline = time.monotonic() + DURATION
+    async def client():
+        nonlocal good
+        while time.monotonic() < deadline:
+            request = asyncio.ensure_future(call(app))
+            done, _ = await asyncio.wait([request], timeout=CLIENT_TIMEOUT)
+            if done and request.result()[0] == 200:
+                good += 1
+            elif done:
+                await asyncio.sleep(0.01)
+    await asyncio.gather(*(client() for _ in range(CLIENTS)))
+    return good / DURATION
+
+def controller(limit=20.0, max_queue=100, queue_timeout=1.0):
+    return AdmissionController(AIMDLimit(limit, 2, 200, target_latency=0.05), max_queue, queue_timeout)
+
+# Under overload, admission control keeps goodput close to capacity while the unprotected app collapses
+def test_goodput_holds_under_overload():
+    capacity = CONNECTIONS / QUERY_SECONDS
+    unprotected = asyncio.run(measure_goodput())
+    shedding = controller(queue_timeout=0.05)
+    protected = asyncio.run(measure_goodput(shedding))
+    assert protected >= 0.6 * capacity
+    assert protected > 3 * unprotected
+    assert shedding.stats()["shed"] > 0
+    assert shedding.stats()["shed_rate"] > 0
+
+# Shed requests get a fast 503 with Retry-After
+def test_shed_response():
+    async def scenario():
+        middleware = AdmissionControlMiddleware(database_app(), controller(limit=2, max_queue=0), retry_after=3)
+        return await asyncio.gather(*(call(middleware) for _ in range(5)))
+    responses = asyncio.run(scenario())
+    statuses = sorted(status for status, _ in responses)
+    assert statuses == [200, 200, 503, 503, 503]
+    assert all(headers[b"retry-after"] == b"3" for status, headers in responses if status == 503)
+
+# When the queue is full, reads evict queued bulk exports
+def test_reads_preempt_bulk_exports():
+    async def scenario():
+        admission = controller(limit=2, max_queue=1)
+        release = asyncio.Event()
+        async def app(scope, receive, send):
+            await release.wait()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+        middleware = AdmissionControlMiddleware(app, admission)
+        running = [asyncio.ensure_future(call(middleware)) for _ in range(2)]
+        await asyncio.sleep(0)
+        export = asyncio.ensure_future(call(middleware, path="/api/v1/example/products/export"))
+        await asyncio.sleep(0)
+        read = asyncio.ensure_future(call(middleware))
+        await asyncio.sleep(0.01)
+        assert export.done() and export.result()[0] == 503
+        release.set()
+        await asyncio.gather(*running)
+        return await read
+    assert asyncio.run(scenario())[0] == 200
+
+# Streams bypass admission and the priority of bulk routes is below reads
+def test_route_classes():
+    middleware = AdmissionControlMiddleware(None, controller())
+    assert middleware.classify("GET", "/api/v1/example/products/stream") == (None, False)
+    assert middleware.classify("GET", "/api/v1/example/metrics/") == (None, False)
+    assert middleware.classify("POST", "/api/v1/example/admin/profile/cpu") == (None, False)
+    assert middleware.classify("GET", "/api/v1/example/products/export") == (BULK, False)
+    assert middleware.classify("GET", "/api/v1/example/products/") == (READ, True)
+
+# A request cancelled while queued gives up its place instead of taking a slot later
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def scenario():
+        admission = controller(limit=1, max_queue=10)
+        assert await admission.acquire(READ)
+        queued = asyncio.ensure_future(admission.acquire(READ))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert admission.stats()["queued"] == 0
+        admission.release(None)
+        return admission.stats()
+    assert asyncio.run(scenario())["inflight"] == 0
+
+# A burst of slow requests cuts the limit once; later slow requests cut it again
+def test_limit_decreases_once_per_round_trip():
+    limit = AIMDLimit(20, 2, 200, target_latency=0.05)
+    for _ in range(20):
+        limit.on_sample(1.0)
+    assert limit.limit == 18
+    # Requests started after the cut
+    time.sleep(0.1)
+    limit.on_sample(0.01)
+    limit.on_sample(0.06)
+    assert round(limit.limit, 4) == round((18 + 1 / 18) * 0.9, 4)
@@ -0,0 +1,74 @@
+import time
+
+from app.api.config import deadlines
+from app.api.config.analytics import CatalogSnapshot
+
+def loaded_snapshot(prices):
+    snapshot = CatalogSnapshot()
+    snapshot.load([[(i + 1, f"Product {i + 1}", "", price) for i, price in enumerate(prices)]])
+    return snapshot
+
+# Aggregates over the columnar snapshot
+def test_aggregates():
+    snapshot = loaded_snapshot([10.0, 20.0, 30.0, 40.0, None])
+    assert snapshot.summary() == {"count": 4, "min": 10.0, "max": 40.0, "mean": 25.0, "std": 11.180339887498949, "total": 100.0}
+    assert snapshot.percentiles([0, 50, 100]) == {"0": 10.0, "50": 25.0, "100": 40.0}
+    assert snapshot.histogram(3) == {"edges": [10.0, 20.0, 30.0, 40.0], "counts": [1, 1, 2]}
+    extremes = snapshot.extremes(1)
+    assert extremes["cheapest"] == [{"id": 1, "name": "Product 1", "price": 10.0}]
+    assert extremes["most_expensive"] == [{"id": 4, "name": "Product 4", "price": 40.0}]
+
+# Product writes are applied incrementally
+def test_incremental_changes():
+    snapshot = loaded_snapshot([10.0, 20.0, 30.0])
+    snapshot.apply("updated", {"id": 1, "name": "Cheaper", "price": 5.0})
+    snapshot.apply("deleted", {"id": 2})
+    snapshot.apply("created", {"id": 9, "name": "New", "description": "", "price": 50.0})
+    assert snapshot.summary()["total"] == 85.0
+    assert snapshot.extremes(1)["cheapest"][0]["name"] == "Cheaper"
+    assert snapshot.stats()["products"] == 3
+
+# Changes committed while the snapshot loads are replayed after the load
+def test_changes_during_load_are_replayed():
+    snapshot = CatalogSnapshot()
+    snapshot._state = "loading"
+    snapshot.apply("updated", {"id": 1, "name": "Product 1", "price": 99.0})
+    snapshot.load([[(1, "Product 1", "", 1.0)]])
+    assert snapshot.summary()["max"] == 99.0
+
+# Aggregates over a million products are vectorized and never touch the database
+def test_aggregates_are_fast():
+    snapshot = CatalogSnapshot()
+    snapshot.load([[(i, "Product", "", float(i % 1000)) for i in range(1000000)]])
+    started = time.perf_counter()
+    for _ in range(10):
+        snapshot.summary()
+    assert (time.perf_counter() - started) / 10 < 0.05
+
+# Past max_age the snapshot is reloaded in the background, keeping the changes applied meanwhile
+def test_reload_after_max_age():
+    rows = [(1, "Product 1", "", 10.0)]
+    snapshot = CatalogSnapshot(max_age=0.05, load_batches=lambda: [list(rows)])
+    assert snapshot.summary()["count"] == 1
+    # Written by another worker
+    rows.append((2, "Product 2", "", 20.0))
+    time.sleep(0.06)
+    snapshot.summary()
+    deadline = time.monotonic() + 5
+    while snapshot.stats()["refreshes"] < 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert snapshot.summary()["total"] == 30.0
+    assert snapshot.stats()["age_seconds"] < 1
+
+# The first load serves every later query, so the deadline of the request starting it does not apply
+def test_first_load_ignores_request_deadline():
+    budgets = []
+    def load_batches():
+        budgets.append(deadlines.remaining())
+        yield [(1, "Product 1", "", 10.0)]
+    snapshot = CatalogSnapshot(load_batches=load_batches)
+    with deadlines.deadline(0.5):
+        assert snapshot.summary()["count"] == 1
+        assert deadlines.remaining() is not None
+    assert budgets == [None]
@@ -0,0 +1,39 @@
+import time
+
+from app.api.config.cache import ResultCache
+
+# A write bumps the generation, so no older entry can be served afterwards
+def test_bump_invalidates_without_scanning():
+    cache = ResultCache(max_bytes=1024, ttl=60)
+    cache.put(("products", "all"), b"[]", cache.generation)
+    assert cache.get(("products", "all")) == b"[]"
+    cache.bump()
+    assert cache.get(("products", "all")) is None
+
+# Results computed before a write are not stored
+def test_stale_result_is_not_stored():
+    cache = ResultCache(max_bytes=1024, ttl=60)
+    generation = cache.generation
+    cache.bump()
+    cache.put("key", b"stale", generation)
+    assert cache.get("key") is None
+
+# The cache is bounded by bytes and evicts the least recently used entries
+def test_byte_bound_evicts_lru():
+    cache = ResultCache(max_bytes=10, ttl=60)
+    cache.put("a", b"aaaa", 0)
+    cache.put("b", b"bbbb", 0)
+    assert cache.get("a") == b"aaaa"
+    cache.put("c", b"cccc", 0)
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa" and cache.get("c") == b"cccc"
+    assert cache.stats()["bytes"] == 8 and cache.stats()["evictions"] == 1
+    cache.put("huge", b"x" * 11, 0)
+    assert cache.get("huge") is None
+
+# Entries expire after the TTL
+def test_ttl_expiry():
+    cache = ResultCache(max_bytes=1024, ttl=0.01)
+    cache.put("key", b"value", 0)
+    time.sleep(0.02)
+    assert cache.get("key") is None
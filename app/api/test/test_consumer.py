@@ -0,0 +1,90 @@
+import json
+
+from app.api.adapters.rabbitmq import InMemoryBroker
+from app.consumer import ProductUpdateConsumer
+
+def publish(broker, *messages):
+    for message in messages:
+        broker.publish(json.dumps(message).encode())
+
+class RecordingApply:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, upserts, deletes):
+        if self.fail:
+            raise RuntimeError("database unavailable")
+        self.batches.append((upserts, deletes))
+        return len(upserts), len(deletes), 0
+
+# Updates to the same product within a batch are merged before being applied
+def test_batch_is_coalesced_and_acked():
+    broker, apply = InMemoryBroker(), RecordingApply()
+    consumer = ProductUpdateConsumer(broker, apply, batch_size=10, batch_delay=0.05)
+    publish(broker,
+            {"op": "upsert", "id": 1, "price": 1.0},
+            {"op": "upsert", "id": 1, "price": 2.0, "name": "One"},
+            {"op": "upsert", "id": 2, "price": 5.0},
+            {"op": "delete", "id": 2},
+            {"op": "delete", "id": 3},
+            {"op": "upsert", "id": 3, "name": "Three", "description": "Back", "price": 3.0},
+            {"op": "rename", "id": 4})
+    assert consumer.run_once(0.1) == 7
+    upserts, deletes = apply.batches[0]
+    assert upserts == [{"id": 1, "price": 2.0, "name": "One"}, {"id": 3, "name": "Three", "description": "Back", "price": 3.0}]
+    assert deletes == [2]
+    assert len(broker.acked) == 7 and broker.unacked == 0
+    stats = consumer.stats()
+    assert stats["coalesced"] == 3 and stats["invalid"] == 1 and stats["batches"] == 1
+
+# Batches close at the size limit, and the rest waits for the next batch
+def test_batch_size_limit():
+    broker, apply = InMemoryBroker(), RecordingApply()
+    consumer = ProductUpdateConsumer(broker, apply, batch_size=2, batch_delay=1)
+    publish(broker, *({"op": "upsert", "id": i, "price": 1.0} for i in range(3)))
+    assert consumer.run_once(0.1) == 2
+    assert consumer.run_once(0.1) == 1
+    assert [len(upserts) for upserts, _ in apply.batches] == [2, 1]
+
+# Nothing is acknowledged when the batch cannot be committed
+def test_failed_batch_is_requeued():
+    broker = InMemoryBroker()
+    consumer = ProductUpdateConsumer(broker, RecordingApply(fail=True), batch_size=10, batch_delay=0.05)
+    publish(broker, {"op": "upsert", "id": 1, "price": 1.0})
+    consumer.run_once(0.1)
+    assert broker.acked == [] and broker.unacked == 0
+    assert consumer.stats()["failed_batches"] == 1
+    assert broker.get(0.1) is not None
+
+# A partial upsert after a delete cannot bring the product back, so the delete is kept
+def test_partial_upsert_after_delete():
+    consumer = ProductUpdateConsumer(InMemoryBroker(), RecordingApply())
+    bodies = [json.dumps(message).encode() for message in (
+        {"op": "delete", "id": 5},
+        {"op": "upsert", "id": 5, "price": 9.0},
+        {"op": "delete", "id": 6},
+        {"op": "upsert", "id": 6, "name": "Six", "description": "D", "price": 6.0},
+        {"op": "upsert", "id": 6, "price": 7.0})]
+    assert consumer.coalesce(bodies) == ([{"id": 6, "name": "Six", "description": "D", "price": 7.0}], [5])
+    assert consumer.stats()["rejected"] == 1
+
+class PoisonApply(RecordingApply):
+    def __call__(self, upserts, deletes):
+        if any(row["id"] == 13 for row in upserts):
+            raise ValueError("constraint violated")
+        return super().__call__(upserts, deletes)
+
+# A failing message is isolated from its batch, requeued, then dead-lettered after max_attempts
+def test_poison_message_is_isolated_and_dead_lettered():
+    broker, apply = InMemoryBroker(), PoisonApply()
+    consumer = ProductUpdateConsumer(broker, apply, batch_size=10, batch_delay=0.05, max_attempts=2)
+    publish(broker, *({"op": "upsert", "id": i, "price": 1.0} for i in range(10, 16)))
+    assert consumer.run_once(0.1) == 6
+    assert sorted(row["id"] for upserts, _ in apply.batches for row in upserts) == [10, 11, 12, 14, 15]
+    assert len(broker.acked) == 5 and broker.unacked == 0 and broker.dead_lettered == []
+
+    assert consumer.run_once(0.1) == 1
+    assert broker.dead_lettered == [json.dumps({"op": "upsert", "id": 13, "price": 1.0}).encode()]
+    assert broker.get(0.05) is None
+    assert consumer.stats()["dead_lettered"] == 1
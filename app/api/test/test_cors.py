@@ -0,0 +1,60 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.config.cors import CORSMiddleware
+
+ORIGIN = "https://shop.example.com"
+
+def make_client(**options):
+    app = FastAPI()
+
+    @app.get('/products/')
+    def products():
+        return []
+
+    settings = dict(allow_origins=[ORIGIN], allow_methods=["GET", "POST", "PATCH"], allow_headers=["Content-Type"],
+                    expose_headers=["Retry-After"], allow_credentials=True, max_age=86400)
+    settings.update(options)
+    return TestClient(CORSMiddleware(app, **settings))
+
+# Preflights are answered by the middleware with the cached policy and a long max age
+def test_preflight():
+    response = make_client().options('/products/', headers={
+        "Origin": ORIGIN, "Access-Control-Request-Method": "PATCH", "Access-Control-Request-Headers": "content-type",
+    })
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+    assert response.headers["access-control-allow-credentials"] == "true"
+    assert response.headers["access-control-allow-methods"] == "GET, PATCH, POST"
+    assert response.headers["access-control-max-age"] == "86400"
+
+# Preflights for an unknown origin, method or header are rejected
+def test_disallowed_preflight():
+    client = make_client()
+    for headers in (
+        {"Origin": "https://evil.example.com", "Access-Control-Request-Method": "GET"},
+        {"Origin": ORIGIN, "Access-Control-Request-Method": "DELETE"},
+        {"Origin": ORIGIN, "Access-Control-Request-Method": "GET", "Access-Control-Request-Headers": "X-Secret"},
+    ):
+        response = client.options('/products/', headers=headers)
+        assert response.status_code == 400
+        assert "access-control-allow-origin" not in response.headers
+
+# Simple requests from allowed origins get the CORS headers; others are passed through untouched
+def test_simple_requests():
+    client = make_client()
+    response = client.get('/products/', headers={"Origin": ORIGIN})
+    assert response.json() == []
+    assert response.headers["access-control-allow-origin"] == ORIGIN
+    assert response.headers["access-control-expose-headers"] == "Retry-After"
+    assert response.headers["vary"] == "Origin"
+    for headers in ({"Origin": "https://evil.example.com"}, {}):
+        response = client.get('/products/', headers=headers)
+        assert response.status_code == 200
+        assert "access-control-allow-origin" not in response.headers
+
+# Without credentials a wildcard origin is answered with '*'
+def test_wildcard_origin():
+    response = make_client(allow_origins=["*"], allow_credentials=False).get('/products/', headers={"Origin": ORIGIN})
+    assert response.headers["access-control-allow-origin"] == "*"
+    assert "vary" not in response.headers
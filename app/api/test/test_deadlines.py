@@ -0,0 +1,82 @@
+import time
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+from app.api.config.deadlines import DeadlineExceeded, DeadlineMiddleware, DeadlineQueuePool, deadline, install_deadlines
+
+# Counts to a billion: runs for minutes unless the statement timeout interrupts it
+SLOW_QUERY = text("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 1000000000) SELECT count(*) FROM c")
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", poolclass=DeadlineQueuePool, pool_size=1, max_overflow=0, pool_timeout=30,
+                           connect_args={"check_same_thread": False})
+    install_deadlines(engine)
+    yield engine
+    engine.dispose()
+
+# A slow statement is interrupted once the budget runs out
+def test_slow_query_is_interrupted(engine):
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        with deadline(0.2), engine.connect() as connection:
+            connection.execute(SLOW_QUERY)
+    assert time.monotonic() - started < 1
+
+# Statements run normally without a deadline, and on a connection that timed out before
+def test_queries_without_deadline(engine):
+    with pytest.raises(DeadlineExceeded):
+        with deadline(0.05), engine.connect() as connection:
+            connection.execute(SLOW_QUERY)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+
+# Waiting for a pooled connection is bounded by the budget, not by pool_timeout
+def test_pool_checkout_respects_deadline(engine):
+    with engine.connect():
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            with deadline(0.1), engine.connect():
+                pass
+        assert time.monotonic() - started < 1
+
+# An enclosing deadline is never extended by an inner one
+def test_inner_deadline_cannot_extend(engine):
+    with pytest.raises(DeadlineExceeded):
+        with deadline(0.1), deadline(10), engine.connect() as connection:
+            connection.execute(SLOW_QUERY)
+
+# Through the middleware, the client header sets the budget and an exhausted one becomes a 504
+def test_endpoint_returns_504(engine):
+    app = FastAPI()
+
+    @app.get('/slow')
+    def slow():
+        try:
+            with engine.connect() as connection:
+                return {"count": connection.execute(SLOW_QUERY).scalar()}
+        except HTTPException as http_exception:
+            raise http_exception
+        except Exception:
+            raise HTTPException(status_code=500, detail="Internal server error.")
+
+    client = TestClient(DeadlineMiddleware(app, default_timeout=10))
+    started = time.monotonic()
+    response = client.get('/slow', headers={"X-Request-Timeout-Ms": "200"})
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Request deadline exceeded."}
+    assert time.monotonic() - started < 1
+
+# Route defaults apply unless the client sends a valid header, which is capped
+def test_budget_resolution():
+    middleware = DeadlineMiddleware(None, default_timeout=10, max_timeout=60)
+    assert middleware.budget("GET", "/api/v1/example/products/", []) == 5
+    assert middleware.budget("POST", "/api/v1/example/products/", []) == 10
+    assert middleware.budget("GET", "/api/v1/example/products/export", []) is None
+    assert middleware.budget("GET", "/api/v1/example/products/", [(b"x-request-timeout-ms", b"250")]) == 0.25
+    assert middleware.budget("GET", "/api/v1/example/products/", [(b"x-request-timeout-ms", b"600000")]) == 60
+    assert middleware.budget("GET", "/api/v1/example/products/", [(b"x-request-timeout-ms", b"soon")]) == 5
+    assert middleware.budget("GET", "/api/v1/example/products/stream", [(b"x-request-timeout-ms", b"250")]) is None
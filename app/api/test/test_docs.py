@@ -0,0 +1,60 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.config import docs
+from app.api.config.docs import mount_docs
+
+def make_app():
+    app = FastAPI(openapi_url=None, docs_url=None, redoc_url=None)
+    calls = []
+
+    @app.get('/products/')
+    def products():
+        return []
+
+    def build_schema():
+        calls.append(1)
+        return app.openapi()
+
+    mount_docs(app, prefix='/api', build_schema=build_schema, title="Example")
+    return app, calls
+
+# The schema is generated once at startup and served with an ETag, gzip and 304 revalidation
+def test_openapi_is_precomputed(tmp_path, monkeypatch):
+    monkeypatch.setattr(docs, "DOCS_STATIC_DIR", tmp_path)
+    app, calls = make_app()
+    with TestClient(app) as client:
+        first = client.get('/api/openapi.json', headers={"Accept-Encoding": "gzip"})
+        assert first.status_code == 200
+        assert first.headers["content-encoding"] == "gzip"
+        assert "/products/" in first.json()["paths"]
+        etag = first.headers["etag"]
+        second = client.get('/api/openapi.json', headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+    assert len(calls) == 1
+
+# Downloaded assets are served locally and cached long; missing ones fall back to the CDN
+def test_docs_assets(tmp_path, monkeypatch):
+    monkeypatch.setattr(docs, "DOCS_STATIC_DIR", tmp_path)
+    (tmp_path / "swagger-ui-bundle.js").write_bytes(b"window.SwaggerUIBundle = function () {};")
+    app, _ = make_app()
+    with TestClient(app) as client:
+        page = client.get('/api/docs').text
+        assert "/api/docs/static/swagger-ui-bundle.js?v=" in page
+        assert "cdn.jsdelivr.net/npm/swagger-ui-dist@3.52.5/swagger-ui.css" in page
+        asset = client.get('/api/docs/static/swagger-ui-bundle.js')
+        assert asset.status_code == 200
+        assert asset.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert client.get('/api/docs/static/swagger-ui.css').status_code == 404
+        assert "fonts.googleapis.com" not in client.get('/api/redoc').text
+
+# A prebuilt schema is served as is, without generating one
+def test_prebuilt_schema(tmp_path, monkeypatch):
+    monkeypatch.setattr(docs, "DOCS_STATIC_DIR", tmp_path)
+    (tmp_path / "openapi.json").write_bytes(b'{"openapi":"3.0.2","paths":{}}')
+    app, calls = make_app()
+    with TestClient(app) as client:
+        assert client.get('/api/openapi.json').content == b'{"openapi":"3.0.2","paths":{}}'
+    assert not calls
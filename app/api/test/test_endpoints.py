@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from app.app import app 
@@ -79,4 +80,37 @@ def test_delete_product(create_temporary_product):
     response = client.delete(f"/api/v1/example/products/{product_id}/")
     assert response.status_code == 200
     data = response.json()
-    assert data["id"] == product_id
\ No newline at end of file
+    assert data["id"] == product_id
+
+# Test for GET /api/v1/example/products?ids= endpoint
+def test_get_products_batch(create_temporary_product):
+    product_id = create_temporary_product.id
+    missing_id = product_id + 1000000
+    response = client.get(f"/api/v1/example/products?ids={missing_id},{product_id}")
+    assert response.status_code == 200
+    data = response.json()
+    assert [product["id"] for product in data["products"]] == [product_id]
+    assert data["missing"] == [missing_id]
+    delete_product_by_id(product_id)
+
+# Test for POST /api/v1/example/products/:batchGet endpoint
+def test_post_products_batch(create_temporary_product):
+    product_id = create_temporary_product.id
+    response = client.post("/api/v1/example/products/:batchGet", json={"ids": [product_id]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["products"][0]["id"] == product_id
+    assert data["missing"] == []
+    delete_product_by_id(product_id)
+
+# Test for POST /api/v1/example/products/import and GET /api/v1/example/products/export endpoints
+def test_import_and_export_products():
+    response = client.post("/api/v1/example/products/import?format=csv", data=b"name,description,price\nImported Product,Imported,1.5\n")
+    assert response.status_code == 201
+    assert response.json() == {"imported": 1}
+    response = client.get("/api/v1/example/products/export?format=ndjson")
+    assert response.status_code == 200
+    exported = [line for line in response.text.splitlines() if '"Imported Product"' in line]
+    assert exported
+    for line in exported:
+        delete_product_by_id(json.loads(line)["id"])
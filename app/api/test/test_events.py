@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+
+from app.api.config.events import ProductEventBroker
+
+SUBSCRIBERS = 10000
+
+# Load test for the product event stream fan-out: 10k subscribers on one worker,
+# events published from a threadpool thread as the write functions do.
+def test_fanout_to_10k_subscribers():
+    async def scenario():
+        broker = ProductEventBroker(buffer_size=16)
+        wildcard = [broker.subscribe() for _ in range(SUBSCRIBERS // 2)]
+        filtered = [broker.subscribe([i % 100]) for i in range(SUBSCRIBERS // 2)]
+        assert broker.stats()["subscribers"] == SUBSCRIBERS
+
+        started = time.perf_counter()
+        publisher = threading.Thread(target=lambda: [broker.publish("updated", {"id": i, "price": 1.0}) for i in range(10)])
+        publisher.start()
+        publisher.join()
+        while broker.stats()["delivered"] < SUBSCRIBERS // 2 * 10 + SUBSCRIBERS // 2 // 100 * 10:
+            await asyncio.sleep(0.001)
+        elapsed = time.perf_counter() - started
+
+        assert all(s.queue.qsize() == 10 for s in wildcard)
+        assert all(s.queue.qsize() == (1 if s.product_ids & set(range(10)) else 0) for s in filtered)
+        assert elapsed < 2.0
+
+    asyncio.run(scenario())
+
+# Slow consumers are dropped once their buffer is full instead of growing memory
+def test_slow_subscriber_is_dropped():
+    async def scenario():
+        broker = ProductEventBroker(buffer_size=2)
+        slow = broker.subscribe()
+        for i in range(3):
+            broker.publish("created", {"id": i})
+        await asyncio.sleep(0.01)
+        assert slow.dropped
+        assert await slow.next_event(0.1) is None
+        assert broker.stats()["subscribers"] == 0
+        assert broker.stats()["dropped_subscribers"] == 1
+
+    asyncio.run(scenario())
+
+# Resets concern every product, so subscribers to a few IDs get them too, once each
+def test_reset_reaches_filtered_subscribers():
+    async def scenario():
+        broker = ProductEventBroker(buffer_size=4)
+        filtered = broker.subscribe([1, 2])
+        other = broker.subscribe([3])
+        wildcard = broker.subscribe()
+        broker.publish("reset", {"id": None, "count": 5})
+        await asyncio.sleep(0.01)
+        for subscription in (filtered, other, wildcard):
+            assert subscription.queue.qsize() == 1
+            assert b"event: reset" in subscription.queue.get_nowait()
+        assert broker.stats()["delivered"] == 3
+
+    asyncio.run(scenario())
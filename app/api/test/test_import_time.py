@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+
+from app.api.config.env import get_settings
+from app.import_time import ROOT, measure, parse_importtime, total_ms
+
+# Subsystems only some routes or failures need, which must not be imported with the app
+LAZY_MODULES = ("motor", "pymongo", "passlib", "jwt", "incidentsBugDSI", "pika", "msgpack", "cbor2")
+
+# The -X importtime output is parsed into one record per module, with its nesting depth
+def test_parse_importtime():
+    records = parse_importtime([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       120 |        120 |     json.decoder",
+        "import time:       300 |        420 |   json",
+        "import time:        80 |        500 | app",
+    ])
+    assert [(record.module, record.depth) for record in records] == [("json.decoder", 2), ("json", 1), ("app", 0)]
+    assert total_ms(records, "app") == 0.5
+
+# A cold import of the app stays within IMPORT_TIME_BUDGET_MS
+def test_cold_import_within_budget():
+    fastest = min(total_ms(measure("app.app"), "app.app") for _ in range(3))
+    assert fastest <= get_settings().IMPORT_TIME_BUDGET_MS
+
+# Auth, incident reporting and the Mongo driver are loaded on first use, not with the app
+def test_optional_subsystems_are_lazy():
+    check = f"import sys, app.app; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=str(ROOT)))
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
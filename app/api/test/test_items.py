@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from bson import ObjectId
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+from app.app import app
+from app.api.config.db import MongoDatabase, MongoUnavailable, mongo_db
+from app.api.config.limiter import limiter
+from app.api.methods.methods import convert_objectid_to_str, encode_item_documents
+
+P = '/api/v1/example'
+
+@pytest.fixture
+def client(monkeypatch):
+    # Local stand-in for MongoDB, shared by every request like the real client
+    monkeypatch.setattr(mongo_db, "_client", AsyncMongoMockClient())
+    monkeypatch.setattr(mongo_db, "_db_name", "items_test")
+    limiter.reset()
+    yield TestClient(app)
+    limiter.reset()
+
+# Items are created, read with projections, patched, replaced and deleted
+def test_item_crud(client):
+    created = client.post(P + '/items/', json={"name": "Pen", "description": "Blue"})
+    assert created.status_code == 201
+    item_id = created.json()["id"]
+    assert client.get(P + f'/items/{item_id}/').json() == {"id": item_id, "name": "Pen", "description": "Blue"}
+    assert client.get(P + f'/items/{item_id}/?fields=name').json() == {"id": item_id, "name": "Pen"}
+    assert client.patch(P + f'/items/{item_id}/', json={"description": "Red"}).json() == {"id": item_id, "name": "Pen", "description": "Red"}
+    assert client.put(P + f'/items/{item_id}/', json={"name": "Pencil", "description": "Grey"}).json()["name"] == "Pencil"
+    assert client.delete(P + f'/items/{item_id}/').json() == {"id": item_id, "name": "Pencil", "description": "Grey"}
+
+# Unknown items, malformed IDs and unknown fields are rejected
+def test_item_errors(client):
+    missing = str(ObjectId())
+    assert client.get(P + f'/items/{missing}/').status_code == 404
+    assert client.delete(P + f'/items/{missing}/').status_code == 404
+    assert client.get(P + '/items/not-an-id/').status_code == 400
+    assert client.get(P + f'/items/{missing}/?fields=price').status_code == 400
+
+# A batch insert is walked back in ID order through keyset pages with a projection
+def test_batch_create_and_pages(client):
+    created = client.post(P + '/items/:batchCreate', json={"items": [{"name": f"I{i}", "description": "D"} for i in range(25)]})
+    assert created.status_code == 201
+    ids = created.json()["ids"]
+    seen, after = [], None
+    while True:
+        page = client.get(P + '/items/', params={"limit": 10, "fields": "name", **({"after": after} if after else {})}).json()
+        seen.extend(page["items"])
+        after = page["next_after"]
+        if after is None:
+            break
+    assert [item["id"] for item in seen] == sorted(ids)
+    assert all(set(item) == {"id", "name"} for item in seen)
+    assert client.post(P + '/items/:batchCreate', json={"items": []}).status_code == 400
+
+# Inserts, updates and deletes run as one bulk write
+def test_bulk_write(client):
+    ids = client.post(P + '/items/:batchCreate', json={"items": [{"name": f"I{i}", "description": "D"} for i in range(3)]}).json()["ids"]
+    result = client.post(P + '/items/:bulkWrite', json={"operations": [
+        {"op": "insert", "name": "New", "description": "D"},
+        {"op": "update", "id": ids[0], "name": "Renamed"},
+        {"op": "delete", "id": ids[1]},
+    ]}).json()
+    assert (result["matched"], result["modified"], result["deleted"]) == (1, 1, 1)
+    names = {item["name"] for item in client.get(P + '/items/').json()["items"]}
+    assert names == {"Renamed", "I2", "New"}
+    assert client.post(P + '/items/:bulkWrite', json={"operations": [{"op": "insert", "name": "Incomplete"}]}).status_code == 400
+    assert client.post(P + '/items/:bulkWrite', json={"operations": [{"op": "delete"}]}).status_code == 400
+
+# IDs are converted by the encoder, without touching the documents
+def test_encoder_leaves_documents_untouched():
+    documents = [{"_id": ObjectId(), "name": "A", "description": "B"} for _ in range(3)]
+    snapshot = [dict(document) for document in documents]
+    body = encode_item_documents(documents)
+    assert documents == snapshot
+    assert json.loads(body) == convert_objectid_to_str([dict(document) for document in documents])
+
+# Without a usable MONGO_CLIENT only the Items routes fail, with 503
+def test_unconfigured_database(client, monkeypatch):
+    with pytest.raises(MongoUnavailable):
+        MongoDatabase("mongodb://[username:password@]host1[:port1]", "items").items
+    monkeypatch.setattr(mongo_db, "_client", None)
+    monkeypatch.setattr(mongo_db, "_uri", None)
+    assert client.get(P + '/items/').status_code == 503
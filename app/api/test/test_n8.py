@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.api.adapters.n8 import N8Webhook, webhook_url
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server = self.server
+        time.sleep(server.delay)
+        status = server.statuses.pop(0) if server.statuses else server.default_status
+        if status == 200:
+            server.batches.append(json.loads(body)["events"])
+            server.peers.add(self.client_address)
+            server.auth.add(self.headers.get("Authorization"))
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+class FakeN8(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), WebhookHandler)
+        self.batches = []
+        self.peers = set()
+        self.auth = set()
+        self.statuses = []
+        self.default_status = 200
+        self.delay = 0
+
+    @property
+    def ids(self):
+        return [event["product"]["id"] for batch in self.batches for event in batch]
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+@pytest.fixture
+def n8():
+    server = FakeN8()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def webhook(n8, tmp_path):
+    webhook = N8Webhook(webhook_url(f"127.0.0.1:{n8.server_address[1]}/", "/webhook/products"), "user", "secret",
+                        batch_size=10, flush_interval=0.05, max_retries=2, retry_backoff=0.01,
+                        spill_path=str(tmp_path / "spill.ndjson"))
+    yield webhook
+    webhook.close()
+
+# Events are sent in batches by size and time, over one kept-alive connection
+def test_batches_over_pooled_connection(n8, webhook):
+    for i in range(25):
+        webhook.publish("updated", {"id": i})
+    wait_until(lambda: len(n8.ids) == 25)
+    assert n8.ids == list(range(25))
+    assert max(len(batch) for batch in n8.batches) == 10
+    assert len(n8.peers) == 1
+    assert n8.auth == {"Basic dXNlcjpzZWNyZXQ="}
+    stats = webhook.stats()
+    assert stats["delivered"] == 25 and stats["pending"] == 0 and stats["max_latency_seconds"] < 1
+
+# Failed calls are retried, then spilled to disk and sent again once N8 answers
+def test_retry_and_spill(n8, webhook):
+    n8.statuses = [503, 500]
+    webhook.publish("created", {"id": 1})
+    wait_until(lambda: n8.ids == [1])
+    assert webhook.stats()["retries"] == 2
+
+    n8.default_status = 503
+    webhook.publish("created", {"id": 2})
+    wait_until(lambda: webhook.stats()["spilled"] == 1)
+    assert webhook.stats()["spill_bytes"] > 0
+
+    n8.default_status = 200
+    webhook.publish("created", {"id": 3})
+    wait_until(lambda: n8.ids == [1, 3, 2])
+    # The drained file is removed right after N8 answered
+    wait_until(lambda: webhook.stats()["spill_bytes"] == 0)
+
+# Rejected batches are dropped; past max_pending the oldest events go to the bounded spill file
+def test_rejected_and_overflow(n8, tmp_path):
+    n8.statuses = [400]
+    n8.delay = 0.5
+    webhook = N8Webhook(f"http://127.0.0.1:{n8.server_address[1]}/hook", batch_size=2, flush_interval=60,
+                        max_pending=3, spill_path=str(tmp_path / "spill.ndjson"), spill_max_bytes=200)
+    webhook.publish("updated", {"id": 0})
+    webhook.publish("updated", {"id": 1})
+    wait_until(lambda: webhook.stats()["pending"] == 0)
+    # While N8 answers the first batch, the queue overflows twice; only the first overflow fits on disk
+    for i in range(2, 8):
+        webhook.publish("updated", {"id": i})
+    stats = webhook.stats()
+    assert (stats["pending"], stats["spilled"], stats["dropped"]) == (2, 2, 2)
+    wait_until(lambda: n8.ids == [6, 7, 2, 3])
+    webhook.close()
+    assert webhook.stats()["rejected"] == 2 and webhook.stats()["spill_bytes"] == 0
+
+# A line cut by a crash is quarantined and the spill files of dead processes are claimed
+def test_quarantine_and_orphans(n8, webhook, tmp_path):
+    good = json.dumps({"events": [{"type": "created", "product": {"id": 1}, "timestamp": time.time()}]})
+    (tmp_path / f"spill.ndjson.{os.getpid()}").write_text(good + '\n{"events": [{"ty')
+    orphan = json.dumps({"events": [{"type": "created", "product": {"id": 2}, "timestamp": time.time()}]})
+    (tmp_path / "spill.ndjson.99999999").write_text(orphan + "\n")
+    (tmp_path / f"spill.ndjson.{os.getppid()}").write_text(orphan + "\n")
+    webhook.publish("created", {"id": 3})
+    wait_until(lambda: sorted(n8.ids) == [1, 2, 3])
+    assert webhook.stats()["quarantined"] == 1
+    assert (tmp_path / "spill.ndjson.quarantine").read_text() == '{"events": [{"ty\n'
+    assert not (tmp_path / "spill.ndjson.99999999").exists()
+    # The spill file of a live process is left to it
+    assert (tmp_path / f"spill.ndjson.{os.getppid()}").exists()
+
+# An unexpected error is logged and the delivery thread keeps going
+def test_thread_survives_errors(n8, webhook, monkeypatch):
+    send = webhook._send
+    calls = []
+    def failing_send(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return send(batch)
+    monkeypatch.setattr(webhook, "_send", failing_send)
+    webhook.publish("created", {"id": 1})
+    wait_until(lambda: webhook.stats()["errors"] == 1)
+    webhook.publish("created", {"id": 2})
+    wait_until(lambda: n8.ids == [2])
@@ -0,0 +1,84 @@
+import msgpack
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import database
+from app.api.config.db import SQLDatabase
+from app.api.config.limiter import limiter
+from app.api.config.shards import ShardRouter
+from app.api.methods.serialization import cbor_available, encode_product_rows_msgpack, negotiate
+from app.api.models.models import Base
+from app.api.routes.routes import router
+
+P = '/api/v1/example'
+MSGPACK = {"Accept": "application/msgpack"}
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    db = SQLDatabase(f"sqlite:///{tmp_path}/products.db")
+    Base.metadata.create_all(db.engine)
+    monkeypatch.setattr(database, "product_shards", ShardRouter([db]))
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(router, prefix=P)
+    limiter.reset()
+    yield TestClient(app)
+    limiter.reset()
+    db.engine.dispose()
+
+# The supported type with the highest q-value wins; JSON is the fallback
+def test_negotiate():
+    assert negotiate(None) == "json"
+    assert negotiate("*/*") == "json"
+    assert negotiate("application/msgpack") == "msgpack"
+    assert negotiate("application/x-msgpack;q=0.9, application/json;q=0.5") == "msgpack"
+    assert negotiate("application/json, application/msgpack") == "json"
+    assert negotiate("application/msgpack;q=0.2, application/cbor") == ("cbor" if cbor_available() else "msgpack")
+    assert negotiate("text/html, application/vnd.msgpack;q=0") == "json"
+
+# The schema encoder packs rows exactly like the list of product dicts
+def test_encode_product_rows_msgpack():
+    rows = [(1, "P1", "D", 1.5), (2, "P2", "Ü", 19.99)]
+    expected = [{"id": i, "name": n, "description": d, "price": p} for i, n, d, p in rows]
+    assert encode_product_rows_msgpack(rows) == msgpack.packb(expected)
+    assert encode_product_rows_msgpack([]) == msgpack.packb([])
+
+# Bodies and responses of product routes follow Content-Type and Accept; errors stay JSON
+def test_product_routes_negotiate(client):
+    created = client.post(P + '/products/', data=msgpack.packb({"name": "P1", "description": "D", "price": 10.25}),
+                          headers={**MSGPACK, "Content-Type": "application/msgpack"})
+    assert created.status_code == 201
+    assert created.headers["content-type"] == "application/msgpack"
+    assert created.headers["vary"] == "Accept"
+    product = msgpack.unpackb(created.content)
+    assert product["name"] == "P1" and product["price"] == 10.25
+
+    patched = client.patch(P + f'/products/{product["id"]}/', data=msgpack.packb({"price": 12.5}),
+                           headers={**MSGPACK, "Content-Type": "application/msgpack"})
+    assert msgpack.unpackb(patched.content)["price"] == 12.5
+
+    as_json = client.get(P + '/products/')
+    as_msgpack = client.get(P + '/products/', headers=MSGPACK)
+    assert as_json.headers["content-type"] == "application/json"
+    assert msgpack.unpackb(as_msgpack.content) == as_json.json() == [{**product, "price": 12.5}]
+
+    batch = client.post(P + '/products/:batchGet', data=msgpack.packb({"ids": [product["id"], 99]}),
+                        headers={**MSGPACK, "Content-Type": "application/msgpack"})
+    assert msgpack.unpackb(batch.content)["missing"] == [99]
+
+    missing = client.get(P + '/products/99/', headers=MSGPACK)
+    assert missing.status_code == 404 and missing.json() == {"detail": "Product not found"}
+
+    invalid = client.post(P + '/products/', data=msgpack.packb({"name": "P2"}),
+                          headers={**MSGPACK, "Content-Type": "application/msgpack"})
+    assert invalid.status_code == 422
+    assert client.post(P + '/products/', data=b"\xc1", headers={"Content-Type": "application/msgpack"}).status_code == 400
+
+# CBOR is negotiated the same way when cbor2 is installed
+def test_cbor(client):
+    cbor2 = pytest.importorskip("cbor2")
+    cbor = {"Accept": "application/cbor", "Content-Type": "application/cbor"}
+    created = client.post(P + '/products/', data=cbor2.dumps({"name": "P1", "description": "D", "price": 1.5}), headers=cbor)
+    assert created.headers["content-type"] == "application/cbor"
+    assert cbor2.loads(client.get(P + '/products/', headers=cbor).content) == [cbor2.loads(created.content)]
@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select, text
+
+from app.api import database
+from app.api.config.db import SQLDatabase
+from app.api.config.shards import ShardRouter
+from app.api.methods.methods import downsample_candles
+from app.api.models.models import Base, PriceHistoryDB, ProductDB, ProductPatch
+from app.price_partitions import month_partitions, reorganize_statement
+
+class Clock(datetime):
+    now_value = datetime(2026, 10, 19, 12, 0)
+
+    @classmethod
+    def utcnow(cls):
+        return cls.now_value
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    db = SQLDatabase(f"sqlite:///{tmp_path}/products.db")
+    Base.metadata.create_all(db.engine)
+    with db.engine.begin() as connection:
+        connection.execute(insert(ProductDB.__table__), [
+            {"id": i, "name": f"P{i}", "description": "D", "price": 10.0} for i in range(1, 4)
+        ])
+    monkeypatch.setattr(database, "product_shards", ShardRouter([db]))
+    monkeypatch.setattr(database, "datetime", Clock)
+    yield db
+    db.engine.dispose()
+
+def set_price(product_id, price, at):
+    Clock.now_value = at
+    database.update_product_in_db(product_id, ProductPatch(price=price))
+
+# Price changes are appended in the update transaction and read back by time range
+def test_history_by_time_range(catalog):
+    start = datetime(2026, 10, 19, 12, 0)
+    for minute, price in enumerate((11.0, 12.0, 9.0, 13.0)):
+        set_price(1, price, start + timedelta(minutes=minute))
+    set_price(2, 50.0, start)
+    database.update_product_in_db(1, ProductPatch(name="Renamed"))
+
+    history = database.get_price_history(1, None, None, 100)
+    assert [price for price, _ in history] == [11.0, 12.0, 9.0, 13.0]
+    assert [price for price, _ in database.get_price_history(1, start + timedelta(minutes=1), start + timedelta(minutes=3), 100)] == [12.0, 9.0]
+    assert len(database.get_price_history(1, None, None, 2)) == 2
+
+# Batched updates, such as write-behind flushes and consumer batches, are recorded too
+def test_batch_updates_are_recorded(catalog):
+    database.apply_product_changes([{"id": 1, "price": 20.0}, {"id": 2, "name": "Renamed"}, {"id": 3, "price": 30.0}], [])
+    assert [price for price, _ in database.get_price_history(1, None, None, 10)] == [20.0]
+    assert database.get_price_history(2, None, None, 10) == []
+    assert [price for price, _ in database.get_price_history(3, None, None, 10)] == [30.0]
+
+# Daily candles are maintained on write, and merge into weekly and monthly ones
+def test_daily_candles(catalog):
+    monday = datetime(2026, 10, 19, 8, 0)
+    for at, price in ((monday, 11.0), (monday + timedelta(hours=1), 15.0), (monday + timedelta(hours=2), 8.0),
+                      (monday + timedelta(hours=3), 12.0), (monday + timedelta(days=1), 14.0), (monday + timedelta(days=14), 20.0)):
+        set_price(1, price, at)
+    daily = database.get_daily_price_candles(1, None, None)
+    assert daily == [
+        (date(2026, 10, 19), 11.0, 15.0, 8.0, 12.0, 4),
+        (date(2026, 10, 20), 14.0, 14.0, 14.0, 14.0, 1),
+        (date(2026, 11, 2), 20.0, 20.0, 20.0, 20.0, 1),
+    ]
+    assert database.get_daily_price_candles(1, date(2026, 10, 20), date(2026, 10, 31)) == daily[1:2]
+    assert downsample_candles(daily, "week") == [
+        {"start": date(2026, 10, 19), "open": 11.0, "high": 15.0, "low": 8.0, "close": 14.0, "changes": 5},
+        {"start": date(2026, 11, 2), "open": 20.0, "high": 20.0, "low": 20.0, "close": 20.0, "changes": 1},
+    ]
+    assert [candle["start"] for candle in downsample_candles(daily, "month")] == [date(2026, 10, 1), date(2026, 11, 1)]
+
+# Time-range reads of one product use the (product_id, changed_at) index instead of scanning the history
+def test_history_query_uses_index(catalog):
+    table = PriceHistoryDB.__table__
+    query = select(table.c.price, table.c.changed_at).where(table.c.product_id == 1, table.c.changed_at >= datetime(2026, 1, 1))
+    compiled = query.compile(catalog.engine, compile_kwargs={"literal_binds": True})
+    with catalog.engine.connect() as connection:
+        plan = " ".join(str(row[-1]) for row in connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")))
+    assert "ix_price_history_product_time" in plan
+
+# Monthly partitions are split out of pmax only where missing
+def test_partition_maintenance_statement():
+    wanted = month_partitions(date(2026, 11, 15), 2)
+    assert wanted == [("p202611", date(2026, 12, 1)), ("p202612", date(2027, 1, 1)), ("p202701", date(2027, 2, 1))]
+    assert reorganize_statement(["p202610", "p202611", "pmax"], wanted) == (
+        "ALTER TABLE product_price_history REORGANIZE PARTITION pmax INTO "
+        "(PARTITION p202612 VALUES LESS THAN ('2027-01-01'), PARTITION p202701 VALUES LESS THAN ('2027-02-01'), "
+        "PARTITION pmax VALUES LESS THAN (MAXVALUE))"
+    )
+    assert reorganize_statement(["p202611", "p202612", "p202701", "pmax"], wanted) is None
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from slowapi import _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+
+from app.api.auth.auth import auth_handler
+from app.api.config.limiter import limiter
+from app.api.config.profiling import ProfilerBusy, SamplingProfiler, memory_tracer
+from app.api.routes.admin import admin_router
+
+# Allocations the memory diff must find, kept alive until the test ends
+retained = []
+
+@pytest.fixture
+def client():
+    # The admin routes are off by default, so they are served from an app of their own
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+    app.include_router(admin_router)
+    limiter.reset()
+    yield TestClient(app)
+    memory_tracer.stop()
+    retained.clear()
+    limiter.reset()
+
+def admin():
+    return {"Authorization": f"Bearer {auth_handler.create_token({'role': 'admin'})}"}
+
+def spin_until(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+# Only users with the admin role may profile
+def test_admin_role_required(client):
+    assert client.get('/admin/profile/memory').status_code == 403
+    user = {"Authorization": f"Bearer {auth_handler.create_token({'role': 'user'})}"}
+    assert client.get('/admin/profile/memory', headers=user).status_code == 403
+    assert client.get('/admin/profile/memory', headers=admin()).json()["tracing"] is False
+
+# A busy thread shows up in the collapsed stacks, under its thread name
+def test_cpu_profile(client):
+    stop = threading.Event()
+    worker = threading.Thread(target=spin_until, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        response = client.post('/admin/profile/cpu', params={"seconds": 0.3, "interval_ms": 1}, headers=admin())
+    finally:
+        stop.set()
+        worker.join()
+    assert response.status_code == 200
+    assert int(response.headers["X-Profile-Samples"]) > 10
+    lines = response.text.splitlines()
+    spinner = [line for line in lines if line.startswith("spinner;")]
+    assert spinner and "test_profiling:spin_until" in spinner[0]
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert client.post('/admin/profile/cpu', params={"seconds": 3600}, headers=admin()).status_code == 422
+
+# Only one CPU profile runs at a time
+def test_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    running = threading.Thread(target=profiler.profile, args=(0.3, 0.01))
+    running.start()
+    time.sleep(0.05)
+    with pytest.raises(ProfilerBusy):
+        profiler.profile(0.1, 0.01)
+    running.join()
+    assert profiler.profiles == 1
+
+# Allocations made between two snapshots lead their diff
+def test_memory_snapshot_diff(client):
+    assert client.post('/admin/profile/memory/snapshots', headers=admin()).status_code == 409
+    assert client.post('/admin/profile/memory/start', headers=admin()).json()["tracing"] is True
+    first = client.post('/admin/profile/memory/snapshots', headers=admin()).json()
+    retained.extend(bytearray(1024) for _ in range(2000))
+    diff = client.get('/admin/profile/memory/diff', params={"from": first["id"]}, headers=admin()).json()
+    assert diff["to_id"] == first["id"] + 1
+    assert diff["size_diff"] > 2000 * 1024
+    assert "test_profiling.py" in diff["top"][0]["location"]
+    assert diff["top"][0]["count_diff"] >= 2000
+    assert client.get('/admin/profile/memory/diff', params={"from": 999}, headers=admin()).status_code == 404
+    assert client.post('/admin/profile/memory/stop', headers=admin()).json()["tracing"] is False
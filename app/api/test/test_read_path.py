@@ -0,0 +1,41 @@
+import json
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.api import database
+from app.api.config.shards import ShardRouter
+from app.api.methods.methods import encode_product_rows
+from app.api.models.models import Base, ProductDB
+
+ROWS = 100000
+
+@pytest.fixture
+def sqlite_catalog(monkeypatch):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(insert(ProductDB.__table__), [
+            {"name": f"Product {i}", "description": f"Description of product {i}", "price": i * 0.25} for i in range(ROWS)
+        ])
+    monkeypatch.setattr(database, "product_shards", ShardRouter([SimpleNamespace(engine=engine, SessionLocal=sessionmaker(bind=engine))]))
+    return engine
+
+def peak_bytes(fn):
+    fn()  # Warm up caches, so only the read itself is measured
+    tracemalloc.start()
+    try:
+        body = fn()
+        return tracemalloc.get_traced_memory()[1], body
+    finally:
+        tracemalloc.stop()
+
+# The Core read path serves the same body with a fraction of the ORM path's peak memory
+def test_core_read_path_peak_memory(sqlite_catalog):
+    orm_peak, orm_body = peak_bytes(lambda: json.dumps([product.as_dict() for product in database.get_all_products()]).encode())
+    core_peak, core_body = peak_bytes(lambda: encode_product_rows(database.get_all_product_rows()))
+    assert json.loads(core_body) == json.loads(orm_body)
+    assert core_peak < orm_peak / 2
@@ -0,0 +1,190 @@
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import database
+from app.api.config.db import SQLDatabase
+from app.api.config.limiter import limiter
+from app.api.config.replica import ProductReplica, ReplicaMiddleware, parse_sse
+from app.api.config.shards import ShardRouter
+from app.api.routes.routes import router
+
+P = '/api/v1/example'
+
+class PrimaryHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, content):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == P + '/products/export':
+            body = "".join(json.dumps(product) + "\n" for _, product in sorted(self.server.products.items())).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path == P + '/products/stream':
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            while not self.server.closing:
+                try:
+                    frame = self.server.events.get(timeout=0.1)
+                except queue.Empty:
+                    frame = b": keepalive\n\n"
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(frame), frame))
+                self.wfile.flush()
+        else:
+            self.server.received.append(("GET", self.path, None, {name.lower(): value for name, value in self.headers.items()}))
+            self.send_json(200, {"served_by": "primary"})
+
+    def do_PATCH(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.received.append(("PATCH", self.path, json.loads(body), {name.lower(): value for name, value in self.headers.items()}))
+        self.send_json(200, {"served_by": "primary"})
+
+class FakePrimary(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), PrimaryHandler)
+        self.products = {i: {"id": i, "name": f"P{i}", "description": "D", "price": float(i)} for i in (1, 2)}
+        self.events = queue.Queue()
+        self.received = []
+        self.closing = False
+
+    def publish(self, event_type, product):
+        data = json.dumps({"type": event_type, "product": product, "timestamp": time.time()})
+        self.events.put(f"id: 1\nevent: {event_type}\ndata: {data}\n\n".encode())
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+@pytest.fixture
+def primary():
+    server = FakePrimary()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.closing = True
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def replica(primary, tmp_path, monkeypatch):
+    db = SQLDatabase(f"sqlite:///{tmp_path}/replica.db")
+    monkeypatch.setattr(database, "product_shards", ShardRouter([db]))
+    replica = ProductReplica(f"http://127.0.0.1:{primary.server_address[1]}", P, max_staleness=2, retry_seconds=0.05,
+                             complete_stream=True)
+    replica.start()
+    wait_until(replica.fresh)
+    yield replica
+    replica.close()
+    db.engine.dispose()
+
+def local_product(product_id):
+    product = database.get_product_by_id(product_id)
+    return None if product is None else product.as_dict()
+
+# The copy is loaded from the export, then follows the stream; a reset reloads it
+def test_bootstrap_and_follow(primary, replica):
+    assert local_product(1) == primary.products[1]
+    primary.publish("updated", {**primary.products[1], "price": 99.0})
+    primary.publish("deleted", primary.products[2])
+    primary.publish("created", {"id": 3, "name": "P3", "description": "D", "price": 3.0})
+    wait_until(lambda: replica.events_applied == 3)
+    assert local_product(1)["price"] == 99.0
+    assert local_product(2) is None
+    assert local_product(3)["name"] == "P3"
+
+    primary.products = {4: {"id": 4, "name": "P4", "description": "D", "price": 4.0}}
+    primary.publish("reset", {"id": None, "count": 1})
+    wait_until(lambda: replica.bootstraps == 2)
+    assert [product.id for product in database.get_all_products()] == [4]
+    stats = replica.stats()
+    assert stats["fresh"] and stats["snapshot_products"] == 1 and stats["last_event_lag_seconds"] is not None
+
+# A burst of resets, as a bulk import sends, is one reload once the stream goes quiet
+def test_resets_are_coalesced(primary, replica):
+    primary.products[3] = {"id": 3, "name": "P3", "description": "D", "price": 3.0}
+    for _ in range(50):
+        primary.publish("reset", {"id": None, "count": 1})
+    wait_until(lambda: local_product(3) is not None)
+    time.sleep(0.3)
+    assert replica.bootstraps == 2
+
+# Reads are served locally while fresh; writes, price history and stale reads go to the primary
+def test_reads_local_writes_forwarded(primary, replica):
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(router, prefix=P)
+    app.add_middleware(ReplicaMiddleware, replica=replica)
+    client = TestClient(app)
+    limiter.reset()
+
+    local = client.get(P + '/products/1/')
+    assert local.json()["name"] == "P1"
+    assert float(local.headers["x-replica-staleness"]) <= 2
+    assert "x-served-by" not in local.headers
+
+    forwarded = client.patch(P + '/products/1/', json={"price": 5.0})
+    assert forwarded.headers["x-served-by"] == "primary"
+    method, path, body, headers = primary.received[-1]
+    assert (method, path, body) == ("PATCH", P + '/products/1/', {"price": 5.0})
+    assert headers["x-forwarded-for"] == "testclient"
+
+    assert client.get(P + '/products/1/prices?limit=5').headers["x-served-by"] == "primary"
+    assert primary.received[-1][1] == P + '/products/1/prices?limit=5'
+
+    replica.max_staleness = -1
+    assert client.get(P + '/products/1/').json() == {"served_by": "primary"}
+    assert replica.stats()["forwarded"] == 3
+    limiter.reset()
+
+# Unless the stream carries every write, staleness counts from the last full reload, which catches unstreamed writes
+def test_staleness_from_reloads(primary, tmp_path, monkeypatch):
+    db = SQLDatabase(f"sqlite:///{tmp_path}/replica.db")
+    monkeypatch.setattr(database, "product_shards", ShardRouter([db]))
+    url = f"http://127.0.0.1:{primary.server_address[1]}"
+    replica = ProductReplica(url, P, max_staleness=0.5, resync_seconds=0.2, retry_seconds=0.05)
+    replica.start()
+    wait_until(replica.fresh)
+    primary.products[3] = {"id": 3, "name": "P3", "description": "D", "price": 3.0}
+    wait_until(lambda: local_product(3) is not None)
+    assert replica.fresh() and replica.staleness() < 0.5
+    replica.close()
+
+    # Keepalives alone do not keep the copy fresh
+    replica = ProductReplica(url, P, max_staleness=0.5, retry_seconds=0.05)
+    replica.start()
+    wait_until(replica.fresh)
+    wait_until(lambda: not replica.fresh())
+    assert replica.bootstraps == 1
+    replica.close()
+    db.engine.dispose()
+
+# Events and comments of a Server-Sent Events stream; other fields are ignored
+def test_parse_sse():
+    lines = [b"retry: 3000", b"", b": keepalive", b"", b"id: 7", b"event: updated", b'data: {"a": 1}', b""]
+    assert list(parse_sse(lines)) == [(None, None), ("updated", '{"a": 1}')]
@@ -0,0 +1,146 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import insert, select
+
+from app.api import database
+from app.api.config.db import SQLDatabase
+from app.api.config.deadlines import DeadlineExceeded, deadline
+from app.api.config.shards import ReservedIdError, ShardRouter
+from app.api.models.models import Base, ProductCreate, ProductDB, ProductPatch
+
+SHARDS = 3
+
+@pytest.fixture(params=["hash", "range"])
+def shards(request, tmp_path, monkeypatch):
+    databases = [SQLDatabase(f"sqlite:///{tmp_path}/shard{index}.db") for index in range(SHARDS)]
+    for shard in databases:
+        Base.metadata.create_all(shard.engine)
+    router = ShardRouter(databases, request.param, range_size=1000000, id_block_size=10)
+    monkeypatch.setattr(database, "product_shards", router)
+    yield router
+    for shard in databases:
+        shard.engine.dispose()
+
+def stored_ids(shard):
+    with shard.engine.connect() as connection:
+        return set(connection.execute(select(ProductDB.id)).scalars())
+
+def create(count, price=1.0):
+    return [database.create_product_in_db(ProductCreate(name=f"P{i}", description="D", price=price + i)).id for i in range(count)]
+
+# New products are spread over every shard, each stored on the shard its ID maps to
+def test_products_are_placed_by_id(shards):
+    ids = create(30)
+    assert len(set(ids)) == 30
+    for index, shard in enumerate(shards.shards):
+        assert stored_ids(shard) == {product_id for product_id in ids if shards.index_of(product_id) == index}
+        assert stored_ids(shard)
+
+# Single-ID reads and writes go to the owning shard
+def test_single_id_crud(shards):
+    product_id = create(5)[3]
+    assert database.get_product_by_id(product_id).name == "P3"
+    assert database.update_product_in_db(product_id, ProductPatch(price=99.0)).price == 99.0
+    assert database.get_product_by_id(product_id).price == 99.0
+    assert database.delete_product_by_id(product_id).id == product_id
+    assert database.get_product_by_id(product_id) is None
+
+# Lists and multi-gets gather every shard and come back ordered by ID
+def test_scatter_gather(shards):
+    ids = create(30)
+    rows = database.get_all_product_rows()
+    assert [row[0] for row in rows] == sorted(ids)
+    assert [product.id for product in database.get_all_products()] == sorted(ids)
+    products, missing = database.get_products_by_ids([ids[7], 999999999, ids[2]])
+    assert [product.id for product in products] == [ids[7], ids[2]]
+    assert missing == [999999999]
+    batches = list(database.iter_product_batches(batch_size=7))
+    assert [len(batch) for batch in batches] == [7, 7, 7, 7, 2]
+    assert [row[0] for batch in batches for row in batch] == sorted(ids)
+
+# Keyset pages merged across shards walk the whole filtered catalog in order
+def test_pagination_with_filter(shards):
+    ids = create(40)
+    expected = sorted(product_id for product_id in ids if 10 <= database.get_product_by_id(product_id).price <= 30)
+    seen, after = [], None
+    while True:
+        page = database.get_products_page(after, 6, min_price=10, max_price=30)
+        seen.extend(row[0] for row in page)
+        if len(page) < 6:
+            break
+        after = page[-1][0]
+    assert seen == expected
+
+# Bulk inserts and consumer batches are split by shard
+def test_bulk_writes(shards):
+    assert database.bulk_insert_products([{"name": f"B{i}", "description": "D", "price": 2.0} for i in range(20)]) == 20
+    ids = [row[0] for row in database.get_all_product_rows()]
+    assert len(ids) == 20
+    upserted, deleted, rejected = database.apply_product_changes(
+        [{"id": ids[0], "price": 5.0}, {"id": ids[1], "name": "Renamed"}, {"id": 999, "price": 1.0}],
+        [ids[2], ids[3]],
+    )
+    assert (upserted, deleted, rejected) == (2, 2, 1)
+    assert database.get_product_by_id(ids[0]).price == 5.0
+    assert database.get_product_by_id(ids[1]).name == "Renamed"
+    assert len(database.get_all_product_rows()) == 18
+
+# Workers sharing the shards reserve distinct ID blocks
+def test_id_blocks_are_distinct_across_workers(shards):
+    other_worker = ShardRouter(shards.shards, shards.strategy, shards.range_size, id_block_size=10)
+    ids = [shards.ids.next_id(1) for _ in range(25)] + [other_worker.ids.next_id(1) for _ in range(25)]
+    assert len(set(ids)) == 50
+    assert all(shards.index_of(product_id) == 1 for product_id in ids)
+
+# Generated IDs start past the rows already on a shard, and explicit IDs stay out of the generated ones
+def test_generated_ids_avoid_existing_and_explicit_ids(shards):
+    migrated = shards.compose_id(1, 57)
+    with shards.shards[1].engine.begin() as connection:
+        connection.execute(insert(ProductDB.__table__), [{"id": migrated, "name": "Old", "description": "D", "price": 1.0}])
+    assert shards.sequence_of(shards.ids.next_id(1)) == 60
+
+    with pytest.raises(ReservedIdError):
+        database.bulk_insert_products([{"id": shards.compose_id(1, 65), "name": "X", "description": "D", "price": 1.0}])
+    explicit = shards.compose_id(1, 123)
+    database.bulk_insert_products([{"id": explicit, "name": "Imported", "description": "D", "price": 1.0},
+                                   {"name": "Generated", "description": "D", "price": 1.0}])
+    generated = [shards.ids.next_id(1) for _ in range(30)]
+    assert explicit not in generated
+    assert database.apply_product_changes([{"id": shards.compose_id(2, 500), "name": "New", "description": "D", "price": 1.0}], []) == (1, 0, 0)
+    assert shards.sequence_of(shards.ids.next_id(2)) == 510
+    assert database.create_product_in_db(ProductCreate(name="After", description="D", price=1.0)).id not in (migrated, explicit)
+
+# Scattered queries keep the request deadline of the caller
+def test_scatter_keeps_deadline(shards):
+    with pytest.raises(DeadlineExceeded):
+        with deadline(0):
+            database.get_all_product_rows()
+
+# Concurrent requests scatter in parallel, beyond one query per shard for the whole process
+def test_concurrent_scatters_are_not_serialized(shards):
+    def query(index, shard):
+        time.sleep(0.2)
+        return index
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=4) as requests:
+        results = list(requests.map(lambda _: shards.scatter(query), range(4)))
+    assert results == [list(range(SHARDS))] * 4
+    assert time.monotonic() - started < 0.6
+
+# A failed shard is reported once the calls on the other shards have finished
+def test_scatter_waits_for_every_call(shards):
+    finished = threading.Event()
+
+    def query(index, shard):
+        if index == 0:
+            raise RuntimeError("shard 0 is down")
+        time.sleep(0.1)
+        finished.set()
+
+    with pytest.raises(RuntimeError, match="shard 0"):
+        shards.scatter(query)
+    assert finished.is_set()
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from app.api.config.deadlines import DeadlineExceeded, deadline, remaining
+from app.api.config.singleflight import SingleFlight, SingleFlightTimeout
+
+CALLERS = 50
+
+def run_concurrently(group, key, fn, timeout=None):
+    results, errors = [], []
+    def call():
+        try:
+            results.append(group.do(key, fn, timeout))
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=call) for _ in range(CALLERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+# Concurrent identical reads share one call and all receive its result
+def test_concurrent_calls_are_collapsed():
+    group = SingleFlight()
+    calls = []
+    def slow_query():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"id": 1}
+    results, errors = run_concurrently(group, ("product", 1), slow_query)
+    assert not errors
+    assert len(calls) == 1
+    assert results == [{"id": 1}] * CALLERS
+    assert group.stats()["collapsed"] == CALLERS - 1
+
+# Every coalesced caller receives the error raised by the shared call
+def test_errors_are_propagated():
+    group = SingleFlight()
+    def failing_query():
+        time.sleep(0.2)
+        raise RuntimeError("database unavailable")
+    results, errors = run_concurrently(group, ("products", "all"), failing_query)
+    assert not results
+    assert len(errors) == CALLERS
+    assert all(isinstance(e, RuntimeError) for e in errors)
+    assert group.stats()["errors"] == 1
+
+# Coalesced callers stop waiting after their timeout
+def test_followers_time_out():
+    group = SingleFlight()
+    leader = threading.Thread(target=group.do, args=("slow", lambda: time.sleep(0.5)))
+    leader.start()
+    time.sleep(0.05)
+    with pytest.raises(SingleFlightTimeout):
+        group.do("slow", lambda: None, timeout=0.05)
+    leader.join()
+    assert group.stats()["timeouts"] == 1
+
+# A leader running out of its own deadline does not fail the followers that have time left
+def test_leader_deadline_is_not_shared():
+    group = SingleFlight()
+    def query():
+        time.sleep(0.2)
+        if remaining() is not None and remaining() <= 0:
+            raise DeadlineExceeded()
+        return "rows"
+    def impatient_leader():
+        with deadline(0.05):
+            with pytest.raises(DeadlineExceeded):
+                group.do("key", query)
+    leader = threading.Thread(target=impatient_leader)
+    leader.start()
+    time.sleep(0.05)
+    results, errors = run_concurrently(group, "key", query)
+    leader.join()
+    assert not errors and results == ["rows"] * CALLERS
+    stats = group.stats()
+    assert stats["leaders"] == 2 and stats["retries"] == CALLERS
+
+# A write detaches the reads in flight before it bumps the cache generation, so a reader
+# that sees the new generation cannot join a read started before the commit
+def test_write_detaches_reads_before_bumping_the_cache(monkeypatch):
+    from app.api import database
+    group = SingleFlight()
+    monkeypatch.setattr(database, "product_reads", group)
+    started, release = threading.Event(), threading.Event()
+    reader = threading.Thread(target=group.do, args=(("products", "all"), lambda: started.set() or release.wait()))
+    reader.start()
+    started.wait()
+    in_flight_at_bump = []
+    monkeypatch.setattr(database.query_cache, "bump", lambda: in_flight_at_bump.append(group.stats()["in_flight"]))
+    database._notify_write("updated", {"id": 1, "name": "P1", "description": "D", "price": 1.0})
+    release.set()
+    reader.join()
+    assert in_flight_at_bump == [0]
@@ -0,0 +1,90 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+
+from app.api import database
+from app.api.config.db import SQLDatabase
+from app.api.config.limiter import limiter
+from app.api.config.purger import ProductPurger
+from app.api.config.shards import ShardRouter
+from app.api.models.models import Base, ProductDB
+from app.api.routes.routes import router
+
+P = '/api/v1/example'
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    db = SQLDatabase(f"sqlite:///{tmp_path}/products.db")
+    Base.metadata.create_all(db.engine)
+    monkeypatch.setattr(database, "product_shards", ShardRouter([db]))
+    monkeypatch.setattr(database, "SOFT_DELETE_ENABLED", True)
+    database.bulk_insert_products([{"id": i, "name": f"P{i}", "description": "D", "price": float(i)} for i in range(1, 11)])
+    yield db
+    db.engine.dispose()
+
+def stored_rows(db):
+    with db.engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(ProductDB.__table__)).scalar()
+
+# A soft delete only marks the row; reads skip it until the purger removes it
+def test_soft_delete_and_purge(db):
+    assert database.delete_product_by_id(3).as_dict() == {"id": 3, "name": "P3", "description": "D", "price": 3.0}
+    assert database.delete_product_by_id(3) is None
+    assert database.get_product_by_id(3) is None
+    assert 3 not in [row[0] for row in database.get_all_product_rows()]
+    assert [row[0] for row in database.get_products_page(2, 2)] == [4, 5]
+    assert database.get_products_by_ids([3, 4])[1] == [3]
+    assert stored_rows(db) == 10
+
+    assert ProductPurger(True, retention=3600, interval=1, batch_size=2, pause=0).purge() == 0
+    database.delete_products_by_filter(min_price=8)
+    purger = ProductPurger(True, retention=0, interval=1, batch_size=2, pause=0)
+    assert purger.purge() == 4
+    assert stored_rows(db) == 6
+    assert purger.stats()["purged"] == 4 and purger.stats()["passes"] == 1
+
+# A full upsert of a product deleted but not purged yet creates it again
+def test_upsert_revives_deleted_product(db):
+    database.delete_product_by_id(5)
+    assert database.apply_product_changes([{"id": 5, "price": 1.0}], []) == (0, 0, 1)
+    assert database.apply_product_changes([{"id": 5, "name": "New", "description": "D", "price": 1.0}], [2]) == (1, 1, 0)
+    assert database.get_product_by_id(5).name == "New"
+    assert database.get_product_by_id(2) is None
+
+# Only products that were live are announced as deleted, in soft delete mode and not
+@pytest.mark.parametrize("soft_delete", [True, False])
+def test_only_live_deletes_are_announced(db, monkeypatch, soft_delete):
+    monkeypatch.setattr(database, "SOFT_DELETE_ENABLED", soft_delete)
+    database.delete_product_by_id(2)
+    announced = []
+    monkeypatch.setattr(database, "_notify_bulk_write", lambda event_type, products: announced.extend(
+        product["id"] for product in products if event_type == "deleted"))
+    assert database.apply_product_changes([], [1, 2, 99]) == (0, 1, 0)
+    assert announced == [1]
+
+# Delete by filter, in soft delete mode and not
+def test_delete_by_filter_route(db, monkeypatch):
+    app = FastAPI()
+    app.state.limiter = limiter
+    app.include_router(router, prefix=P)
+    client = TestClient(app)
+    limiter.reset()
+
+    assert client.post(P + '/products/:batchDelete', json={}).status_code == 400
+    assert client.post(P + '/products/:batchDelete', json={"name_prefix": ""}).status_code == 400
+    assert client.post(P + '/products/:batchDelete', json={"ids": [], "min_price": 0}).status_code == 400
+    with pytest.raises(ValueError):
+        database.delete_products_by_filter(name_prefix="")
+    # The route allows 5 calls per minute
+    limiter.reset()
+    assert client.post(P + '/products/:batchDelete', json={"min_price": 5, "max_price": 1}).status_code == 400
+    response = client.post(P + '/products/:batchDelete', json={"name_prefix": "P1", "max_price": 5})
+    assert response.json() == {"deleted": 1}
+    assert stored_rows(db) == 10
+
+    monkeypatch.setattr(database, "SOFT_DELETE_ENABLED", False)
+    assert client.post(P + '/products/:batchDelete', json={"ids": [1, 2, 3, 4], "min_price": 2}).json() == {"deleted": 3}
+    assert stored_rows(db) == 7
+    assert [product["id"] for product in client.get(P + '/products/').json()] == [5, 6, 7, 8, 9, 10]
+    limiter.reset()
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+from sqlalchemy import event, insert
+
+from app.api import database
+from app.api.config.db import SQLDatabase
+from app.api.config.shards import ShardRouter
+from app.api.config.write_behind import PriceWriteBehind, price_write_behind
+from app.api.models.models import Base, ProductDB, ProductPatch
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch):
+    db = SQLDatabase(f"sqlite:///{tmp_path}/products.db")
+    Base.metadata.create_all(db.engine)
+    with db.engine.begin() as connection:
+        connection.execute(insert(ProductDB.__table__), [
+            {"id": i, "name": f"P{i}", "description": "D", "price": 1.0} for i in range(1, 11)
+        ])
+    monkeypatch.setattr(database, "product_shards", ShardRouter([db]))
+    # A long interval, so the test decides when the buffer is flushed
+    monkeypatch.setattr(price_write_behind, "enabled", True)
+    monkeypatch.setattr(price_write_behind, "flush_interval", 60)
+    yield db
+    price_write_behind.close()
+    db.engine.dispose()
+
+def committed_price(db, product_id):
+    with db.engine.connect() as connection:
+        return connection.execute(ProductDB.__table__.select().where(ProductDB.id == product_id)).one().price
+
+# Updates of the same product are coalesced, and the latest price is written
+def test_coalesces_updates_per_product():
+    batches = []
+    buffer = PriceWriteBehind(True, 60, 100, apply_batch=lambda upserts, deletes: batches.append(upserts))
+    for price in (1.0, 2.0, 3.0):
+        buffer.put(7, price)
+    buffer.put(8, 5.0)
+    assert buffer.flush() == 2
+    assert batches == [[{"id": 7, "price": 3.0}, {"id": 8, "price": 5.0}]]
+    assert buffer.stats()["coalesced"] == 2
+    buffer.close()
+
+# Reaching the batch size flushes without waiting for the interval
+def test_flushes_on_batch_size():
+    flushed = threading.Event()
+    buffer = PriceWriteBehind(True, 60, 3, apply_batch=lambda upserts, deletes: flushed.set())
+    for product_id in range(3):
+        buffer.put(product_id, 1.0)
+    assert flushed.wait(5)
+    buffer.close()
+
+# A failed flush keeps its prices buffered, without overwriting newer ones
+def test_failed_flush_is_retried():
+    calls = []
+    def apply_batch(upserts, deletes):
+        calls.append(upserts)
+        if len(calls) == 1:
+            buffer.put(1, 9.0)
+            raise RuntimeError("database unavailable")
+    buffer = PriceWriteBehind(True, 60, 100, apply_batch=apply_batch)
+    buffer.put(1, 2.0)
+    buffer.put(2, 3.0)
+    assert buffer.flush() == 0
+    assert buffer.get(1) == 9.0 and buffer.get(2) == 3.0
+    assert buffer.flush() == 2
+    assert calls[1] == [{"id": 1, "price": 9.0}, {"id": 2, "price": 3.0}]
+    assert buffer.stats()["failures"] == 1 and buffer.stats()["pending"] == 0
+    buffer.close()
+
+# Price-only updates are read back from the buffer, then committed in one transaction
+def test_reads_see_buffered_prices(catalog):
+    commits = []
+    event.listen(catalog.engine, "commit", lambda connection: commits.append(1))
+    for price in range(2, 52):
+        assert database.update_product_in_db(3, ProductPatch(price=float(price))).price == price
+    assert database.get_product_by_id(3).price == 51.0
+    assert database.get_products_by_ids([3])[0][0].price == 51.0
+    assert [row[3] for row in database.get_all_product_rows() if row[0] == 3] == [51.0]
+    assert committed_price(catalog, 3) == 1.0
+    assert price_write_behind.stats()["pending"] == 1
+
+    commits.clear()
+    assert price_write_behind.flush() == 1
+    assert len(commits) == 1
+    assert committed_price(catalog, 3) == 51.0
+    assert database.get_product_by_id(3).price == 51.0
+
+# Updates of other fields are written directly, and a direct price write drops the buffered one
+def test_direct_writes_win_over_buffer(catalog):
+    database.update_product_in_db(4, ProductPatch(price=7.0))
+    assert database.update_product_in_db(4, ProductPatch(name="Renamed")).price == 7.0
+    assert database.get_product_by_id(4).price == 7.0
+    database.update_product_in_db(4, ProductPatch(name="Again", price=8.0))
+    price_write_behind.flush()
+    assert committed_price(catalog, 4) == 8.0
+    assert database.update_product_in_db(999, ProductPatch(price=1.0)) is None
@@ -1,12 +1,20 @@
 from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
+from slowapi.middleware import SlowAPIASGIMiddleware
 
 # Routes and config modules import
-from app.api.config.env import API_NAME, PRODUCTION_SERVER_URL, DEVELOPMENT_SERVER_URL, LOCALHOST_SERVER_URL
-from app.api.config.limiter import limiter
+from app.api.config.env import API_NAME, PRODUCTION_SERVER_URL, DEVELOPMENT_SERVER_URL, LOCALHOST_SERVER_URL, DOCS_ENABLED, PROFILING_ENABLED
+from app.api.config.limiter import DEFAULT_LIMITS, limiter
+from app.api.config.admission import AdmissionControlMiddleware, admission_controller
+from app.api.config.deadlines import DeadlineMiddleware
+from app.api.config.cors import CORSMiddleware, cors_options
+from app.api.config.docs import mount_docs
+from app.api.config.write_behind import price_write_behind
+from app.api.config.db import mongo_db
+from app.api.config.replica import ReplicaMiddleware, product_replica
+from app.api.config.purger import product_purger
+from app.api.adapters.n8 import n8_webhook
 from app.api.routes.routes import router
 
 from fastapi.openapi.utils import get_openapi
@@ -31,10 +39,11 @@ license_info = {
 }
 
 
+# The docs routes are served precomputed by mount_docs below, or not at all
 app = FastAPI(
-    openapi_url=f'/api/v1/{API_NAME}/openapi.json',
-    docs_url=f'/api/v1/{API_NAME}/docs',
-    redoc_url=f'/api/v1/{API_NAME}/redoc',
+    openapi_url=None,
+    docs_url=None,
+    redoc_url=None,
     servers=servers,
     title=title,
     description=description,
@@ -63,28 +72,56 @@ def custom_openapi():
 app.openapi = custom_openapi
 
 app.state.limiter = limiter
-app.add_middleware(SlowAPIMiddleware)
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
-# CORS middleware configuration
-origins = ['*']
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=['*'],
-    allow_headers=['*'],
-)
+# Every middleware below is pure ASGI; Starlette runs the last one added first.
+# Routes enforce their rate limits with @limiter.limit, so the slowapi middleware is
+# only needed for the default limits of undecorated routes.
+if DEFAULT_LIMITS:
+    app.add_middleware(SlowAPIASGIMiddleware)
+
+# Replica mode middleware, forwarding product writes and stale reads to the primary
+if product_replica.enabled:
+    app.add_middleware(ReplicaMiddleware, replica=product_replica)
+
+# Admission control middleware, sheds before any route work
+app.add_middleware(AdmissionControlMiddleware, controller=admission_controller)
+
+# Request deadline middleware, outside admission so time spent queued counts against the budget
+app.add_middleware(DeadlineMiddleware)
+
+# CORS middleware, outermost so preflights never queue and shed responses still carry CORS headers
+app.add_middleware(CORSMiddleware, **cors_options())
 
 @app.on_event('startup')
 async def on_startup():
     # Actions to be executed when the API starts.
+    # Start following the primary in replica mode; product reads are forwarded until the copy is loaded
+    product_replica.start()
+    # Remove the products marked deleted in soft delete mode, in the background
+    product_purger.start()
     print('API started')
 
 @app.on_event('shutdown')
 async def on_shutdown():
     # Actions to be executed when the API shuts down.
+    # Commit the prices still in the write-behind buffer
+    price_write_behind.close()
+    mongo_db.close()
+    product_replica.close()
+    product_purger.close()
+    # Send the product changes still queued for N8, or spill them for the next start
+    n8_webhook.close()
     print('API shut down')
 
 # Include the routes
 app.include_router(router, prefix=f'/api/v1/{API_NAME}')
+
+# Admin profiling routes, left out entirely unless enabled
+if PROFILING_ENABLED:
+    from app.api.routes.admin import admin_router
+    app.include_router(admin_router, prefix=f'/api/v1/{API_NAME}')
+
+# Docs routes, registered after every other route so the schema covers them all
+if DOCS_ENABLED:
+    mount_docs(app, prefix=f'/api/v1/{API_NAME}', build_schema=app.openapi, title=title)
@@ -0,0 +1,50 @@
+"""
+Build step for the API docs.
+
+Downloads the pinned Swagger UI and ReDoc assets and writes the OpenAPI schema to
+`app/static/docs`, so workers serve the docs without network access and without
+generating the schema themselves. It runs in the Docker build; run it again after
+changing the routes:
+
+    PYTHONPATH=./ python -m app.build_docs
+"""
+import argparse
+import logging
+import urllib.request
+
+# Docs configuration and application imports
+from app.api.config.docs import DOCS_ASSETS, DOCS_STATIC_DIR, render_schema
+
+logger = logging.getLogger(__name__)
+
+
+def download_assets():
+    for name, (_, url) in DOCS_ASSETS.items():
+        with urllib.request.urlopen(url, timeout=60) as response:
+            (DOCS_STATIC_DIR / name).write_bytes(response.read())
+        logger.info(f"Downloaded {url}.")
+
+
+def write_schema():
+    # Imported here so that downloading the assets does not require the application settings
+    from app.app import app
+    (DOCS_STATIC_DIR / "openapi.json").write_bytes(render_schema(app.openapi()))
+    logger.info("Wrote the OpenAPI schema.")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skip-assets", action="store_true", help="Only write the OpenAPI schema.")
+    parser.add_argument("--skip-schema", action="store_true", help="Only download the assets.")
+    args = parser.parse_args()
+
+    DOCS_STATIC_DIR.mkdir(parents=True, exist_ok=True)
+    if not args.skip_assets:
+        download_assets()
+    if not args.skip_schema:
+        write_schema()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Standalone consumer of product upserts and deletions published to RabbitMQ.
+
+Run it next to the API with `python -m app.consumer`. Messages are JSON objects:
+
+    {"op": "upsert", "id": 42, "price": 9.99}
+    {"op": "delete", "id": 42}
+
+Upserts may carry any of `name`, `description` and `price`; an upsert of an unknown
+product must carry all three. Messages are batched by size and time, updates of the
+same product within a batch are merged, and the batch is applied in one transaction
+before it is acknowledged. A batch that fails on its data is split until the failing
+messages are isolated; those that keep failing are dead-lettered.
+"""
+import json
+import logging
+import signal
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+# Configuration, adapters and database modules imports
+from app.api.config.env import (RABBIT_USER, RABBIT_PASSWORD, RABBITMQ_IP, PRODUCT_UPDATES_QUEUE,
+                                CONSUMER_BATCH_SIZE, CONSUMER_BATCH_DELAY, CONSUMER_REPORT_INTERVAL,
+                                CONSUMER_MAX_ATTEMPTS)
+from app.api.adapters.rabbitmq import RabbitMQBroker
+from app.api.adapters.n8 import n8_webhook
+from app.api.database import apply_product_changes
+
+logger = logging.getLogger(__name__)
+
+UPSERT_FIELDS = ("name", "description", "price")
+
+# Errors of an unreachable database, after which the whole batch is retried as is
+OUTAGE_ERRORS = (OperationalError, InterfaceError)
+
+# Failing messages whose attempts are remembered at most
+MAX_TRACKED_FAILURES = 10000
+
+
+class ProductUpdateConsumer:
+    """
+    Reads product changes from a broker and applies them in batches.
+
+    A batch is closed once it holds `batch_size` messages or `batch_delay` seconds after
+    its first message arrived. It is acknowledged only after `apply_batch` committed it.
+    If the database is unreachable the whole batch is returned to the queue. Any other
+    error comes from the data of some message, such as a constraint violation, so the
+    batch is split in halves, applied and acknowledged separately, until the messages that
+    fail on their own are isolated. Those are returned to the queue, and rejected without
+    requeueing, which dead-letters them, once they failed `max_attempts` times.
+    """
+
+    def __init__(self, broker, apply_batch: Callable[[List[dict], List[int]], Tuple[int, int, int]] = apply_product_changes,
+                 batch_size: int = 500, batch_delay: float = 0.5, max_attempts: int = 5):
+        self.broker = broker
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_attempts = max_attempts
+        self._attempts: Dict[bytes, int] = {}
+        self._started = time.monotonic()
+        self.messages = 0
+        self.batches = 0
+        self.coalesced = 0
+        self.invalid = 0
+        self.rejected = 0
+        self.failed_batches = 0
+        self.dead_lettered = 0
+        self.lag_seconds = 0.0
+
+    def parse(self, body: bytes) -> Optional[Tuple[str, int, dict]]:
+        """
+        Read a message body.
+
+        Returns:
+        - Optional[Tuple[str, int, dict]]: (op, product ID, upserted fields), or None if the message is invalid.
+        """
+        try:
+            message = json.loads(body)
+            product_id = int(message["id"])
+            op = message["op"]
+            if op not in ("upsert", "delete"):
+                raise ValueError(f"unknown op {op!r}")
+            fields = {key: message[key] for key in UPSERT_FIELDS if key in message}
+            if "price" in fields:
+                fields["price"] = float(fields["price"])
+        except (ValueError, KeyError, TypeError) as e:
+            self.invalid += 1
+            logger.warning(f"Skipping invalid product message: {str(e)}")
+            return None
+        return op, product_id, fields
+
+    def merge(self, changes: List[Optional[Tuple[str, int, dict]]], count: bool = True) -> Tuple[List[dict], List[int]]:
+        """
+        Merge parsed messages into one change per product, in arrival order, with the result
+        of applying them one by one.
+
+        Later fields of an upsert override earlier ones and a delete discards earlier
+        upserts. An upsert after a delete replaces it only if it carries every column;
+        otherwise it is rejected, as it would be once the product is deleted.
+
+        Args:
+        - changes (List[Optional[Tuple[str, int, dict]]]): Parsed messages; invalid ones are None.
+        - count (bool): Whether to count the merged and rejected messages in the metrics.
+
+        Returns:
+        - Tuple[List[dict], List[int]]: Upserted rows and deleted IDs.
+        """
+        upserts: Dict[int, dict] = {}
+        deletes: Set[int] = set()
+        for change in changes:
+            if change is None:
+                continue
+            op, product_id, fields = change
+            if count and (product_id in upserts or product_id in deletes):
+                self.coalesced += 1
+            if op == "delete":
+                upserts.pop(product_id, None)
+                deletes.add(product_id)
+            elif product_id not in deletes:
+                upserts.setdefault(product_id, {"id": product_id}).update(fields)
+            elif len(fields) == len(UPSERT_FIELDS):
+                deletes.discard(product_id)
+                upserts[product_id] = {"id": product_id, **fields}
+            elif count:
+                self.rejected += 1
+        return list(upserts.values()), sorted(deletes)
+
+    def coalesce(self, bodies: List[bytes]) -> Tuple[List[dict], List[int]]:
+        """
+        Merge the messages of a batch into one change per product (see `merge`).
+
+        Args:
+        - bodies (List[bytes]): Raw message bodies.
+
+        Returns:
+        - Tuple[List[dict], List[int]]: Upserted rows and deleted IDs.
+        """
+        return self.merge([self.parse(body) for body in bodies])
+
+    def run_once(self, poll_timeout: float = 1.0) -> int:
+        """
+        Collect, apply and acknowledge one batch.
+
+        Args:
+        - poll_timeout (float): Seconds to wait for the first message of the batch.
+
+        Returns:
+        - int: Number of messages in the batch.
+        """
+        first = self.broker.get(poll_timeout)
+        if first is None:
+            return 0
+        messages = [first]
+        deadline = time.monotonic() + self.batch_delay
+        while len(messages) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            message = self.broker.get(remaining)
+            if message is None:
+                break
+            messages.append(message)
+
+        changes = [self.parse(message.body) for message in messages]
+        last_tag = messages[-1].delivery_tag
+        try:
+            self._apply(changes, count=True)
+        except OUTAGE_ERRORS as e:
+            self.failed_batches += 1
+            logger.error(f"Error applying product changes, requeueing {len(messages)} messages: {str(e)}")
+            self.broker.nack(last_tag)
+            return len(messages)
+        except Exception as e:
+            self.failed_batches += 1
+            logger.error(f"Error applying product changes, isolating the failing messages: {str(e)}")
+            self._isolate(messages, changes)
+        else:
+            self.broker.ack(last_tag)
+            if self._attempts:
+                for message in messages:
+                    self._attempts.pop(message.body, None)
+        self.messages += len(messages)
+        self.batches += 1
+        self.lag_seconds = max(0.0, time.time() - min(message.timestamp for message in messages))
+        return len(messages)
+
+    def _apply(self, changes: List[Optional[Tuple[str, int, dict]]], count: bool = False):
+        upserts, deletes = self.merge(changes, count)
+        if upserts or deletes:
+            _, _, rejected = self.apply_batch(upserts, deletes)
+            self.rejected += rejected
+
+    def _isolate(self, messages: list, changes: List[Optional[Tuple[str, int, dict]]]):
+        """
+        Apply the halves of a failed batch separately, acknowledging each one that commits,
+        down to the single messages that fail.
+        """
+        if len(messages) == 1:
+            self._fail(messages[0])
+            return
+        middle = len(messages) // 2
+        for part in (slice(None, middle), slice(middle, None)):
+            try:
+                self._apply(changes[part])
+            except Exception:
+                self._isolate(messages[part], changes[part])
+                continue
+            for message in messages[part]:
+                self.broker.ack(message.delivery_tag, multiple=False)
+                self._attempts.pop(message.body, None)
+
+    def _fail(self, message):
+        attempts = self._attempts.pop(message.body, 0) + 1
+        if attempts >= self.max_attempts:
+            self.dead_lettered += 1
+            logger.error(f"Dead-lettering a product message that failed {attempts} times: {message.body[:200]!r}")
+            self.broker.nack(message.delivery_tag, multiple=False, requeue=False)
+            return
+        if len(self._attempts) >= MAX_TRACKED_FAILURES:
+            # Forgets the oldest failure
+            self._attempts.pop(next(iter(self._attempts)))
+        self._attempts[message.body] = attempts
+        self.broker.nack(message.delivery_tag, multiple=False)
+
+    def run(self, stop: threading.Event):
+        """
+        Consume until `stop` is set, logging metrics every `CONSUMER_REPORT_INTERVAL` seconds.
+        """
+        next_report = time.monotonic() + CONSUMER_REPORT_INTERVAL
+        while not stop.is_set():
+            self.run_once()
+            if time.monotonic() >= next_report:
+                logger.info(f"Product consumer metrics: {self.stats()}")
+                next_report += CONSUMER_REPORT_INTERVAL
+
+    def stats(self) -> dict:
+        """
+        Current consumer metrics.
+        """
+        elapsed = time.monotonic() - self._started
+        return {
+            "messages": self.messages,
+            "batches": self.batches,
+            "coalesced": self.coalesced,
+            "invalid": self.invalid,
+            "rejected": self.rejected,
+            "failed_batches": self.failed_batches,
+            "dead_lettered": self.dead_lettered,
+            "lag_seconds": round(self.lag_seconds, 3),
+            "throughput_per_second": round(self.messages / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def main(stop: Optional[threading.Event] = None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] - %(message)s')
+    stop = stop or threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+    broker = RabbitMQBroker(RABBITMQ_IP, RABBIT_USER, RABBIT_PASSWORD, PRODUCT_UPDATES_QUEUE, prefetch=CONSUMER_BATCH_SIZE * 2)
+    broker.connect()
+    consumer = ProductUpdateConsumer(broker, batch_size=CONSUMER_BATCH_SIZE, batch_delay=CONSUMER_BATCH_DELAY,
+                                     max_attempts=CONSUMER_MAX_ATTEMPTS)
+    logger.info(f"Consuming product changes from '{PRODUCT_UPDATES_QUEUE}'.")
+    try:
+        consumer.run(stop)
+    finally:
+        broker.close()
+        # The applied changes still queued for N8 are sent, or spilled for the next start
+        n8_webhook.close()
+        logger.info(f"Product consumer stopped: {consumer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Import time report of the API.
+
+Imports a module (`app.app` by default) in fresh interpreters started with
+`-X importtime`, parses what they print into a per-module table and shows the modules
+with the largest cumulative (or self) import time, with the total of the fastest run:
+
+    PYTHONPATH=./ python -m app.import_time --top 25
+    PYTHONPATH=./ python -m app.import_time --sort self --runs 5
+
+Each run is a cold start of the interpreter, though bytecode caches are reused; the
+fastest run is reported since slower ones mostly measure noise from the machine.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import Iterable, List, NamedTuple
+
+# Repository root, put on the path of the measured interpreters
+ROOT = Path(__file__).resolve().parents[1]
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+class ImportRecord(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(lines: Iterable[str]) -> List[ImportRecord]:
+    """
+    Parse the `import time: self [us] | cumulative | imported package` lines of `-X importtime`.
+
+    Args:
+    - lines (Iterable[str]): Lines written to stderr; other lines, such as the header, are skipped.
+
+    Returns:
+    - List[ImportRecord]: One record per imported module, in the order they finished importing.
+    """
+    records = []
+    for line in lines:
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            # Nested imports are indented by two spaces per level below the first space
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def measure(module: str = "app.app", python: str = sys.executable) -> List[ImportRecord]:
+    """
+    Import a module in a fresh interpreter and record the import time of every module it loads.
+
+    Args:
+    - module (str): Dotted name of the module to import.
+    - python (str): Interpreter to run.
+
+    Returns:
+    - List[ImportRecord]: Parsed `-X importtime` output.
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")])))
+    result = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr.splitlines())
+
+
+def total_ms(records: List[ImportRecord], module: str) -> float:
+    """
+    Cumulative import time of a module in milliseconds, everything it imported included.
+    """
+    return max(record.cumulative_us for record in records if record.module == module) / 1000
+
+
+def format_table(records: List[ImportRecord], top: int = 20, sort: str = "cumulative") -> str:
+    """
+    Table of the slowest modules, by cumulative or self import time.
+
+    Args:
+    - records (List[ImportRecord]): Parsed `-X importtime` output.
+    - top (int): Number of modules listed.
+    - sort (str): 'cumulative' or 'self'.
+
+    Returns:
+    - str: Aligned table, one module per line.
+    """
+    key = (lambda record: record.self_us) if sort == "self" else (lambda record: record.cumulative_us)
+    rows = [f"{'self ms':>9} {'cumul. ms':>10}  module"]
+    for record in sorted(records, key=key, reverse=True)[:top]:
+        rows.append(f"{record.self_us / 1000:9.1f} {record.cumulative_us / 1000:10.1f}  {record.module}")
+    return "\n".join(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.app", help="Module to import.")
+    parser.add_argument("--top", type=int, default=20, help="Number of modules listed.")
+    parser.add_argument("--sort", choices=("cumulative", "self"), default="cumulative")
+    parser.add_argument("--runs", type=int, default=3, help="Cold imports measured; the fastest one is reported.")
+    args = parser.parse_args()
+
+    runs = [measure(args.module) for _ in range(args.runs)]
+    fastest = min(runs, key=lambda records: total_ms(records, args.module))
+    print(format_table(fastest, args.top, args.sort))
+    print(f"\nimport {args.module}: {total_ms(fastest, args.module):.1f} ms "
+          f"(fastest of {args.runs}, {len(fastest)} modules)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Partition maintenance for the price history.
+
+In MySQL `product_price_history` is partitioned by month of `changed_at`, with a
+catch-all `pmax` partition (see the README). This adds the monthly partitions missing
+from the current month up to `--months` ahead on every shard, by splitting `pmax`, so
+rows keep landing in their own month. Run it monthly, e.g. from cron:
+
+    PYTHONPATH=./ python -m app.price_partitions --months 3
+
+Shards that are not MySQL databases are skipped.
+"""
+import argparse
+import logging
+from datetime import date
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+# Sharding configuration imports
+from app.api.config.shards import product_shards
+
+logger = logging.getLogger(__name__)
+
+
+def month_partitions(first: date, months: int) -> List[Tuple[str, date]]:
+    """
+    Names and exclusive upper bounds of the monthly partitions from the month of `first` on.
+    """
+    partitions = []
+    year, month = first.year, first.month
+    for _ in range(months + 1):
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        partitions.append((f"p{year}{month:02d}", date(next_year, next_month, 1)))
+        year, month = next_year, next_month
+    return partitions
+
+
+def reorganize_statement(existing: Iterable[str], wanted: List[Tuple[str, date]]) -> Optional[str]:
+    """
+    `ALTER TABLE` statement splitting `pmax` into the wanted partitions that do not exist yet.
+
+    Partitions older than the newest existing one cannot be split out of `pmax`, so they are left out.
+    """
+    existing = set(existing)
+    newest = max((name for name in existing if name != "pmax"), default="")
+    missing = [(name, bound) for name, bound in wanted if name not in existing and name > newest]
+    if not missing:
+        return None
+    partitions = ", ".join(f"PARTITION {name} VALUES LESS THAN ('{bound.isoformat()}')" for name, bound in missing)
+    return (f"ALTER TABLE product_price_history REORGANIZE PARTITION pmax INTO "
+            f"({partitions}, PARTITION pmax VALUES LESS THAN (MAXVALUE))")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(levelname)s] - %(message)s')
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, default=3, help="Months ahead of the current one to create partitions for.")
+    args = parser.parse_args()
+
+    wanted = month_partitions(date.today(), args.months)
+    for index, shard in enumerate(product_shards.shards):
+        if shard.engine.dialect.name != "mysql":
+            logger.info(f"Shard {index} is not a MySQL database, skipped.")
+            continue
+        with shard.engine.begin() as connection:
+            existing = connection.execute(text(
+                "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'product_price_history' AND PARTITION_NAME IS NOT NULL"
+            )).scalars().all()
+            if "pmax" not in existing:
+                logger.error(f"Shard {index}: product_price_history has no pmax partition, create it as in the README.")
+                continue
+            statement = reorganize_statement(existing, wanted)
+            if statement is None:
+                logger.info(f"Shard {index}: partitions are up to date.")
+                continue
+            connection.execute(text(statement))
+            logger.info(f"Shard {index}: {statement}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Throughput benchmark of the bulk import/export formats.
+
+Encodes a synthetic catalog with the export encoders and parses it back with the
+import readers, batch by batch as the endpoints do, reporting rows per second and
+the peak resident memory of the process. Run it from the repository root:
+
+    PYTHONPATH=./ python benchmarks/bulk_io.py --rows 10000000
+
+With `--database-url` it measures the whole paths against a database instead: the
+parsed file is loaded through `bulk_insert_products` in transactions of
+`--batch-size` rows, and the table is exported back through the server-side cursors
+of `iter_product_batches`. The products table is recreated for each format:
+
+    PYTHONPATH=./ python benchmarks/bulk_io.py --rows 10000000 --database-url sqlite:////tmp/bulk_io.db
+
+Peak RSS is the high-water mark of the process so far, so run one format at a time
+(`--formats csv`) to attribute it to that format.
+"""
+import argparse
+import resource
+import tempfile
+import time
+
+from app.api import database
+from app.api.config.db import SQLDatabase
+from app.api.config.shards import ShardRouter
+from app.api.methods.bulk import ENCODERS, PARSERS, FILE_READERS, require_pyarrow
+from app.api.models.models import Base, ProductDB
+
+
+def synthetic_batches(rows: int, batch_size: int):
+    for start in range(0, rows, batch_size):
+        yield [(i, f"Product {i}", f"Description of product {i}", round(i * 0.01, 2)) for i in range(start + 1, min(start + batch_size, rows) + 1)]
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def read_batches(name: str, file, batch_size: int, chunk_size: int):
+    # Parsed rows in batches of `batch_size`, as the import endpoint reads the request body
+    if name not in PARSERS:
+        yield from FILE_READERS[name](file, batch_size)
+        return
+    parser = PARSERS[name]()
+    batch = []
+    while True:
+        chunk = file.read(chunk_size)
+        if not chunk:
+            break
+        batch.extend(parser.feed(chunk))
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            del batch[:batch_size]
+    batch.extend(parser.close())
+    if batch:
+        yield batch
+
+
+def bench_format(name: str, rows: int, batch_size: int, chunk_size: int):
+    with tempfile.TemporaryFile() as file:
+        started = time.perf_counter()
+        for chunk in ENCODERS[name](synthetic_batches(rows, batch_size)):
+            file.write(chunk)
+        encode_seconds = time.perf_counter() - started
+        size = file.tell()
+        file.seek(0)
+
+        parsed = 0
+        started = time.perf_counter()
+        for batch in read_batches(name, file, batch_size, chunk_size):
+            parsed += len(batch)
+        parse_seconds = time.perf_counter() - started
+
+    assert parsed == rows, f"{name}: parsed {parsed} of {rows} rows"
+    print(f"{name:<8} {size / 2**20:>10.1f} {rows / encode_seconds:>14,.0f} {rows / parse_seconds:>14,.0f} {peak_rss_mb():>12.1f}")
+
+
+def bench_database(name: str, db: SQLDatabase, rows: int, batch_size: int, chunk_size: int):
+    ProductDB.__table__.drop(db.engine, checkfirst=True)
+    ProductDB.__table__.create(db.engine)
+    with tempfile.TemporaryFile() as file:
+        for chunk in ENCODERS[name](synthetic_batches(rows, batch_size)):
+            file.write(chunk)
+        file.seek(0)
+
+        imported = 0
+        started = time.perf_counter()
+        for batch in read_batches(name, file, batch_size, chunk_size):
+            imported += database.bulk_insert_products(batch)
+        import_seconds = time.perf_counter() - started
+
+    with tempfile.TemporaryFile() as file:
+        started = time.perf_counter()
+        for chunk in ENCODERS[name](database.iter_product_batches(batch_size)):
+            file.write(chunk)
+        export_seconds = time.perf_counter() - started
+        size = file.tell()
+
+    assert imported == rows, f"{name}: imported {imported} of {rows} rows"
+    print(f"{name:<8} {size / 2**20:>10.1f} {rows / import_seconds:>14,.0f} {rows / export_seconds:>14,.0f} {peak_rss_mb():>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--chunk-size", type=int, default=64 * 1024, help="Bytes per simulated request body chunk.")
+    parser.add_argument("--formats", nargs="+", default=list(ENCODERS))
+    parser.add_argument("--database-url", help="SQLAlchemy URL of a database to import into and export from.")
+    args = parser.parse_args()
+
+    try:
+        require_pyarrow()
+    except ImportError:
+        args.formats = [name for name in args.formats if name not in FILE_READERS]
+
+    print(f"{args.rows:,} rows, batches of {args.batch_size}")
+    if args.database_url:
+        db = SQLDatabase(args.database_url)
+        Base.metadata.create_all(db.engine)
+        database.product_shards = ShardRouter([db])
+        print(f"{'format':<8} {'size (MB)':>10} {'import rows/s':>14} {'export rows/s':>14} {'peak RSS MB':>12}")
+        for name in args.formats:
+            bench_database(name, db, args.rows, args.batch_size, args.chunk_size)
+        db.engine.dispose()
+        return
+    print(f"{'format':<8} {'size (MB)':>10} {'encode rows/s':>14} {'parse rows/s':>14} {'peak RSS MB':>12}")
+    for name in args.formats:
+        bench_format(name, args.rows, args.batch_size, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
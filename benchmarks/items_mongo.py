@@ -0,0 +1,90 @@
+"""
+Items read and write benchmark: the former handlers against the async ones.
+
+The former handlers fetched every document with a blocking `find()`, rewrote each one
+with `convert_objectid_to_str` and validated it into `Item` models; they created items
+one `insert_one` at a time. The current ones read keyset pages with a projection,
+convert IDs in the encoder, and create items with `insert_many`.
+
+Runs against the in-process `mongomock` stand-in by default, which has no network
+round trips and no indexes, so it understates what batching and keyset pages save; pass
+`--uri` to measure against a real MongoDB. Run it from the repository root:
+
+    PYTHONPATH=./ python benchmarks/items_mongo.py --items 20000
+    PYTHONPATH=./ python benchmarks/items_mongo.py --uri mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from app.api.methods.methods import convert_objectid_to_str, encode_item_page
+from app.api.models.models import Item
+
+
+def clients(uri):
+    if uri is None:
+        import mongomock
+        from mongomock_motor import AsyncMongoMockClient
+        sync_client = mongomock.MongoClient()
+        # Both clients must see the same data
+        return sync_client, AsyncMongoMockClient(mock_mongo_client=sync_client)
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import MongoClient
+    return MongoClient(uri), AsyncIOMotorClient(uri)
+
+
+def documents(count: int):
+    return [{"name": f"Item {i}", "description": f"Description of item {i}" * 4} for i in range(count)]
+
+
+def legacy_list(collection) -> bytes:
+    items = convert_objectid_to_str(list(collection.find()))
+    return json.dumps([Item(**item).dict() for item in items]).encode()
+
+
+async def paged_list(collection, after, page_size: int, fields) -> bytes:
+    query = {} if after is None else {"_id": {"$gt": after}}
+    page = await collection.find(query, fields).sort("_id", 1).limit(page_size).to_list(length=page_size)
+    return encode_item_page(page, page[-1]["_id"] if len(page) == page_size else None)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - started, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--uri", default=None, help="MongoDB URI; the mongomock stand-in if omitted.")
+    args = parser.parse_args()
+
+    sync_client, async_client = clients(args.uri)
+    sync_collection = sync_client["items_benchmark"]["items"]
+    async_collection = async_client["items_benchmark"]["items"]
+    loop = asyncio.get_event_loop()
+    sync_collection.drop()
+
+    one_by_one, _ = timed(lambda: [sync_collection.insert_one(document) for document in documents(args.items)])
+    sync_collection.drop()
+    batched, _ = timed(lambda: loop.run_until_complete(async_collection.insert_many(documents(args.items), ordered=False)))
+    print(f"Creating {args.items} items")
+    print(f"  insert_one each:  {one_by_one:8.3f} s  {args.items / one_by_one:10.0f} items/s")
+    print(f"  insert_many:      {batched:8.3f} s  {args.items / batched:10.0f} items/s")
+
+    middle = sync_collection.find({}, {"_id": 1}).sort("_id", 1).skip(args.items // 2).limit(1)[0]["_id"]
+    legacy, legacy_body = timed(lambda: legacy_list(sync_collection))
+    whole, whole_body = timed(lambda: loop.run_until_complete(paged_list(async_collection, middle, args.page_size, None)))
+    projected, projected_body = timed(lambda: loop.run_until_complete(paged_list(async_collection, middle, args.page_size, {"name": 1})))
+    print(f"Listing a catalog of {args.items} items, one request")
+    print(f"  legacy full list:                     {legacy * 1000:9.1f} ms  {len(legacy_body):>10} bytes")
+    print(f"  page of {args.page_size}, whole documents:      {whole * 1000:9.1f} ms  {len(whole_body):>10} bytes")
+    print(f"  page of {args.page_size}, projected to name:    {projected * 1000:9.1f} ms  {len(projected_body):>10} bytes")
+    sync_collection.drop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Per-request overhead of the middleware stack, in microseconds.
+
+Calls a trivial route through the ASGI interface of three apps: one without
+middleware, one with the previous stack (slowapi's BaseHTTPMiddleware and Starlette's
+wildcard CORSMiddleware) and one with the current stack (pure ASGI CORS, deadline and
+admission control middleware). The overhead is the time per request minus that of the
+app without middleware; preflights are answered by the CORS middleware itself, so for
+them the full time per request is reported. Run it from the repository root:
+
+    PYTHONPATH=./ python benchmarks/middleware_overhead.py --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from starlette.middleware.cors import CORSMiddleware as StarletteCORSMiddleware
+from slowapi.middleware import SlowAPIMiddleware
+
+from app.api.config.admission import AdmissionControlMiddleware, admission_controller
+from app.api.config.cors import CORSMiddleware, cors_options
+from app.api.config.deadlines import DeadlineMiddleware
+from app.api.config.limiter import limiter
+
+ORIGIN = b"http://localhost:3000"
+REQUESTS = {
+    "GET, same origin": ("GET", []),
+    "GET, cross origin": ("GET", [(b"origin", ORIGIN)]),
+    "OPTIONS preflight": ("OPTIONS", [(b"origin", ORIGIN), (b"access-control-request-method", b"PATCH"),
+                                      (b"access-control-request-headers", b"content-type")]),
+}
+
+
+def make_app(stack: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/api/v1/example/products/1')
+    @app.patch('/api/v1/example/products/1')
+    def product(request: Request):
+        return Response(b'{"id":1}', media_type="application/json")
+
+    if stack == "before":
+        app.state.limiter = limiter
+        app.add_middleware(SlowAPIMiddleware)
+        app.add_middleware(StarletteCORSMiddleware, allow_origins=['*'], allow_credentials=True,
+                           allow_methods=['*'], allow_headers=['*'])
+    elif stack == "after":
+        app.add_middleware(AdmissionControlMiddleware, controller=admission_controller)
+        app.add_middleware(DeadlineMiddleware)
+        app.add_middleware(CORSMiddleware, **cors_options())
+    return app
+
+
+async def time_requests(app, method: str, headers, requests: int) -> float:
+    scope = {"type": "http", "http_version": "1.1", "method": method, "scheme": "http", "path": "/api/v1/example/products/1",
+             "raw_path": b"/api/v1/example/products/1", "query_string": b"", "root_path": "", "headers": headers,
+             "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000)}
+
+    async def send(message):
+        pass
+
+    async def call():
+        # The body arrives once; later receives wait for a disconnect that never comes
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await asyncio.Event().wait()
+
+        await app(dict(scope), receive, send)
+
+    for _ in range(min(requests, 1000)):
+        await call()
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call()
+    return (time.perf_counter() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    apps = {stack: make_app(stack) for stack in ("bare", "before", "after")}
+    print(f"{'request':<20} {'bare µs':>10} {'before µs':>12} {'after µs':>12}")
+    for name, (method, headers) in REQUESTS.items():
+        timings = {stack: asyncio.run(time_requests(app, method, headers, args.requests)) for stack, app in apps.items()}
+        if method == "OPTIONS":
+            before, after = timings["before"], timings["after"]
+        else:
+            before, after = timings["before"] - timings["bare"], timings["after"] - timings["bare"]
+        print(f"{name:<20} {timings['bare']:>10.1f} {before:>12.1f} {after:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
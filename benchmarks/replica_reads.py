@@ -0,0 +1,89 @@
+"""
+Product read latency benchmark: the MySQL path against the local replica copy.
+
+Copies the products table of the source database into a local SQLite file the way
+replica mode loads it (`replace_products`), then times the same random single-product
+reads and keyset pages through the database functions against each, reporting median
+and p99 latency. The source defaults to the configured MySQL database; with
+`--seed` a source with fewer rows is filled with synthetic products first. Run it from
+the repository root, next to the MySQL server to measure it without network latency or
+from a read node to include it:
+
+    PYTHONPATH=./ python benchmarks/replica_reads.py --reads 5000
+    PYTHONPATH=./ python benchmarks/replica_reads.py --source-url sqlite:////tmp/source.db --seed 100000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import func, insert, select
+
+from app.api import database
+from app.api.config.db import SQLDatabase, mysql_db
+from app.api.config.shards import ShardRouter
+from app.api.methods.bulk import COLUMNS
+from app.api.models.models import Base, ProductDB
+
+
+def seed(db: SQLDatabase, rows: int):
+    with db.engine.begin() as connection:
+        present = connection.execute(select(func.count()).select_from(ProductDB.__table__)).scalar()
+        for start in range(present + 1, rows + 1, 10000):
+            connection.execute(insert(ProductDB.__table__), [
+                {"id": i, "name": f"Product {i}", "description": f"Description of product {i}", "price": round(i * 0.01, 2)}
+                for i in range(start, min(start + 10000, rows + 1))
+            ])
+
+
+def timed_reads(ids, reads: int, page_size: int) -> dict:
+    point, pages = [], []
+    for _ in range(reads):
+        product_id = random.choice(ids)
+        started = time.perf_counter()
+        database.get_product_by_id(product_id)
+        point.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        database.get_products_page(product_id, page_size)
+        pages.append(time.perf_counter() - started)
+    quantiles = lambda samples: (statistics.median(samples) * 1000, statistics.quantiles(samples, n=100)[98] * 1000)
+    return {"point": quantiles(point), "page": quantiles(pages)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source-url", default=None, help="SQLAlchemy URL of the source; the MySQL database if omitted.")
+    parser.add_argument("--seed", type=int, default=0, help="Fill the source up to this many products.")
+    parser.add_argument("--reads", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    source = SQLDatabase(args.source_url) if args.source_url else mysql_db
+    Base.metadata.create_all(source.engine)
+    if args.seed:
+        seed(source, args.seed)
+
+    database.product_shards = ShardRouter([source])
+    ids = [row[0] for row in database.get_all_product_rows()]
+    batches = [[dict(zip(COLUMNS, row)) for row in batch] for batch in database.iter_product_batches(5000)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        replica = SQLDatabase(f"sqlite:///{directory}/replica.db")
+        Base.metadata.create_all(replica.engine)
+        database.product_shards = ShardRouter([replica])
+        started = time.perf_counter()
+        copied = database.replace_products(batches)
+        print(f"Copied {copied} products in {time.perf_counter() - started:.2f} s")
+
+        print(f"{args.reads} random reads, pages of {args.page_size}")
+        print(f"{'path':<10}{'get p50 ms':>12}{'get p99 ms':>12}{'page p50 ms':>13}{'page p99 ms':>13}")
+        for name, db in (("source", source), ("replica", replica)):
+            database.product_shards = ShardRouter([db])
+            result = timed_reads(ids, args.reads, args.page_size)
+            print(f"{name:<10}{result['point'][0]:>12.3f}{result['point'][1]:>12.3f}{result['page'][0]:>13.3f}{result['page'][1]:>13.3f}")
+        replica.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Product list serialization benchmark: JSON against MessagePack and CBOR.
+
+Encodes the same synthetic product rows the way `GET /products/` does in each
+negotiable format, then decodes them the way a Python client would, and reports the
+payload size and the best encode and decode time of a few runs. MessagePack is timed
+with both the schema encoder the route uses and a plain `packb` of the product dicts.
+CBOR is skipped when cbor2 is not installed. Run it from the repository root:
+
+    PYTHONPATH=./ python benchmarks/serialization.py --rows 100000
+"""
+import argparse
+import gzip
+import json
+import time
+
+import msgpack
+
+from app.api.methods.bulk import COLUMNS
+from app.api.methods.serialization import cbor_available, encode_product_list
+
+
+def best_of(runs: int, fn) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = [(i, f"Product {i}", f"Description of product {i}", round(i * 0.37, 2)) for i in range(1, args.rows + 1)]
+    encoders = [
+        ("json", lambda: encode_product_list(rows, "json"), json.loads),
+        ("msgpack", lambda: encode_product_list(rows, "msgpack"), msgpack.unpackb),
+        ("msgpack dicts", lambda: msgpack.packb([dict(zip(COLUMNS, row)) for row in rows]), msgpack.unpackb),
+    ]
+    if cbor_available():
+        import cbor2
+        encoders.append(("cbor", lambda: encode_product_list(rows, "cbor"), cbor2.loads))
+
+    expected = json.loads(encode_product_list(rows, "json"))
+    print(f"{args.rows} products, best of {args.runs} runs")
+    print(f"{'format':<15}{'bytes':>12}{'gzip bytes':>12}{'encode ms':>11}{'decode ms':>11}")
+    for name, encode, decode in encoders:
+        body = encode()
+        assert decode(body) == expected, name
+        encode_ms = best_of(args.runs, encode)
+        decode_ms = best_of(args.runs, lambda: decode(body))
+        print(f"{name:<15}{len(body):>12}{len(gzip.compress(body, 6)):>12}{encode_ms:>11.1f}{decode_ms:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Hot-key price update benchmark, with and without the write-behind buffer.
+
+Several threads update the prices of a few products as fast as they can, through
+`update_product_in_db` against a SQLite file, first committing every update and then
+with write-behind enabled. Reports updates per second, database commits, update
+latency and the updates that failed on a locked database. Run it from the repository
+root:
+
+    PYTHONPATH=./ python benchmarks/write_behind.py --threads 8 --hot-keys 10
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event, insert
+
+from app.api import database
+from app.api.config.db import SQLDatabase
+from app.api.config.shards import ShardRouter
+from app.api.config.write_behind import price_write_behind
+from app.api.models.models import Base, ProductDB, ProductPatch
+
+
+def run(hot_keys: int, threads: int, seconds: float):
+    latencies, errors = [], []
+    stop = threading.Event()
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                database.update_product_in_db(rng.randint(1, hot_keys), ProductPatch(price=round(rng.uniform(1, 100), 2)))
+            except Exception:
+                errors.append(1)
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    workers = [threading.Thread(target=worker, args=(seed,)) for seed in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in workers:
+        thread.join()
+    price_write_behind.close()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "updates": len(latencies),
+        "updates_per_second": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else 0.0,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--hot-keys", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db = SQLDatabase(f"sqlite:///{directory}/bench.db")
+        Base.metadata.create_all(db.engine)
+        with db.engine.begin() as connection:
+            connection.execute(insert(ProductDB.__table__), [
+                {"id": i, "name": f"Product {i}", "description": "Hot product", "price": 1.0} for i in range(1, args.hot_keys + 1)
+            ])
+        database.product_shards = ShardRouter([db])
+        commits = []
+        event.listen(db.engine, "commit", lambda connection: commits.append(1))
+
+        print(f"{args.threads} threads updating {args.hot_keys} products for {args.seconds:.0f} s")
+        print(f"{'mode':<14}{'updates/s':>12}{'commits':>10}{'updates/commit':>16}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for mode, enabled in (("direct", False), ("write-behind", True)):
+            price_write_behind.enabled = enabled
+            commits.clear()
+            result = run(args.hot_keys, args.threads, args.seconds)
+            print(f"{mode:<14}{result['updates_per_second']:>12.0f}{len(commits):>10}{result['updates'] / max(len(commits), 1):>16.1f}"
+                  f"{result['p50_ms']:>9.2f}{result['p99_ms']:>9.2f}{result['errors']:>8}")
+        print(f"write-behind: {price_write_behind.stats()}")
+        db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()